@@ -1,75 +1,186 @@
+import argparse
 import json
-import sys
 import os
-from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO
 from util import get_figma_node
 
 UI_TREE = "UITree"
-def clean_figma_node(node):
-    bbox = node.get("absoluteBoundingBox", {})
-    clean = {
-        "id": node.get("id"),
-        "type": node.get("type"),
-        "name": node.get("name"),
-        "x": bbox.get("x"),
-        "y": bbox.get("y"),
-        "width": bbox.get("width"),
-        "height": bbox.get("height"),
-    }
-    # Include ALL CRITICAL STYLE AND LAYOUT KEYS for generalization to provide openai with cleaned version of json file
-    for key in (
-        "fills", 
-        "strokes", 
-        "strokeWeight", 
-        "cornerRadius", 
-        "cornerSmoothing", 
-        "effects", 
-        "characters", 
-        "style", 
-        "opacity", 
-        "layoutMode",
-        "primaryAxisAlignItems",
-        "counterAxisAlignItems",
-        "paddingTop",
-        "paddingBottom",
-        "paddingLeft",
-        "paddingRight",
-        "itemSpacing",
-        "primaryAxisSizingMode",
-        "counterAxisSizingMode",
-        "layoutAlign",
-        "layoutGrow",
-    ):
-        if key in node:
-            clean[key] = node[key]
-    
-    if "children" in node:
-        clean["children"] = [clean_figma_node(child) for child in node["children"]]
-    return clean
-
-def export_clean_ui_tree(figma_json):
+
+# The cleaned UI tree given to OpenAI: every node keeps its id, type, name and
+# bounding box (x/y/width/height), plus whichever of these style and layout
+# keys it has, then its children.
+STYLE_KEYS = (
+    "fills",
+    "strokes",
+    "strokeWeight",
+    "cornerRadius",
+    "cornerSmoothing",
+    "effects",
+    "characters",
+    "style",
+    "opacity",
+    "layoutMode",
+    "primaryAxisAlignItems",
+    "counterAxisAlignItems",
+    "paddingTop",
+    "paddingBottom",
+    "paddingLeft",
+    "paddingRight",
+    "itemSpacing",
+    "primaryAxisSizingMode",
+    "counterAxisSizingMode",
+    "layoutAlign",
+    "layoutGrow",
+)
+
+# compact, and ascii like json.dump's default
+_ENCODER = json.JSONEncoder(separators=(",", ":"))
+
+class Projection:
+    """
+    Which parts of a Figma node go into the cleaned tree: the style/layout
+    `keys`, children down to `max_depth` levels below the exported node (None
+    for all), and no nodes of `skip_types` (their subtrees are left out too).
+    """
+
+    def __init__(self, keys: Iterable[str] = STYLE_KEYS, max_depth: Optional[int] = None,
+                 skip_types: Iterable[str] = ()):
+        self.keys = tuple(keys)
+        self.max_depth = max_depth
+        self.skip_types = frozenset(skip_types)
+
+    def project(self, node: Dict[str, Any]) -> Dict[str, Any]:
+        """The node's own fields, without children."""
+        box = node.get("absoluteBoundingBox") or {}
+        clean = {
+            "id": node.get("id"),
+            "type": node.get("type"),
+            "name": node.get("name"),
+            "x": box.get("x"),
+            "y": box.get("y"),
+            "width": box.get("width"),
+            "height": box.get("height"),
+        }
+        for key in self.keys:
+            if key in node:
+                clean[key] = node[key]
+        return clean
+
+    def children(self, node: Dict[str, Any], depth: int) -> Optional[List[Dict[str, Any]]]:
+        """The children kept below a node at `depth`, or None when it gets no "children" key."""
+        children = node.get("children")
+        if children is None or (self.max_depth is not None and depth >= self.max_depth):
+            return None
+        if self.skip_types:
+            return [c for c in children if c.get("type") not in self.skip_types]
+        return children
+
+DEFAULT_PROJECTION = Projection()
+
+def clean_figma_node(node: Dict[str, Any], projection: Projection = DEFAULT_PROJECTION) -> Dict[str, Any]:
+    """The cleaned tree as a dict (export_clean_ui_tree streams it to disk instead)."""
+    root = projection.project(node)
+    stack = [(node, root, 0)]
+    while stack:
+        n, clean, depth = stack.pop()
+        children = projection.children(n, depth)
+        if children is None:
+            continue
+        clean["children"] = kids = [projection.project(c) for c in children]
+        stack.extend((c, k, depth + 1) for c, k in zip(children, kids))
+    return root
+
+def iter_clean_json(node: Dict[str, Any], projection: Projection = DEFAULT_PROJECTION) -> Iterator[str]:
+    """
+    The cleaned tree as compact JSON, in chunks. Walks the Figma tree with an
+    explicit stack and encodes one projected node at a time, so the cleaned
+    tree never exists in memory.
+    """
+    encode = _ENCODER.encode
+    # (node, depth, separator) to open a node, or a string to close one
+    stack: List[Any] = [(node, 0, "")]
+    while stack:
+        item = stack.pop()
+        if type(item) is str:
+            yield item
+            continue
+        n, depth, sep = item
+        # the projected fields, left open for the children
+        head = encode(projection.project(n))[:-1]
+        children = projection.children(n, depth)
+        if children is None:
+            yield f"{sep}{head}}}"
+            continue
+        yield f'{sep}{head},"children":['
+        stack.append("]}")
+        stack.extend((children[i], depth + 1, "," if i else "") for i in range(len(children) - 1, -1, -1))
+
+def write_clean_json(node: Dict[str, Any], f: TextIO, projection: Projection = DEFAULT_PROJECTION,
+                     buffer: int = 1 << 16) -> int:
+    """Streams the cleaned tree into f, about `buffer` characters per write; returns the characters written."""
+    chunks: List[str] = []
+    pending = written = 0
+    for chunk in iter_clean_json(node, projection):
+        chunks.append(chunk)
+        pending += len(chunk)
+        if pending >= buffer:
+            f.write("".join(chunks))
+            written += pending
+            chunks.clear()
+            pending = 0
+    f.write("".join(chunks))
+    return written + pending
+
+def design_frame(figma_json: Dict[str, Any]) -> Dict[str, Any]:
     # Finding the outermost node
     root_node = figma_json.get("document") or figma_json.get("root") or figma_json
-    
+
     # Target the main design FRAME
-    design_frame = root_node
     if root_node.get("children") and root_node["children"][0].get("type") in ["FRAME", "CANVAS", "COMPONENT"]:
-        design_frame = root_node["children"][0]
-        
-    cleaned = clean_figma_node(design_frame)
+        return root_node["children"][0]
+    return root_node
+
+def export_clean_ui_tree(figma_json: Dict[str, Any], projection: Projection = DEFAULT_PROJECTION,
+                         node: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Writes UITree/ui.json for `node`, or for the design frame of `figma_json`
+    when no node is given. Returns the file's path.
+    """
+    if node is None:
+        node = design_frame(figma_json)
     os.makedirs(UI_TREE, exist_ok=True)
-    ui_file=os.path.join(UI_TREE, f"ui.json")
+    ui_file = os.path.join(UI_TREE, "ui.json")
     with open(ui_file, "w", encoding="utf-8") as f:
-        json.dump(cleaned, f, indent=2)
+        write_clean_json(node, f, projection)
     print(f"[OK] Exported cleaned UI tree to {ui_file}")
+    return ui_file
+
+def _csv(value: str) -> List[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export a cleaned Figma UI tree to UITree/ui.json.")
+    parser.add_argument("file_key", help="Figma file key")
+    parser.add_argument("node_id", nargs="?", help="Node to export (default: the file's first page)")
+    parser.add_argument("--node", help="Same as node_id")
+    parser.add_argument("--keys", type=_csv, default=list(STYLE_KEYS), metavar="KEYS",
+                        help="Comma-separated style and layout keys to keep (default: all of STYLE_KEYS)")
+    parser.add_argument("--max-depth", type=int, help="Levels of children to keep below the exported node")
+    parser.add_argument("--skip-types", type=_csv, default=[], metavar="TYPES",
+                        help="Comma-separated node types to leave out with their subtrees (e.g. VECTOR,LINE)")
+    args = parser.parse_args()
+    if args.node and args.node_id and args.node != args.node_id:
+        parser.error("node_id and --node name different nodes")
+    args.node = args.node or args.node_id
+    return args
 
 if __name__ == "__main__":
-    if len(sys.argv) <= 3:
-        print("Usage: python export_ui_tree.py <figma_json_file> <node_id>")
-        sys.exit(1)
-    
-    file_key = sys.argv[1]
-    node_id = sys.argv[2] if len(sys.argv) == 3 else None
-    node = get_figma_node(file_key, node_id, cache_dir="../cache")
-
-    export_clean_ui_tree({"document": node})
\ No newline at end of file
+    args = parse_args()
+    projection = Projection(args.keys, args.max_depth, args.skip_types)
+    node = get_figma_node(args.file_key, args.node, cache_dir="../cache")
+    if args.node and node.get("id") == args.node:
+        export_clean_ui_tree({}, projection, node=node)
+    else:
+        if args.node:
+            print("Node ID not found — exporting root")
+        export_clean_ui_tree({"document": node}, projection)
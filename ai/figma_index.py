@@ -0,0 +1,236 @@
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from figma_cache import temp_path
+
+INDEX_VERSION = 2
+
+# Sidecar layout (<file_key>.index):
+#   header   magic, version, size and mtime of the cache file it describes,
+#            record count, offset of the node list
+#   records  one fixed-width (key, start, end) per node, sorted by key, where
+#            key is a 64-bit hash of the node id; a lookup is a binary search
+#            over seeks, so it reads a few dozen bytes whatever the file's size
+#   nodes    JSON list of [id, type, name, parent] in document order, read
+#            only when nodes are listed
+_HEADER = struct.Struct("<4sIQqQQ")
+_RECORD = struct.Struct("<QQQ")
+_MAGIC = b"FIDX"
+
+# Position of each field in a node list entry
+ID, TYPE, NAME, PARENT = range(4)
+
+# Skips everything up to the next object brace or "id"/"type"/"name" key inside the
+# regex engine, so the Python loop only sees the tokens the index needs.
+_STRING = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+_INDEX_TOKEN = re.compile(
+    rb'(?:[^"{}]+|"(?!(?:id|type|name)"\s*:)[^"\\]*(?:\\.[^"\\]*)*")*'
+    rb'(?:([{}])|"(id|type|name)"\s*:\s*(' + _STRING + rb')?)'
+)
+
+# cache_file -> (stamp, node list), so repeated listings in one process skip the sidecar read
+_loaded: Dict[str, tuple] = {}
+
+
+def index_path(cache_file: str) -> str:
+    root, _ = os.path.splitext(cache_file)
+    return f"{root}.index"
+
+
+def _stamp(cache_file: str) -> Tuple[int, int]:
+    # size + mtime identify the cache contents the index was built from
+    st = os.stat(cache_file)
+    return st.st_size, st.st_mtime_ns
+
+
+def _key(node_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(node_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _unescape(raw: bytes) -> str:
+    return json.loads(b'"' + raw + b'"')
+
+
+def build_index(cache_file: str) -> str:
+    """
+    Scans a cached Figma JSON file once and writes `<file_key>.index` next to
+    it, recording every node's byte range, type, name and parent.
+    Returns the sidecar's path.
+    """
+    stamp = _stamp(cache_file)
+    # id -> [start, end, type, name, parent], in document order
+    nodes: Dict[str, list] = {}
+    # one frame per open object: [start, id, type, name, is_node]
+    stack: list[list] = []
+    with open(cache_file, "rb") as f:
+        if stamp[0]:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for m in _INDEX_TOKEN.finditer(mm):
+                    brace = m.group(1)
+                    if brace == b"{":
+                        stack.append([m.start(1), None, None, None, False])
+                    elif brace == b"}":
+                        if not stack:
+                            continue
+                        frame = stack.pop()
+                        if frame[4]:
+                            nodes[frame[1]][1] = m.end()
+                    elif m.group(3) is not None and stack:
+                        key = m.group(2)
+                        frame = stack[-1]
+                        value = _unescape(m.group(3)[1:-1])
+                        if key == b"name":
+                            frame[3] = value
+                            if frame[4]:
+                                nodes[frame[1]][3] = value
+                            continue
+                        frame[1 if key == b"id" else 2] = value
+                        # a node has both an id and a real type, unlike instance `overrides`
+                        # entries and VARIABLE_ALIAS references
+                        if not frame[4] and frame[1] is not None and frame[2] not in (None, "VARIABLE_ALIAS"):
+                            frame[4] = True
+                            parent = next((s[1] for s in reversed(stack[:-1]) if s[4]), None)
+                            # registered on open, so the index keeps document order
+                            nodes[frame[1]] = [frame[0], None, frame[2], frame[3], parent]
+
+    records = sorted((_key(nid), e[0], e[1]) for nid, e in nodes.items())
+    listing = json.dumps([[nid, e[2], e[3], e[4]] for nid, e in nodes.items()], separators=(",", ":"))
+    path = index_path(cache_file)
+    tmp = temp_path(path)
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, INDEX_VERSION, stamp[0], stamp[1], len(records),
+                             _HEADER.size + len(records) * _RECORD.size))
+        f.write(b"".join(_RECORD.pack(*r) for r in records))
+        f.write(listing.encode("utf-8"))
+    os.replace(tmp, path)
+    # the JSON sidecar written by earlier versions
+    legacy = f"{os.path.splitext(cache_file)[0]}.index.json"
+    if os.path.exists(legacy):
+        os.remove(legacy)
+    _loaded.pop(cache_file, None)
+    print(f"[INDEX] Indexed {len(nodes)} nodes → {path}")
+    return path
+
+
+def _read_header(f, stamp: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+    raw = f.read(_HEADER.size)
+    if len(raw) != _HEADER.size:
+        return None
+    magic, version, size, mtime, count, listing_at = _HEADER.unpack(raw)
+    if magic != _MAGIC or version != INDEX_VERSION or (size, mtime) != stamp:
+        return None
+    return count, listing_at
+
+
+def has_index(cache_file: str) -> bool:
+    """True when the sidecar exists and matches the cache file as it is now; never builds it."""
+    try:
+        with open(index_path(cache_file), "rb") as f:
+            return _read_header(f, _stamp(cache_file)) is not None
+    except OSError:
+        return False
+
+
+def _open_index(cache_file: str):
+    """
+    The open sidecar and its (record count, node list offset), rebuilding it
+    when it's missing or the cache file changed since it was written.
+    """
+    stamp = _stamp(cache_file)
+    path = index_path(cache_file)
+    for attempt in range(2):
+        try:
+            f = open(path, "rb")
+        except OSError:
+            f = None
+        if f is not None:
+            header = _read_header(f, stamp)
+            if header is not None:
+                return f, header
+            f.close()
+        if attempt == 0:
+            build_index(cache_file)
+    raise OSError(f"could not index {cache_file}")
+
+
+def _ranges(f, count: int, key: int) -> Iterator[Tuple[int, int]]:
+    """Byte ranges of the records with `key`, found by binary search over the sorted records."""
+    lo, hi = 0, count
+    while lo < hi:
+        mid = (lo + hi) // 2
+        f.seek(_HEADER.size + mid * _RECORD.size)
+        if _RECORD.unpack(f.read(_RECORD.size))[0] < key:
+            lo = mid + 1
+        else:
+            hi = mid
+    f.seek(_HEADER.size + lo * _RECORD.size)
+    for _ in range(lo, count):
+        k, start, end = _RECORD.unpack(f.read(_RECORD.size))
+        if k != key:
+            return
+        yield start, end
+
+
+def read_node(cache_file: str, node_id: str) -> Optional[Dict[str, Any]]:
+    """Looks a node's byte range up in the sidecar, then seeks to it and parses only that subtree."""
+    f, (count, _) = _open_index(cache_file)
+    with f, open(cache_file, "rb") as src:
+        for start, end in _ranges(f, count, _key(node_id)):
+            src.seek(start)
+            node = json.loads(src.read(end - start))
+            # two ids can share a key; the parsed node settles which one this is
+            if node.get("id") == node_id:
+                return node
+    return None
+
+
+def _listing(cache_file: str) -> List[list]:
+    stamp = _stamp(cache_file)
+    hit = _loaded.get(cache_file)
+    if hit and hit[0] == stamp:
+        return hit[1]
+    f, (_, listing_at) = _open_index(cache_file)
+    with f:
+        f.seek(listing_at)
+        entries = json.loads(f.read())
+    _loaded[cache_file] = (stamp, entries)
+    return entries
+
+
+def list_nodes(cache_file: str, node_type: Optional[str] = None, page: Optional[str] = None,
+               top_level: bool = False) -> List[Dict[str, Any]]:
+    """
+    Lists indexed nodes in document order, without parsing any of them.
+      - node_type: only nodes of this Figma type (e.g. "FRAME")
+      - page: only nodes on the page with this id or name
+      - top_level: only direct children of a page
+    """
+    entries = _listing(cache_file)
+    by_id = {e[ID]: e for e in entries}
+    page_ids = None
+    if page is not None:
+        page_ids = {e[ID] for e in entries if e[TYPE] == "CANVAS" and page in (e[ID], e[NAME])}
+
+    def page_of(entry: list) -> Optional[str]:
+        # walk parents up to the CANVAS (page) that contains the node
+        while entry is not None:
+            if entry[TYPE] == "CANVAS":
+                return entry[ID]
+            entry = by_id.get(entry[PARENT])
+        return None
+
+    result = []
+    for e in entries:
+        if node_type and e[TYPE] != node_type:
+            continue
+        if top_level and (e[PARENT] is None or by_id[e[PARENT]][TYPE] != "CANVAS"):
+            continue
+        if page_ids is not None and page_of(e) not in page_ids:
+            continue
+        result.append({"id": e[ID], "type": e[TYPE], "name": e[NAME], "parent": e[PARENT]})
+    return result
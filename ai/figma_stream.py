@@ -0,0 +1,96 @@
+import codecs
+import json
+import mmap
+import re
+from typing import Any, Dict, Iterator, Optional
+
+# Initial window decoded around a node; doubled until the subtree fits.
+CHUNK_SIZE = 64 * 1024
+
+# A JSON string, or a key/string-value pair, or an object brace.
+_TOKEN = re.compile(rb'"([^"\\]*(?:\\.[^"\\]*)*)"\s*:\s*("[^"\\]*(?:\\.[^"\\]*)*")|"[^"\\]*(?:\\.[^"\\]*)*"|[{}]')
+
+
+def _needle(node_id: str) -> bytes:
+    # ids are plain ascii ("1:75", "I1:2;3:4"), so this matches how json.dump writes them
+    return json.dumps(node_id).encode("ascii")
+
+
+def is_node(obj: Any) -> bool:
+    """
+    Nodes carry both "id" and "type"; this rules out other id-bearing objects
+    such as instance `overrides` entries and VARIABLE_ALIAS references.
+    """
+    return isinstance(obj, dict) and "id" in obj and obj.get("type") not in (None, "VARIABLE_ALIAS")
+
+
+def _scan_for_objects(mm, needle: bytes) -> Iterator[int]:
+    """
+    Slow path: walks every token and tracks open objects, for files where
+    "id" is not the first key of a node.
+    """
+    stack: list[int] = []
+    for m in _TOKEN.finditer(mm):
+        tok = m.group(0)
+        if tok == b"{":
+            stack.append(m.start())
+        elif tok == b"}":
+            if stack:
+                stack.pop()
+        elif m.group(1) == b"id" and m.group(2) == needle and stack:
+            yield stack[-1]
+
+
+def _candidates(mm, needle: bytes) -> Iterator[int]:
+    # Figma serializes "id" as the first key of each node, so `{"id": "<node_id>"`
+    # can only match at a real object start (an escaped quote can't open a key).
+    for m in re.finditer(rb'\{\s*"id"\s*:\s*' + re.escape(needle), mm):
+        yield m.start()
+    yield from _scan_for_objects(mm, needle)
+
+
+def find_node(mm, node_id: str) -> Optional[tuple]:
+    """
+    Returns (offset, subtree) for the node with `node_id`, where offset is the
+    byte position of the '{' that opens it.
+    """
+    for start in _candidates(mm, _needle(node_id)):
+        obj = decode_object_at(mm, start)
+        if is_node(obj):
+            return start, obj
+    return None
+
+
+def decode_object_at(mm, start: int, chunk_size: int = CHUNK_SIZE) -> Any:
+    """
+    Decodes the single JSON value starting at `start`, reading a growing window
+    instead of the rest of the file.
+    """
+    decoder = json.JSONDecoder()
+    size = chunk_size
+    total = len(mm)
+    while True:
+        end = min(start + size, total)
+        # incremental decoder so a window cut inside a multi-byte char still decodes
+        text = codecs.getincrementaldecoder("utf-8")().decode(mm[start:end], final=end >= total)
+        try:
+            value, _ = decoder.raw_decode(text)
+            return value
+        except json.JSONDecodeError:
+            if end >= total:
+                raise
+            size *= 2
+
+
+def load_subtree(path: str, node_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Loads only the subtree of `node_id` from a cached Figma JSON file.
+    The file is memory-mapped and searched without parsing, so memory and time
+    follow the size of the requested node rather than the whole document.
+    """
+    with open(path, "rb") as f:
+        if f.seek(0, 2) == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            found = find_node(mm, node_id)
+            return found[1] if found else None
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from figma_cache import temp_path
+
+# Responses of earlier OpenAI calls, one file per request:
+#   cache/llm/<blake2b of model + sampling settings + messages>.json
+# Reading an entry bumps its mtime, so eviction drops the least recently used first.
+LLM_CACHE_DIR = "../cache/llm"
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+
+def cache_key(model: str, messages: List[Dict[str, str]], **sampling: Any) -> str:
+    """Hash of everything that determines a completion: model, sampling settings and messages."""
+    request = {"model": model, "messages": messages, "sampling": sampling}
+    body = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.blake2b(body.encode("utf-8"), digest_size=20).hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk completion cache capped at `max_bytes`.
+    Entries are written to a temp file and renamed into place, and eviction
+    tolerates files another run removed first, so concurrent runs can share it.
+    """
+
+    def __init__(self, directory: str = LLM_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "evicted": 0}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The cached entry ({"content", "model", "seconds", "created"}), or None."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # mark as recently used
+        except (OSError, ValueError):
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return entry
+
+    def put(self, key: str, content: str, model: str, seconds: float) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        entry = {"content": content, "model": model, "seconds": seconds, "created": time.time()}
+        path = self._path(key)
+        tmp = temp_path(path)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+        self.evict()
+
+    def discard(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def evict(self) -> None:
+        """Removes the least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue  # removed by a concurrent run
+            entries.append((st.st_mtime_ns, st.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+                self.stats["evicted"] += 1
+            except OSError:
+                pass
+            total -= size
+
+    def format_stats(self) -> str:
+        return f"{self.stats['hits']} hits, {self.stats['misses']} misses, {self.stats['evicted']} evicted"
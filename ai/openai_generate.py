@@ -1,8 +1,14 @@
+import argparse
 import json
 import os
 import re
+import time
 from pathlib import Path
-from openai import OpenAI
+import profiling
+from profiling import count, stage
+from llm_cache import DEFAULT_MAX_BYTES, LLM_CACHE_DIR, ResponseCache, cache_key
+from prompt_encoding import encode_tree, estimate_tokens, format_report
+from stream_output import SectionSplitter
 
 MODEL = "gpt-4.1-mini"
 TEMPERATURE = 0.1
@@ -12,6 +18,8 @@ HTML_FILENAME = "output.html"
 CSS_FILE = os.path.join(OUTPUT_DIR, CSS_FILENAME)
 HTML_FILE = os.path.join(OUTPUT_DIR, HTML_FILENAME)
 UI_TREE_PATH = "UITree/ui.json"
+# estimated tokens for the encoded UI tree; deeper subtrees are summarized above it
+PROMPT_TOKEN_BUDGET = 12000
 
 
 # Load UI Tree
@@ -47,26 +55,8 @@ def get_contrast_background(ui_tree: dict) -> str:
 
 
 
-def call_openai(ui_tree: dict, contrast_bg: str):
-    if not os.getenv("OPENAI_API_KEY"):
-        raise ValueError("OPENAI_API_KEY environment variable not set.")
-        
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-    prompt = f"""
-You are an expert senior frontend engineer specializing in pixel-perfect,
-data-faithful conversion of structured Figma JSON trees into HTML and CSS.
-
-You will receive a CLEANED UI tree. You MUST obey the data exactly.
-
-------------------------------------------------------------
-ABSOLUTE RULES (DO NOT VIOLATE):
-------------------------------------------------------------
-1.  **FRAME HANDLING**
-    - The root node of the JSON MUST become a centered container
-      with: `position: relative`, fixed pixel width & height, overflow hidden.
-
-2.  **POSITIONING**
+# Rules shared by the full-page prompt and the per-region prompts (region_fanout.py)
+ELEMENT_RULES = """2.  **POSITIONING**
     - If a node has explicit x/y coordinates → YOU MUST use:
         position: absolute;
         top: <y>px;
@@ -108,7 +98,37 @@ ABSOLUTE RULES (DO NOT VIOLATE):
     - EXACT fills (convert Figma RGB to CSS rgba)
     - EXACT shadows & blurs
 
-7.  **GENERALIZED BACKGROUND**
+"""
+
+ENCODING_RULES = """9.  **TREE ENCODING**
+    - The tree is under "tree". Paints and text styles used several times are
+      listed once under "legend"; a fills/strokes entry or "style" such as "P0"
+      or "T0" refers to that legend entry.
+    - Solid paints are already CSS colors. A property that is missing has its
+      Figma default (opacity 1, no strokes, no effects, no padding, no auto-layout).
+    - A node with "omittedNodes" had its children left out to save space;
+      "omittedText" is the text they contained. Render it as one plain block
+      inside the node.
+
+"""
+
+
+# Build the user prompt around the encoded UI tree
+def build_prompt(tree_text: str, contrast_bg: str) -> str:
+    return f"""
+You are an expert senior frontend engineer specializing in pixel-perfect,
+data-faithful conversion of structured Figma JSON trees into HTML and CSS.
+
+You will receive a CLEANED UI tree. You MUST obey the data exactly.
+
+------------------------------------------------------------
+ABSOLUTE RULES (DO NOT VIOLATE):
+------------------------------------------------------------
+1.  **FRAME HANDLING**
+    - The root node of the JSON MUST become a centered container
+      with: `position: relative`, fixed pixel width & height, overflow hidden.
+
+{ELEMENT_RULES}7.  **GENERALIZED BACKGROUND**
     - The <body> background MUST be: {contrast_bg}
     - The main frame must be centered both horizontally and vertically.
 
@@ -116,7 +136,7 @@ ABSOLUTE RULES (DO NOT VIOLATE):
     - You MUST include:
         * {{ box-sizing: border-box; margin: 0; padding:0; }}
 
-------------------------------------------------------------
+{ENCODING_RULES}------------------------------------------------------------
 OUTPUT FORMAT (DO NOT BREAK FORMAT):
 ------------------------------------------------------------
 
@@ -130,19 +150,108 @@ OUTPUT FORMAT (DO NOT BREAK FORMAT):
 
 Now produce HTML + CSS from the following UI tree:
 
-{json.dumps(ui_tree, indent=2)}
+{tree_text}
 """
 
+
+def build_messages(prompt: str):
+    return [
+        {"role": "system", "content": "You are a specialized AI that converts structured JSON UI trees into pixel-perfect HTML and CSS code."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+# Cache key of a request: the messages, the model and the sampling settings
+def request_key(prompt: str) -> str:
+    return cache_key(MODEL, build_messages(prompt), temperature=TEMPERATURE)
+
+
+def openai_client():
+    if not os.getenv("OPENAI_API_KEY"):
+        raise ValueError("OPENAI_API_KEY environment variable not set.")
+
+    # imported on first call: loading the SDK is most of this script's startup time
+    from openai import OpenAI
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+
+def call_openai(prompt: str, client=None, cache: ResponseCache | None = None):
+    """
+    Sends the prompt, or answers it from `cache` when the same request was made before.
+    `client` is anything with OpenAI's chat.completions.create (tests pass a fake one).
+    """
+    key = request_key(prompt)
+    if cache is not None:
+        entry = cache.get(key)
+        if entry is not None:
+            print(f"[LLM CACHE] Hit {key[:12]}, saved ~{entry['seconds']:.1f}s")
+            count("llm_cache_hits")
+            return entry["content"]
+        count("llm_cache_misses")
+
+    client = client or openai_client()
+    start = time.perf_counter()
     response = client.chat.completions.create(
         model=MODEL,
         temperature=TEMPERATURE,
-        messages=[
-            {"role": "system", "content": "You are a specialized AI that converts structured JSON UI trees into pixel-perfect HTML and CSS code."},
-            {"role": "user", "content": prompt}
-        ]
+        messages=build_messages(prompt)
     )
-
-    return response.choices[0].message.content
+    content = response.choices[0].message.content
+    seconds = time.perf_counter() - start
+
+    if cache is not None:
+        cache.put(key, content, MODEL, seconds)
+        print(f"[LLM CACHE] Miss {key[:12]}, call took {seconds:.1f}s; cached")
+    return content
+
+
+def stream_openai(prompt: str, client=None, cache: ResponseCache | None = None):
+    """
+    Streams the completion straight into HTML_FILE and CSS_FILE as it arrives,
+    splitting the sections on the fly (see SectionSplitter).
+    Returns timings: seconds to the first chunk, total seconds, chunks and bytes written.
+    Raises ValueError, after writing what it could, when the markers are missing.
+    """
+    key = request_key(prompt)
+    entry = cache.get(key) if cache is not None else None
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    start = time.perf_counter()
+    first = None
+    parts = []
+    with open(HTML_FILE, "w", encoding="utf-8") as html_out, open(CSS_FILE, "w", encoding="utf-8") as css_out:
+        splitter = SectionSplitter(html_out, css_out)
+        if entry is not None:
+            print(f"[LLM CACHE] Hit {key[:12]}, saved ~{entry['seconds']:.1f}s")
+            count("llm_cache_hits")
+            parts.append(entry["content"])
+            first = time.perf_counter() - start
+            splitter.feed(entry["content"])
+        else:
+            if cache is not None:
+                count("llm_cache_misses")
+            stream = (client or openai_client()).chat.completions.create(
+                model=MODEL,
+                temperature=TEMPERATURE,
+                messages=build_messages(prompt),
+                stream=True
+            )
+            for chunk in stream:
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                if not text:
+                    continue
+                if first is None:
+                    first = time.perf_counter() - start
+                parts.append(text)
+                splitter.feed(text)
+        splitter.close()
+    seconds = time.perf_counter() - start
+
+    if cache is not None and entry is None:
+        cache.put(key, "".join(parts), MODEL, seconds)
+        print(f"[LLM CACHE] Miss {key[:12]}, call took {seconds:.1f}s; cached")
+    return {"first_chunk": first, "seconds": seconds, "chunks": len(parts),
+            "html": splitter.written["html"], "css": splitter.written["css"]}
 
 
 # Parse HTML + CSS from resposne generated
@@ -164,17 +273,77 @@ def split_output(text: str):
     return html, css
 
 # Write files into the output directory
-os.makedirs(OUTPUT_DIR, exist_ok=True)
 def save_files(html, css):
-    Path(HTML_FILE).write_text(html, encoding="utf-8")
-    Path(CSS_FILE).write_text(css, encoding="utf-8")
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    with stage("write") as s:
+        s["bytes"] = Path(HTML_FILE).write_text(html, encoding="utf-8") + Path(CSS_FILE).write_text(css, encoding="utf-8")
     print(f"Saved {HTML_FILE} and {CSS_FILE} in the '{OUTPUT_DIR}' directory.")
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate HTML + CSS from UITree/ui.json with OpenAI.")
+    parser.add_argument("--token-budget", type=int, default=PROMPT_TOKEN_BUDGET,
+                        help="Estimated tokens allowed for the UI tree; deeper subtrees are summarized above it")
+    parser.add_argument("--no-cache", action="store_true",
+                        help=f"Always call OpenAI instead of reusing a cached response from {LLM_CACHE_DIR}")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_MAX_BYTES / 2**20,
+                        help="Size cap of the response cache; least recently used entries go first")
+    parser.add_argument("--stream", action="store_true",
+                        help=f"Write {HTML_FILENAME} and {CSS_FILENAME} progressively while the response streams in")
+    parser.add_argument("--regions", action="store_true",
+                        help="Generate the frame's top-level regions concurrently and stitch them into one page")
+    parser.add_argument("--region-tokens", type=int, default=3000,
+                        help="Target size of a region in estimated tokens (--regions)")
+    parser.add_argument("--concurrency", type=int, default=4, help="OpenAI calls in flight (--regions)")
+    parser.add_argument("--dry-run", action="store_true", help="Encode the tree and report its size without calling OpenAI")
+    profiling.add_arguments(parser)
+    return parser.parse_args()
+
+
+def generate_by_region(args, ui_tree: dict, contrast_bg: str, cache: ResponseCache | None):
+    # imported here: only the fan-out mode needs asyncio and the region prompts
+    from region_fanout import format_fanout_report, generate_regions, plan_regions
+
+    if args.dry_run:
+        with stage("prompt") as s:
+            plans = plan_regions(ui_tree, args.token_budget, args.region_tokens)
+            s["regions"] = len(plans)
+        for i, plan in enumerate(plans):
+            print(f"  region r{i}: {plan['nodes']} top-level node(s), {format_report(plan['report'])}, "
+                  f"prompt ~{estimate_tokens(plan['prompt'])} tokens")
+        return
+
+    print(f"[3] Generating regions with up to {args.concurrency} concurrent OpenAI calls…")
+    # region prompts are built inside, so this stage covers prompt building too
+    with stage("llm") as s:
+        html, css, report = generate_regions(ui_tree, contrast_bg, args.token_budget, args.region_tokens,
+                                             args.concurrency, cache=cache)
+        s["regions"] = report["regions"]
+        s["prompt_tokens"] = report["prompt_tokens"]
+    print(f"[4] {format_fanout_report(report)}")
+
+    print("[5] Writing files…")
+    save_files(html, css)
+    print(f"\nSUCCESS! Open {HTML_FILE} in your browser to view the result generated!\n")
+
+
 def main():
+    args = parse_args()
+    if profiling.setup(args):
+        try:
+            run(args)
+        finally:
+            profiling.finish()
+    else:
+        run(args)
+
+
+def run(args):
     try:
         print(f"[1] Loading UI tree from {UI_TREE_PATH}…")
-        ui_tree = load_ui_json(UI_TREE_PATH)
+        with stage("load") as s:
+            ui_tree = load_ui_json(UI_TREE_PATH)
+            s["bytes"] = os.path.getsize(UI_TREE_PATH)
     except FileNotFoundError:
         print(f"[ERROR] UI tree file not found at {UI_TREE_PATH}. Did you run 'python export_ui_tree.py <figma_json_file>' first?")
         return
@@ -183,20 +352,63 @@ def main():
     contrast_bg = get_contrast_background(ui_tree)
     print(f"[2] Determined generalized contrast background: {contrast_bg}")
 
-    print("[3] Calling OpenAI to generate code…")
+    cache = None if args.no_cache else ResponseCache(LLM_CACHE_DIR, int(args.cache_max_mb * 2**20))
+    if args.regions:
+        generate_by_region(args, ui_tree, contrast_bg, cache)
+        return
+
+    # Compact encoding: defaults dropped, repeated paints/text styles in a legend
+    with stage("prompt") as s:
+        tree_text, report = encode_tree(ui_tree, args.token_budget)
+        prompt = build_prompt(tree_text, contrast_bg)
+        s["tree_tokens"] = report["tokens"]
+        s["omitted"] = report["omitted"]
+        s["tokens"] = estimate_tokens(prompt)
+    print(f"[3] Encoded UI tree: {format_report(report)}; prompt ~{estimate_tokens(prompt)} tokens")
+    if report["over_budget"]:
+        print(f"[ERROR] The UI tree doesn't fit in {args.token_budget} tokens even summarized; raise --token-budget.")
+        return
+    if args.dry_run:
+        return
+
+    if args.stream:
+        print(f"[4] Streaming from OpenAI into {OUTPUT_DIR}/…")
+        try:
+            # parsing and writing happen while the response streams, inside this stage
+            with stage("llm") as s:
+                timing = stream_openai(prompt, cache=cache)
+                s["first_chunk"] = round(timing["first_chunk"], 6) if timing["first_chunk"] is not None else None
+                s["bytes"] = timing["html"] + timing["css"]
+        except Exception as e:
+            print(f"[ERROR] OpenAI streaming failed: {e}")
+            return
+        first = f"{timing['first_chunk']:.2f}s" if timing["first_chunk"] is not None else "n/a"
+        print(f"[STREAM] First chunk after {first}, done in {timing['seconds']:.2f}s: "
+              f"{timing['chunks']} chunks, {timing['html']} chars of HTML, {timing['css']} chars of CSS")
+        print(f"\nSUCCESS! Open {HTML_FILE} in your browser to view the result generated!\n")
+        return
+
+    print("[4] Calling OpenAI to generate code…")
     try:
-        response_text = call_openai(ui_tree, contrast_bg)
+        with stage("llm") as s:
+            response_text = call_openai(prompt, cache=cache)
+            s["bytes"] = len(response_text)
     except Exception as e:
         print(f"[ERROR] OpenAI API call failed: {e}")
         return
 
-    print("[4] Parsing output…")
+    print("[5] Parsing output…")
     try:
-        html, css = split_output(response_text)
-    except ValueError:
+        with stage("parse"):
+            html, css = split_output(response_text)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        if cache is not None:
+            # don't serve the same unusable response on the next run
+            cache.discard(request_key(prompt))
         return
 
-    print("[5] Writing files…")
+    print("[6] Writing files…")
     save_files(html, css)
 
     print(f"\nSUCCESS! Open {HTML_FILE} in your browser to view the result generated!\n")
@@ -0,0 +1,222 @@
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+# Per-stage profiling behind --profile: wall time, CPU time and peak traced
+# memory of each stage, plus counters (nodes, bytes, cache hits and misses),
+# written out as one JSON trace. Stages nest; each records its depth and parent.
+# When profiling is off, stage() returns a shared no-op object, so the
+# instrumented code pays a function call per stage and nothing else.
+# tracemalloc and cProfile are imported only when profiling is on.
+
+DEFAULT_TRACE = "profile.json"
+
+
+class _NullStage:
+    def __enter__(self) -> "_NullStage":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        pass
+
+    def add(self, key: str, n: int = 1) -> None:
+        pass
+
+
+_NULL = _NullStage()
+_profiler: Optional["Profiler"] = None
+
+
+class Stage:
+    """One timed stage; item assignment and add() attach counters to it."""
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+        self.record: Dict[str, Any] = {"name": name}
+        self.peak = 0
+        self.cprofile = None
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.record[key] = value
+
+    def add(self, key: str, n: int = 1) -> None:
+        self.record[key] = self.record.get(key, 0) + n
+
+    def __enter__(self) -> "Stage":
+        p = self.profiler
+        parent = p.stack[-1] if p.stack else None
+        self.record["depth"] = len(p.stack)
+        if parent:
+            self.record["parent"] = parent.name
+        if p.memory:
+            import tracemalloc
+            current, peak = tracemalloc.get_traced_memory()
+            if parent:
+                parent.peak = max(parent.peak, peak)
+            tracemalloc.reset_peak()
+            self.mem_start = current
+        p.stack.append(self)
+        p.events.append(self.record)
+        if self.name in p.cprofile_stages and not p.cprofiling:
+            import cProfile
+            self.cprofile = cProfile.Profile()
+            p.cprofiling = True
+            self.cprofile.enable()
+        self.record["start"] = round(time.perf_counter() - p.started, 6)
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        p = self.profiler
+        if self.cprofile:
+            self.cprofile.disable()
+        self.record["wall"] = round(wall, 6)
+        self.record["cpu"] = round(cpu, 6)
+        if p.memory:
+            import tracemalloc
+            current, peak = tracemalloc.get_traced_memory()
+            # a nested stage reset the peak, so its maximum was handed up to us
+            self.record["peak_bytes"] = max(self.peak, peak) - self.mem_start
+            self.record["retained_bytes"] = current - self.mem_start
+            tracemalloc.reset_peak()
+            parent = p.stack[-2] if len(p.stack) > 1 else None
+            if parent:
+                parent.peak = max(parent.peak, self.peak, peak)
+        if exc[0] is not None:
+            self.record["error"] = exc[0].__name__
+        p.stack.pop()
+        if self.cprofile:
+            p.cprofiling = False
+            path = p.cprofile_path(self.name)
+            self.cprofile.dump_stats(path)
+            self.record["cprofile"] = path
+        return False
+
+
+class Profiler:
+    def __init__(self, trace_path: str = DEFAULT_TRACE, memory: bool = True,
+                 cprofile_stages: Iterable[str] = ()):
+        self.trace_path = trace_path
+        self.memory = memory
+        self.cprofile_stages = set(cprofile_stages)
+        self.cprofiling = False
+        self.events: List[Dict[str, Any]] = []
+        self.counters: Dict[str, int] = {}
+        self.stack: List[Stage] = []
+        self.dumps: Dict[str, int] = {}
+        directory = os.path.dirname(trace_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if memory:
+            import tracemalloc
+            tracemalloc.start()
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+        self.created = time.strftime("%Y-%m-%dT%H:%M:%S")
+
+    def cprofile_path(self, name: str) -> str:
+        """<trace>.<stage>.prof, numbered from the second run of the same stage on."""
+        n = self.dumps.get(name, 0)
+        self.dumps[name] = n + 1
+        stem = os.path.splitext(self.trace_path)[0]
+        return f"{stem}.{name}{f'.{n}' if n else ''}.prof"
+
+    def trace(self) -> Dict[str, Any]:
+        trace = {
+            "command": sys.argv,
+            "created": self.created,
+            "wall": round(time.perf_counter() - self.started, 6),
+            "cpu": round(time.process_time() - self.cpu_started, 6),
+            "stages": self.events,
+            "counters": self.counters,
+        }
+        if self.memory:
+            import tracemalloc
+            trace["traced_bytes"] = tracemalloc.get_traced_memory()[0]
+        return trace
+
+    def write(self) -> Dict[str, Any]:
+        trace = self.trace()
+        with open(self.trace_path, "w", encoding="utf-8") as f:
+            json.dump(trace, f, indent=2)
+        return trace
+
+
+def enable(trace_path: str = DEFAULT_TRACE, memory: bool = True, cprofile_stages: Iterable[str] = ()) -> Profiler:
+    global _profiler
+    _profiler = Profiler(trace_path, memory, cprofile_stages)
+    return _profiler
+
+
+def enabled() -> bool:
+    return _profiler is not None
+
+
+def stage(name: str):
+    """Context manager timing one stage; a no-op unless profiling is enabled."""
+    return Stage(_profiler, name) if _profiler is not None else _NULL
+
+
+def count(key: str, n: int = 1) -> None:
+    """Adds to a run-wide counter (e.g. cache hits)."""
+    if _profiler is not None:
+        _profiler.counters[key] = _profiler.counters.get(key, 0) + n
+
+
+def format_trace(trace: Dict[str, Any]) -> str:
+    lines = [f"{'stage':<24} {'wall ms':>10} {'cpu ms':>10} {'peak MB':>9}  counters"]
+    for e in trace["stages"]:
+        extra = {k: v for k, v in e.items()
+                 if k not in ("name", "depth", "parent", "start", "wall", "cpu", "peak_bytes", "retained_bytes")}
+        peak = f"{e['peak_bytes'] / 1e6:>9.1f}" if "peak_bytes" in e else f"{'':>9}"
+        name = "  " * e["depth"] + e["name"]
+        lines.append(f"{name:<24} {e['wall'] * 1000:>10.1f} {e['cpu'] * 1000:>10.1f} {peak}  "
+                     + ", ".join(f"{k}={v}" for k, v in extra.items()))
+    lines.append(f"{'total':<24} {trace['wall'] * 1000:>10.1f} {trace['cpu'] * 1000:>10.1f}")
+    if trace["counters"]:
+        lines.append(", ".join(f"{k}={v}" for k, v in sorted(trace["counters"].items())))
+    return "\n".join(lines)
+
+
+def finish() -> Optional[str]:
+    """Writes the trace and prints a summary; returns the trace path (None when profiling is off)."""
+    global _profiler
+    if _profiler is None:
+        return None
+    trace = _profiler.write()
+    path = _profiler.trace_path
+    if _profiler.memory:
+        import tracemalloc
+        tracemalloc.stop()
+    _profiler = None
+    print(f"[PROFILE] Stages:\n{format_trace(trace)}")
+    print(f"[PROFILE] Trace written to {path}")
+    return path
+
+
+def add_arguments(parser) -> None:
+    """The --profile options, shared by both pipelines' command lines."""
+    parser.add_argument("--profile", nargs="?", const=DEFAULT_TRACE, metavar="TRACE",
+                        help=f"Record per-stage time, CPU and memory into a JSON trace (default {DEFAULT_TRACE})")
+    parser.add_argument("--profile-no-memory", action="store_true",
+                        help="Leave memory out of the trace (tracemalloc slows the run down)")
+    parser.add_argument("--cprofile", default="", metavar="STAGES",
+                        help="Comma-separated stages to also dump as cProfile stats next to the trace (--profile)")
+
+
+def setup(args) -> bool:
+    """Enables profiling when --profile was given; returns whether it was."""
+    if not args.profile:
+        return False
+    stages = [s.strip() for s in args.cprofile.split(",") if s.strip()]
+    enable(args.profile, memory=not args.profile_no_memory, cprofile_stages=stages)
+    return True
@@ -0,0 +1,352 @@
+import json
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Compact encoding of the cleaned UI tree (UITree/ui.json) for the OpenAI prompt.
+#   - default values are dropped (empty effects/strokes, opacity 1, NORMAL blend mode, zero padding, ...)
+#   - geometry is rounded, colors become CSS rgba() strings
+#   - paints and text styles used more than once are listed once in a legend
+#     and referenced by key ("P0", "T0") from the nodes
+#   - above the token budget, the deepest subtrees are summarized instead of sent whole,
+#     largest first
+
+# rough size of a token for JSON-heavy prompts; good enough to budget against
+CHARS_PER_TOKEN = 4
+
+GEOMETRY_KEYS = ("x", "y", "width", "height")
+
+_MISSING = object()
+
+# values Figma uses when a property isn't set; leaving them out changes nothing
+DEFAULTS = {
+    "opacity": 1,
+    "cornerRadius": 0,
+    "cornerSmoothing": 0,
+    "itemSpacing": 0,
+    "paddingTop": 0,
+    "paddingBottom": 0,
+    "paddingLeft": 0,
+    "paddingRight": 0,
+    "layoutGrow": 0,
+    "layoutAlign": "INHERIT",
+    "primaryAxisAlignItems": "MIN",
+    "counterAxisAlignItems": "MIN",
+    "layoutMode": "NONE",
+}
+
+# auto-layout settings mean nothing without a layoutMode
+AUTO_LAYOUT_KEYS = ("itemSpacing", "primaryAxisAlignItems", "counterAxisAlignItems",
+                    "primaryAxisSizingMode", "counterAxisSizingMode")
+
+# the part of a Figma text style the prompt rules use, with the defaults to drop
+TEXT_STYLE_DEFAULTS = {
+    "fontFamily": None,
+    "fontWeight": None,
+    "fontSize": None,
+    "lineHeightPx": None,
+    "letterSpacing": 0,
+    "italic": False,
+    "textAlignHorizontal": "LEFT",
+    "textAlignVertical": "TOP",
+    "textCase": "ORIGINAL",
+    "textDecoration": "NONE",
+}
+
+# characters of descendant text kept in a summarized subtree
+SUMMARY_TEXT_LIMIT = 120
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _num(v: Any, digits: int = 1) -> Any:
+    if not isinstance(v, float):
+        return v
+    v = round(v, digits)
+    return int(v) if v.is_integer() else v
+
+
+def _rgba(c: Dict[str, Any], opacity: Optional[float] = None) -> str:
+    r, g, b = (int(round(c.get(k, 0) * 255)) for k in ("r", "g", "b"))
+    a = c.get("a", 1.0) if opacity is None else c.get("a", 1.0) * opacity
+    a = _num(a, 2)
+    return f"rgb({r},{g},{b})" if a == 1 else f"rgba({r},{g},{b},{a})"
+
+
+def _paint(p: Dict[str, Any]) -> Any:
+    """One Figma paint as a CSS color string (solid) or a small dict (everything else)."""
+    t = p.get("type")
+    opacity = p.get("opacity")
+    if t == "SOLID":
+        return _rgba(p.get("color", {}), opacity)
+    out: Dict[str, Any] = {"type": t}
+    if p.get("gradientStops"):
+        out["stops"] = [[_rgba(s.get("color", {})), _num(s.get("position", 0), 3)] for s in p["gradientStops"]]
+    if p.get("gradientHandlePositions"):
+        out["handles"] = [[_num(h.get("x", 0), 3), _num(h.get("y", 0), 3)] for h in p["gradientHandlePositions"]]
+    for key in ("imageRef", "scaleMode"):
+        if key in p:
+            out[key] = p[key]
+    if opacity is not None and opacity != 1:
+        out["opacity"] = _num(opacity, 2)
+    if p.get("blendMode", "NORMAL") != "NORMAL":
+        out["blendMode"] = p["blendMode"]
+    return out
+
+
+def _paints(paints: List[Dict[str, Any]]) -> List[Any]:
+    return [_paint(p) for p in paints if p.get("visible", True)]
+
+
+def solid_fill(node: Dict[str, Any]) -> Optional[str]:
+    """CSS color of a node's first visible fill when it is solid, else None."""
+    paints = _paints(node.get("fills") or [])
+    return paints[0] if paints and isinstance(paints[0], str) else None
+
+
+def _text_style(style: Dict[str, Any]) -> Dict[str, Any]:
+    out = {}
+    for key, default in TEXT_STYLE_DEFAULTS.items():
+        if key in style and style[key] != default:
+            out[key] = _num(style[key], 2)
+    return out
+
+
+def _effect(e: Dict[str, Any]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {"type": e.get("type")}
+    if "color" in e:
+        out["color"] = _rgba(e["color"])
+    if "offset" in e:
+        out["offset"] = [_num(e["offset"].get("x", 0)), _num(e["offset"].get("y", 0))]
+    for key in ("radius", "spread"):
+        if e.get(key):
+            out[key] = _num(e[key])
+    return out
+
+
+def _key(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def _compact_node(node: Dict[str, Any]) -> Dict[str, Any]:
+    """One cleaned node without its children."""
+    out: Dict[str, Any] = {"id": node.get("id"), "type": node.get("type")}
+    if node.get("name"):
+        out["name"] = node["name"]
+    for key in GEOMETRY_KEYS:
+        if node.get(key) is not None:
+            out[key] = _num(node[key])
+
+    has_layout = node.get("layoutMode", "NONE") != "NONE"
+    for key, value in node.items():
+        if key in out or key in GEOMETRY_KEYS or key in ("children", "name"):
+            continue
+        if value is None or value == [] or DEFAULTS.get(key, _MISSING) == value:
+            continue
+        if key in AUTO_LAYOUT_KEYS and not has_layout:
+            continue
+        if key in ("fills", "strokes"):
+            paints = _paints(value)
+            if not paints:
+                continue
+            out[key] = paints
+        elif key == "strokeWeight":
+            if node.get("strokes"):
+                out[key] = _num(value)
+        elif key == "style":
+            out[key] = _text_style(value)
+        elif key == "effects":
+            effects = [_effect(e) for e in value if e.get("visible", True)]
+            if effects:
+                out[key] = effects
+        else:
+            out[key] = _num(value) if isinstance(value, float) else value
+    return out
+
+
+def _summary(node: Dict[str, Any]) -> Dict[str, Any]:
+    """What a pruned subtree leaves behind: how much was dropped and the text it contained."""
+    count = 0
+    texts: List[str] = []
+    size = 0
+    stack = list(reversed(node.get("children", [])))
+    while stack:
+        n = stack.pop()
+        count += 1
+        chars = n.get("characters")
+        if chars and size < SUMMARY_TEXT_LIMIT:
+            chars = chars[:SUMMARY_TEXT_LIMIT - size]
+            texts.append(chars)
+            size += len(chars)
+        stack.extend(reversed(n.get("children", [])))
+    summary: Dict[str, Any] = {"omittedNodes": count}
+    if texts:
+        summary["omittedText"] = texts
+    return summary
+
+
+def compact_tree(root: Dict[str, Any], entries: Optional[list] = None) -> Dict[str, Any]:
+    """
+    The compact form of a cleaned UI tree. When `entries` is given, it gets a
+    [raw node, compact node, depth, parent entry index, size] entry per node,
+    in pre-order, for prune_to_budget().
+    """
+    out = _compact_node(root)
+    # explicit stack so deep trees can't hit the recursion limit
+    stack = [(root, out, 0, -1)]
+    while stack:
+        node, compact, depth, parent = stack.pop()
+        index = -1
+        if entries is not None:
+            index = len(entries)
+            entries.append([node, compact, depth, parent, len(_key(compact))])
+        children = node.get("children") or []
+        if not children:
+            continue
+        compact["children"] = []
+        for child in children:
+            c = _compact_node(child)
+            compact["children"].append(c)
+        stack.extend((child, c, depth + 1, index)
+                     for child, c in reversed(list(zip(children, compact["children"]))))
+    return out
+
+
+def prune_to_budget(entries: list, limit: int) -> int:
+    """
+    Summarizes subtrees, deepest first and the largest first within a depth,
+    until the compact tree is about `limit` characters. Each summarized node
+    keeps its own properties; its children are replaced by _summary().
+    Returns the number of subtrees summarized.
+    """
+    # size of each subtree as serialized: own properties, children and the separators between them
+    # (a node with n children adds ',"children":[' ... ']' and n - 1 commas)
+    subtree = [e[4] + (len(',"children":[]') - 1 if e[1].get("children") else 0) for e in entries]
+    for i in range(len(entries) - 1, 0, -1):
+        subtree[entries[i][3]] += subtree[i] + 1
+    total = subtree[0] if entries else 0
+
+    # the root always keeps its children: a tree summarized down to one node is no use
+    by_depth: Dict[int, List[int]] = {}
+    for i, e in enumerate(entries[1:], 1):
+        if e[1].get("children"):
+            by_depth.setdefault(e[2], []).append(i)
+
+    summarized = 0
+    for depth in sorted(by_depth, reverse=True):
+        # pruning a node changes its ancestors' sizes, which sit at shallower depths: recompute per level
+        level = sorted(by_depth[depth], key=lambda i: -subtree[i])
+        for i in level:
+            if total <= limit:
+                return summarized
+            node, compact = entries[i][0], entries[i][1]
+            before = subtree[i]
+            del compact["children"]
+            compact.update(_summary(node))
+            after = len(_key(compact))
+            saved = before - after
+            total -= saved
+            j = entries[i][3]
+            while j >= 0:
+                subtree[j] -= saved
+                j = entries[j][3]
+            subtree[i] = after
+            summarized += 1
+    return summarized
+
+
+def _compact_nodes(tree: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(node.get("children", [])))
+
+
+def _styled_values(node: Dict[str, Any]) -> Iterator[Tuple[str, Any]]:
+    # (legend prefix, value) for every paint and text style of a compact node
+    for key in ("fills", "strokes"):
+        for p in node.get(key, ()):
+            yield "P", p
+    if "style" in node:
+        yield "T", node["style"]
+
+
+def build_legend(tree: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Moves paints and text styles that repeat in a compact tree into a legend,
+    replacing them in place with their key ("P0", "T0"); only values for which
+    that makes the output shorter are moved. Returns the legend.
+    """
+    counts: Dict[str, int] = {}
+    for node in _compact_nodes(tree):
+        for _, value in _styled_values(node):
+            k = _key(value)
+            counts[k] = counts.get(k, 0) + 1
+
+    names: Dict[str, str] = {}
+    legend: Dict[str, Any] = {}
+    numbers = {"P": 0, "T": 0}
+    for node in _compact_nodes(tree):
+        for prefix, value in _styled_values(node):
+            k = _key(value)
+            if k not in names:
+                name = f"{prefix}{numbers[prefix]}"
+                # inline: every use repeats the value; legend: the value once plus a quoted key per use
+                if counts[k] * len(k) <= len(k) + len(name) + 4 + counts[k] * (len(name) + 2):
+                    names[k] = None
+                    continue
+                numbers[prefix] += 1
+                names[k] = name
+                legend[name] = value
+        if names:
+            for key in ("fills", "strokes"):
+                if key in node:
+                    node[key] = [names.get(_key(p)) or p for p in node[key]]
+            if "style" in node:
+                node["style"] = names.get(_key(node["style"])) or node["style"]
+    return legend
+
+
+def encode_tree(root: Dict[str, Any], budget: Optional[int] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    Encodes the cleaned UI tree for the prompt: {"legend": {...}, "tree": {...}}
+    as minified JSON. When the encoding is over `budget` tokens, deep subtrees
+    are summarized (see prune_to_budget) until it fits.
+    Returns the text and a report with the token estimates.
+    """
+    raw_tokens = estimate_tokens(json.dumps(root, indent=2))
+    entries: list = []
+    tree = compact_tree(root, entries)
+    summarized = omitted = 0
+    if budget is not None and estimate_tokens(_key(tree)) > budget:
+        # leave room for the {"tree":...} wrapper
+        summarized = prune_to_budget(entries, budget * CHARS_PER_TOKEN - len('{"tree":}'))
+        omitted = len(entries) - sum(1 for _ in _compact_nodes(tree))
+    legend = build_legend(tree)
+    payload = {"legend": legend, "tree": tree} if legend else {"tree": tree}
+    text = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+    tokens = estimate_tokens(text)
+    report = {
+        "raw_tokens": raw_tokens,
+        "tokens": tokens,
+        "budget": budget,
+        "summarized": summarized,
+        "omitted": omitted,
+        "legend": len(legend),
+        "over_budget": budget is not None and tokens > budget,
+    }
+    return text, report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    saved = 1 - report["tokens"] / report["raw_tokens"] if report["raw_tokens"] else 0
+    line = (f"~{report['raw_tokens']} → ~{report['tokens']} tokens ({saved:.0%} smaller), "
+            f"{report['legend']} legend entries")
+    if report["budget"] is not None:
+        line += f", budget {report['budget']}"
+    if report["summarized"]:
+        line += f", {report['summarized']} subtrees summarized ({report['omitted']} nodes left out)"
+    if report["over_budget"]:
+        line += " — STILL OVER BUDGET"
+    return line
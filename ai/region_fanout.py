@@ -0,0 +1,278 @@
+import asyncio
+import html as html_lib
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from llm_cache import ResponseCache
+from openai_generate import (CSS_FILENAME, ELEMENT_RULES, ENCODING_RULES, call_openai, request_key,
+                             split_output)
+from prompt_encoding import encode_tree, estimate_tokens, format_report, solid_fill
+
+# Per-region fan-out for large frames: the root frame's children are packed
+# into regions of about REGION_TOKENS each, every region is generated by its
+# own concurrent OpenAI call, and the fragments are stitched back into one page
+# in document order. Each region's CSS is scoped under its wrapper (.r<N>) and
+# its classes are asked to start with r<N>-, so the pieces can't collide.
+REGION_TOKENS = 3000
+DEFAULT_CONCURRENCY = 4
+
+_BODY = re.compile(r"<body[^>]*>(.*)</body>", re.DOTALL | re.IGNORECASE)
+_PAGE_TAGS = re.compile(r"<!DOCTYPE[^>]*>|</?html[^>]*>|<head[^>]*>.*?</head>|</?body[^>]*>",
+                        re.DOTALL | re.IGNORECASE)
+_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+_PAGE_SELECTOR = re.compile(r"^(html|body|:root)$", re.IGNORECASE)
+
+
+def _px(value: Any) -> str:
+    return f"{value:g}px" if isinstance(value, (int, float)) else "auto"
+
+
+def design_frame(ui_tree: Dict[str, Any]) -> Dict[str, Any]:
+    """The main design frame: the tree itself, or the first child of a CANVAS (as in get_contrast_background)."""
+    if ui_tree.get("type") == "CANVAS" and ui_tree.get("children"):
+        return ui_tree["children"][0]
+    return ui_tree
+
+
+def _shifted(node: Dict[str, Any], dx: float, dy: float) -> Dict[str, Any]:
+    """Copy of a cleaned subtree with x/y made relative to the frame's top-left corner."""
+    def shift(n: Dict[str, Any]) -> Dict[str, Any]:
+        c = dict(n)
+        if c.get("x") is not None:
+            c["x"] -= dx
+        if c.get("y") is not None:
+            c["y"] -= dy
+        return c
+
+    root = shift(node)
+    stack = [root]
+    while stack:
+        n = stack.pop()
+        if n.get("children"):
+            n["children"] = [shift(child) for child in n["children"]]
+            stack.extend(n["children"])
+    return root
+
+
+def split_regions(frame: Dict[str, Any], region_tokens: int = REGION_TOKENS) -> List[List[Dict[str, Any]]]:
+    """
+    Packs the frame's children, in document order, into regions of up to about
+    `region_tokens` (a child bigger than that is a region of its own).
+    """
+    regions: List[List[Dict[str, Any]]] = []
+    size = 0
+    for child in frame.get("children") or []:
+        tokens = encode_tree(child)[1]["tokens"]
+        if not regions or size + tokens > region_tokens:
+            regions.append([])
+            size = 0
+        regions[-1].append(child)
+        size += tokens
+    return regions
+
+
+def region_tree(frame: Dict[str, Any], children: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """The tree sent for one region: the frame's box (at 0,0) holding just these children."""
+    dx, dy = frame.get("x") or 0, frame.get("y") or 0
+    return {"id": frame.get("id"), "type": "FRAME", "name": frame.get("name"), "x": 0, "y": 0,
+            "width": frame.get("width"), "height": frame.get("height"),
+            "children": [_shifted(c, dx, dy) for c in children]}
+
+
+def build_region_prompt(tree_text: str, prefix: str, frame: Dict[str, Any]) -> str:
+    return f"""
+You are an expert senior frontend engineer specializing in pixel-perfect,
+data-faithful conversion of structured Figma JSON trees into HTML and CSS.
+
+You will receive ONE REGION of a larger CLEANED UI tree. Other regions are
+generated separately and combined with yours. You MUST obey the data exactly.
+
+------------------------------------------------------------
+ABSOLUTE RULES (DO NOT VIOLATE):
+------------------------------------------------------------
+1.  **REGION HANDLING**
+    - The root node is the design frame ({_px(frame.get("width"))} × {_px(frame.get("height"))}).
+      It is rendered for you: DO NOT render it, render only its children.
+    - Coordinates are already relative to the frame's top-left corner, and your
+      elements are placed inside a `position: relative` box of the frame's size.
+
+{ELEMENT_RULES}7.  **CLASS NAMES**
+    - EVERY class name you use MUST start with `{prefix}` (e.g. `{prefix}button`).
+
+8.  **NO GLOBAL CSS**
+    - DO NOT style html, body, :root or *; the page-level CSS already exists.
+
+{ENCODING_RULES}------------------------------------------------------------
+OUTPUT FORMAT (DO NOT BREAK FORMAT):
+------------------------------------------------------------
+
+===HTML_START===
+<only the HTML elements of this region: no <html>, <head> or <body>>
+
+===CSS_START===
+<the CSS for those elements only>
+
+------------------------------------------------------------
+
+Now produce HTML + CSS for the following region:
+
+{tree_text}
+"""
+
+
+def fragment_html(html: str) -> str:
+    """The region's markup without any page wrapper the model added anyway."""
+    m = _BODY.search(html)
+    if m:
+        html = m.group(1)
+    return _PAGE_TAGS.sub("", html).strip()
+
+
+def _scope_selector(selector: str, scope: str) -> Optional[str]:
+    if _PAGE_SELECTOR.match(selector):
+        return None  # page-level rules belong to the stitched page, not a region
+    return f".{scope} {selector}"
+
+
+def scope_css(css: str, scope: str) -> str:
+    """Prefixes every selector with .<scope> so a region's rules only reach its own elements."""
+    css = _COMMENT.sub("", css)
+    out = []
+    i, n = 0, len(css)
+    while i < n:
+        j = css.find("{", i)
+        if j < 0:
+            break
+        # statements like @import end with ';' and have no block: drop them
+        prelude = css[i:j].rsplit(";", 1)[-1].strip()
+        depth, k = 1, j + 1
+        while k < n and depth:
+            depth += {"{": 1, "}": -1}.get(css[k], 0)
+            k += 1
+        body = css[j + 1:k - 1].strip()
+        i = k
+        if prelude.startswith(("@media", "@supports")):
+            out.append(f"{prelude} {{\n{scope_css(body, scope)}\n}}")
+        elif prelude.startswith("@"):
+            out.append(f"{prelude} {{ {body} }}")  # @font-face, @keyframes: global by nature
+        else:
+            selectors = [_scope_selector(s.strip(), scope) for s in prelude.split(",") if s.strip()]
+            selectors = [s for s in selectors if s]
+            if selectors:
+                out.append(f"{', '.join(selectors)} {{ {body} }}")
+    return "\n".join(out)
+
+
+def stitch(frame: Dict[str, Any], fragments: List[Tuple[str, str]], contrast_bg: str) -> Tuple[str, str]:
+    """One page from the region fragments, in region order, each in a full-frame .region box."""
+    body = "\n".join(f'<div class="region r{i}">\n{html}\n</div>' for i, (html, _) in enumerate(fragments))
+    html = f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{html_lib.escape(frame.get("name") or "Figma Export")}</title>
+<link rel="stylesheet" href="{CSS_FILENAME}">
+</head>
+<body>
+<div class="frame">
+{body}
+</div>
+</body>
+</html>"""
+
+    frame_rules = ["position: relative", f"width: {_px(frame.get('width'))}", f"height: {_px(frame.get('height'))}",
+                   "overflow: hidden"]
+    background = solid_fill(frame)
+    if background:
+        frame_rules.append(f"background: {background}")
+    if frame.get("cornerRadius"):
+        frame_rules.append(f"border-radius: {_px(frame['cornerRadius'])}")
+    page = [
+        "* { box-sizing: border-box; margin: 0; padding: 0; }",
+        f"body {{ background: {contrast_bg}; min-height: 100vh; display: flex; "
+        "align-items: center; justify-content: center; }",
+        ".frame { " + "; ".join(frame_rules) + "; }",
+        # regions overlap the whole frame; only their content takes clicks
+        ".region { position: absolute; left: 0; top: 0; width: 100%; height: 100%; pointer-events: none; }",
+        ".region * { pointer-events: auto; }",
+    ]
+    css = "\n".join(page + [f"/* region r{i} */\n{scope_css(c, f'r{i}')}" for i, (_, c) in enumerate(fragments)])
+    return html, css
+
+
+def plan_regions(ui_tree: Dict[str, Any], budget: Optional[int],
+                 region_tokens: int = REGION_TOKENS) -> List[Dict[str, Any]]:
+    """One {"prompt", "report"} per region, in document order."""
+    frame = design_frame(ui_tree)
+    plans = []
+    for i, children in enumerate(split_regions(frame, region_tokens)):
+        tree_text, report = encode_tree(region_tree(frame, children), budget)
+        plans.append({"prompt": build_region_prompt(tree_text, f"r{i}-", frame), "report": report,
+                      "nodes": len(children)})
+    return plans
+
+
+async def _generate_all(prompts: List[str], concurrency: int, client, cache: Optional[ResponseCache]):
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(prompt: str) -> Dict[str, Any]:
+        async with slots:
+            start = time.perf_counter()
+            try:
+                text = await asyncio.to_thread(call_openai, prompt, client, cache)
+                try:
+                    html, css = split_output(text)
+                except ValueError:
+                    if cache is not None:
+                        # don't serve the same unusable response on the next run
+                        cache.discard(request_key(prompt))
+                    raise
+                result = {"html": fragment_html(html), "css": css}
+            except Exception as e:
+                result = {"error": str(e)}
+            result["seconds"] = time.perf_counter() - start
+            return result
+
+    # gather keeps the input order whatever order the calls finish in
+    return await asyncio.gather(*(one(p) for p in prompts))
+
+
+def generate_regions(ui_tree: Dict[str, Any], contrast_bg: str, budget: Optional[int],
+                     region_tokens: int = REGION_TOKENS, concurrency: int = DEFAULT_CONCURRENCY,
+                     client=None, cache: Optional[ResponseCache] = None) -> Tuple[str, str, Dict[str, Any]]:
+    """
+    Generates every region concurrently (at most `concurrency` calls in flight)
+    and stitches the results. A failed region is left empty, with an HTML
+    comment saying why. Returns (html, css, report).
+    `client` is anything with OpenAI's chat.completions.create.
+    """
+    frame = design_frame(ui_tree)
+    plans = plan_regions(ui_tree, budget, region_tokens)
+    for i, plan in enumerate(plans):
+        print(f"  region r{i}: {plan['nodes']} top-level node(s), {format_report(plan['report'])}")
+
+    start = time.perf_counter()
+    results = asyncio.run(_generate_all([p["prompt"] for p in plans], concurrency, client, cache))
+    wall = time.perf_counter() - start
+
+    fragments = [(r["html"], r["css"]) if "error" not in r else (f"<!-- region r{i} failed: {r['error']} -->", "")
+                 for i, r in enumerate(results)]
+    html, css = stitch(frame, fragments, contrast_bg)
+    report = {
+        "regions": len(plans),
+        "failed": [i for i, r in enumerate(results) if "error" in r],
+        "wall": wall,
+        "sum": sum(r["seconds"] for r in results),
+        "slowest": max((r["seconds"] for r in results), default=0.0),
+        "prompt_tokens": sum(estimate_tokens(p["prompt"]) for p in plans),
+    }
+    return html, css, report
+
+
+def format_fanout_report(report: Dict[str, Any]) -> str:
+    line = (f"{report['regions']} regions in {report['wall']:.1f}s (slowest {report['slowest']:.1f}s, "
+            f"{report['sum']:.1f}s if run one after another), ~{report['prompt_tokens']} prompt tokens")
+    if report["failed"]:
+        line += f"; failed: {', '.join(f'r{i}' for i in report['failed'])}"
+    return line
@@ -0,0 +1,102 @@
+import re
+from typing import Dict, Optional, TextIO
+
+HTML_MARKER = "===HTML_START==="
+CSS_MARKER = "===CSS_START==="
+FENCE = "```"
+
+# matched case-insensitively like split_output() does, against the buffer itself:
+# offsets found in an upper()-ed copy drift wherever a character changes length ("ß" -> "SS")
+_HTML_MARKER = re.compile(re.escape(HTML_MARKER), re.IGNORECASE)
+_CSS_MARKER = re.compile(re.escape(CSS_MARKER), re.IGNORECASE)
+
+
+class SectionSplitter:
+    """
+    Incremental split_output(): feed() the response chunk by chunk and the HTML
+    and CSS sections are written to their files as soon as they are known.
+    Markers and code fences may be split across chunks; the bytes that could
+    still turn out to be one are held back until the next chunk decides.
+    The files end up exactly as split_output() + save_files() would write them.
+    """
+
+    def __init__(self, html_out: TextIO, css_out: TextIO):
+        self.outs = {"html": html_out, "css": css_out}
+        self.section: Optional[str] = None  # None until the HTML marker, then "html", then "css"
+        self.buf = ""
+        self.started = False   # leading whitespace of a section is skipped until its first text
+        self.pending_ws = ""   # trailing whitespace, written only once more text follows
+        self.written: Dict[str, int] = {"html": 0, "css": 0}
+
+    def _emit(self, text: str) -> None:
+        if not self.started:
+            text = text.lstrip()
+            if not text:
+                return
+            self.started = True
+        body = text.rstrip()
+        if body:
+            out = self.outs[self.section]
+            out.write(self.pending_ws + body)
+            self.written[self.section] += len(self.pending_ws) + len(body)
+            self.pending_ws = ""
+        self.pending_ws += text[len(body):]
+
+    def _enter(self, section: str) -> None:
+        if self.section:
+            self.outs[self.section].flush()
+        self.section = section
+        self.started = False
+        self.pending_ws = ""
+
+    def _drain(self, final: bool) -> None:
+        while True:
+            if self.section is None:
+                m = _HTML_MARKER.search(self.buf)
+                if m is None:
+                    # only the end could still be the start of the marker
+                    self.buf = "" if final else self.buf[-(len(HTML_MARKER) - 1):]
+                    return
+                self.buf = self.buf[m.end():]
+                self._enter("html")
+                continue
+
+            # the next marker (HTML section only) or fence, whichever comes first
+            m = _CSS_MARKER.search(self.buf) if self.section == "html" else None
+            marker = m.start() if m else -1
+            fence = self.buf.find(FENCE)
+            cuts = [i for i in (marker, fence) if i >= 0]
+            if not cuts:
+                hold = 0 if final else (len(CSS_MARKER) if self.section == "html" else len(FENCE + "css")) - 1
+                split = max(len(self.buf) - hold, 0)
+                self._emit(self.buf[:split])
+                self.buf = self.buf[split:]
+                return
+            cut = min(cuts)
+            self._emit(self.buf[:cut])
+
+            if cut == marker:
+                self.buf = self.buf[m.end():]
+                self._enter("css")
+                continue
+
+            # ``` or ```html in the HTML section, ``` or ```css in the CSS section
+            rest = self.buf[cut + len(FENCE):]
+            if not final and len(rest) < len(self.section) and self.section.startswith(rest):
+                self.buf = self.buf[cut:]  # can't tell yet whether the language follows
+                return
+            skip = len(FENCE) + (len(self.section) if rest.startswith(self.section) else 0)
+            self.buf = self.buf[cut + skip:]
+
+    def feed(self, text: str) -> None:
+        self.buf += text
+        self._drain(final=False)
+        if self.section:
+            self.outs[self.section].flush()
+
+    def close(self) -> None:
+        """Writes out what was held back; raises ValueError when the markers never came."""
+        self._drain(final=True)
+        if self.section != "css":
+            raise ValueError("Failed to parse HTML/CSS blocks from response.")
+        self.outs["css"].flush()
@@ -0,0 +1,100 @@
+"""
+Time and peak memory of writing UITree/ui.json: the recursive cleaner that
+built the whole cleaned tree and dumped it with indent=2, versus the streaming
+cleaner in ai/export_ui_tree.py (compact JSON, one projected node at a time).
+
+Both clean the same synthetic frame, made by repeating the children of the
+cached sample frame with fresh ids, and their outputs are checked to decode to
+the same tree.
+
+    python bench/bench_clean_tree.py --copies 2000
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "ai"))
+sys.path.insert(0, os.path.join(ROOT, "bench"))
+
+from bench_ui_node import synthetic_frame  # noqa: E402
+from export_ui_tree import STYLE_KEYS, write_clean_json  # noqa: E402
+
+
+def legacy_clean(node):
+    # clean_figma_node as it was before the streaming cleaner
+    bbox = node.get("absoluteBoundingBox", {})
+    clean = {
+        "id": node.get("id"),
+        "type": node.get("type"),
+        "name": node.get("name"),
+        "x": bbox.get("x"),
+        "y": bbox.get("y"),
+        "width": bbox.get("width"),
+        "height": bbox.get("height"),
+    }
+    for key in STYLE_KEYS:
+        if key in node:
+            clean[key] = node[key]
+    if "children" in node:
+        clean["children"] = [legacy_clean(child) for child in node["children"]]
+    return clean
+
+
+def write_legacy(node, f):
+    json.dump(legacy_clean(node), f, indent=2)
+
+
+def write_streaming(node, f):
+    write_clean_json(node, f)
+
+
+def measure(write, node, path):
+    """Seconds (untraced) and peak traced bytes of one write, and the file's size."""
+    gc.collect()
+    start = time.perf_counter()
+    with open(path, "w", encoding="utf-8") as f:
+        write(node, f)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    with open(path, "w", encoding="utf-8") as f:
+        write(node, f)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed, os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the recursive and streaming ui.json cleaners.")
+    parser.add_argument("--copies", type=int, default=2000, help="Copies of the sample frame's children")
+    args = parser.parse_args()
+
+    raw = synthetic_frame(args.copies)
+    node = json.loads(raw)
+    nodes = raw.count('"id":')
+    print(f"{nodes} nodes, {len(raw) / 1e6:.1f} MB of JSON")
+    print(f"{'cleaner':<12} {'peak MB':>10} {'seconds':>9} {'ui.json MB':>11}")
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, write in (("recursive", write_legacy), ("streaming", write_streaming)):
+            path = os.path.join(tmp, f"{name}.json")
+            peak, elapsed, size = measure(write, node, path)
+            results[name] = (peak, elapsed)
+            print(f"{name:<12} {peak / 1e6:>10.1f} {elapsed:>9.2f} {size / 1e6:>11.1f}")
+            with open(path, "r", encoding="utf-8") as f:
+                results[name] += (json.load(f),)
+    same = results["recursive"][2] == results["streaming"][2]
+    print(f"streaming: {results['streaming'][0] / results['recursive'][0]:.0%} of the peak memory, "
+          f"{results['recursive'][1] / results['streaming'][1]:.1f}x as fast, same tree: {same}")
+    if not same:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+End-to-end check and latency benchmark of the export daemon (classic/server.py)
+against the stand-in Figma server (figma_standin.py), with a synthetic document.
+
+  1. cold export: the daemon downloads the file from the stand-in, parses and renders it
+  2. the same frame with other options, rendered from the warm document
+  3. --requests warm exports of the same frame, over HTTP
+  4. an edit on the stand-in, then POST /poll: only the edited file is
+     downloaded again and the warm frame comes back with the new version
+  5. for comparison, a cold `python main.py` process on the same cache entry
+
+Exits 1 when any of the checks fail.
+
+    python bench/bench_server.py --nodes 20000 --requests 200
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "classic"))
+sys.path.insert(0, os.path.join(ROOT, "bench"))
+
+from figma_standin import serve  # noqa: E402
+from synth_figma import Generator  # noqa: E402
+
+FILE_KEY = "SYNTHSERVER"
+
+
+def request(base: str, path: str, method: str = "GET", raw: bool = False):
+    req = urllib.request.Request(base + path, method=method, data=b"" if method == "POST" else None)
+    with urllib.request.urlopen(req) as resp:
+        return resp.read().decode("utf-8") if raw else json.load(resp)
+
+
+def check(ok: bool, what: str, failures: list) -> None:
+    print(f"  {'ok' if ok else 'FAILED':<6} {what}")
+    if not ok:
+        failures.append(what)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the export daemon against a stand-in Figma server.")
+    parser.add_argument("--nodes", type=int, default=20000, help="Nodes in the synthetic document")
+    parser.add_argument("--requests", type=int, default=200, help="Warm exports to time")
+    args = parser.parse_args()
+
+    failures: list = []
+    with tempfile.TemporaryDirectory() as tmp:
+        docs, cache, work = (os.path.join(tmp, d) for d in ("docs", "cache", "work"))
+        for d in (docs, cache, work):
+            os.makedirs(d)
+        doc = Generator(nodes=args.nodes).document()
+        frame_id = doc["document"]["children"][0]["children"][0]["id"]
+        with open(os.path.join(docs, f"{FILE_KEY}.json"), "w", encoding="utf-8") as f:
+            json.dump(doc, f)
+        del doc
+
+        standin = serve(docs)
+        figma_url = f"http://127.0.0.1:{standin.server_address[1]}/v1"
+        # figma_http reads FIGMA_API_URL when it's imported, on the first request
+        os.environ["FIGMA_API_URL"] = figma_url
+        os.environ.setdefault("FIGMA_TOKEN", "stand-in")
+        import figma_api
+        from server import ExportService, make_server
+        figma_api.CACHE_DIR = cache
+
+        service = ExportService()
+        daemon = make_server(service, port=0, log_requests=False)
+        threading.Thread(target=daemon.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{daemon.server_address[1]}"
+        export = f"/export?file={FILE_KEY}&node={frame_id}"
+
+        print(f"{args.nodes} nodes, frame {frame_id}, stand-in at {figma_url}, daemon at {base}")
+        first = request(base, export)
+        check(first["cache"] == "cold", f"first export is cold ({first['ms']:.0f} ms)", failures)
+        other = request(base, export + "&dedupe=1&components=1")
+        check(other["cache"] == "document", f"other options render from the warm document ({other['ms']:.0f} ms)",
+              failures)
+
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            page = request(base, export + "&format=html", raw=True)
+        per_request = (time.perf_counter() - start) / args.requests
+        check(page == first["html"], f"warm exports return the same page ({per_request * 1000:.2f} ms per "
+              "request over HTTP)", failures)
+        warm = request(base, export)
+        check(warm["cache"] == "warm" and warm["css"] == first["css"], "and the same JSON", failures)
+
+        fetched = standin.standin.stats["file"]
+        check(request(base, "/poll", "POST")["changed"] == [], "poll without an edit changes nothing", failures)
+        check(standin.standin.stats["file"] == fetched, "an unchanged file isn't downloaded again", failures)
+        version = request(figma_url, f"/_edit/{FILE_KEY}", "POST")["version"]
+        check(request(base, "/poll", "POST")["changed"] == [FILE_KEY], "poll after an edit reloads the file",
+              failures)
+        edited = request(base, export)
+        check(edited["version"] == version and edited["cache"] == "warm",
+              f"the warm frame was re-rendered at version {version}", failures)
+
+        stats = request(base, "/stats")
+        daemon.shutdown()
+        standin.shutdown()
+
+        # a fresh process per export, as main.py runs (the cache entry is already there)
+        env = {k: v for k, v in os.environ.items() if k != "FIGMA_CACHE_MAX_AGE"}
+        start = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(ROOT, "classic", "main.py"), FILE_KEY, "--node", frame_id,
+                        "--no-images"], cwd=work, check=True, capture_output=True, env=env)
+        cold_process = time.perf_counter() - start
+
+    print(f"\n{'served':<10} {'count':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for kind, s in stats["latency_ms"].items():
+        print(f"{kind:<10} {s['count']:>6} {s['p50']:>9.2f} {s['p90']:>9.2f} {s['p99']:>9.2f} {s['max']:>9.2f}")
+    print(f"main.py process: {cold_process * 1000:.0f} ms; stand-in requests: {standin.standin.stats}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Startup benchmark for the classic exporter on a warm cache.
+
+Runs `python -X importtime main.py <key> --node <id>` from a scratch directory
+(with ../cache pointing at the repo cache and no FIGMA_TOKEN set), parses the
+import-time report and checks it against a budget. The warm path must not
+import the network stack at all.
+
+    python bench/bench_startup.py --runs 10 --budget-ms 90
+Exits non-zero when the median import time is over budget or a network
+module was imported.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "classic", "main.py")
+
+# none of these belong on a cache hit (.env is read only before a request)
+NETWORK_MODULES = ("requests", "urllib3", "figma_http", "openai", "dotenv")
+
+# imported by the interpreter itself before main.py runs
+INTERPRETER_MODULES = {"site", "encodings", "_frozen_importlib_external", "codecs", "io", "abc", "time", "zipimport"}
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_importtime(stderr: str):
+    """(self µs, cumulative µs, depth, module) for every line of -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append((int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2, m.group(4)))
+    return rows
+
+
+def run_once(workdir: str, file_key: str, node_id: str):
+    env = dict(os.environ)
+    env.pop("FIGMA_TOKEN", None)
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", MAIN, file_key, "--node", node_id],
+                          cwd=workdir, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        sys.exit(f"export failed:\n{proc.stdout}{proc.stderr[-2000:]}")
+    return wall, parse_importtime(proc.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure warm-cache startup of classic/main.py.")
+    parser.add_argument("--file-key", default="f6gbTssaVTU0ik3u1q0cxL", help="A file key that is already cached")
+    parser.add_argument("--node", default="1:75", help="Node to export")
+    parser.add_argument("--runs", type=int, default=10, help="Runs to take the median over")
+    parser.add_argument("--budget-ms", type=float, default=90.0,
+                        help="Budget for the total import time of the exporter's own modules")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    args = parser.parse_args()
+    if os.getenv("PYTHONDONTWRITEBYTECODE"):
+        print("note: PYTHONDONTWRITEBYTECODE is set, so every run recompiles the sources")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # scratch layout: tmp/cache -> repo cache, exports written to tmp/work/output
+        os.symlink(os.path.join(ROOT, "cache"), os.path.join(tmp, "cache"))
+        workdir = os.path.join(tmp, "work")
+        os.mkdir(workdir)
+        run_once(workdir, args.file_key, args.node)  # warm the OS cache, .pyc files and index
+        walls, imports, last = [], [], []
+        for _ in range(args.runs):
+            wall, rows = run_once(workdir, args.file_key, args.node)
+            walls.append(wall)
+            # cumulative times of the top-level imports cover everything below them
+            imports.append(sum(cum for _, cum, depth, mod in rows
+                               if depth == 0 and mod not in INTERPRETER_MODULES))
+            last = rows
+
+    import_ms = statistics.median(imports) / 1000
+    wall_ms = statistics.median(walls) * 1000
+    print(f"median over {args.runs} runs: {wall_ms:.1f} ms wall, {import_ms:.1f} ms importing modules")
+    print(f"{'self ms':>9} {'cumul ms':>9}  module")
+    for self_us, cum_us, depth, mod in sorted(last, key=lambda r: -r[0])[:args.top]:
+        print(f"{self_us / 1000:>9.1f} {cum_us / 1000:>9.1f}  {'  ' * depth}{mod}")
+
+    loaded = {mod.split(".")[0] for _, _, _, mod in last}
+    network = [m for m in NETWORK_MODULES if m in loaded]
+    ok = import_ms <= args.budget_ms and not network
+    if network:
+        print(f"FAIL: warm-cache run imported {', '.join(network)}")
+    print(f"{'PASS' if import_ms <= args.budget_ms else 'FAIL'}: {import_ms:.1f} ms of imports (budget {args.budget_ms:.0f} ms)")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Scaling benchmark for the export pipeline on synthetic documents (see synth_figma.py).
+
+For every size it times loading the cache entry, find_node_by_id,
+map_figma_to_ui, generate_css, generate_html and the AI pipeline's
+clean_figma_node, then repeats each stage under tracemalloc for its peak
+memory. Results are written as JSON (one file per commit by default), and
+--compare checks them against an earlier run.
+
+    python bench/bench_suite.py                          # 1k, 10k, 100k nodes
+    python bench/bench_suite.py --sizes 1000,1000000     # 1M takes a few minutes and several GB
+    python bench/bench_suite.py --compare bench/results/<old sha>.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "classic"))
+sys.path.insert(1, os.path.join(ROOT, "ai"))
+sys.path.insert(0, os.path.join(ROOT, "bench"))
+
+from css_html import generate_css, generate_html  # noqa: E402
+from export_ui_tree import clean_figma_node  # noqa: E402
+from figma_api import find_node_by_id  # noqa: E402
+from figma_cache import load_cache, save_cache  # noqa: E402
+from mapper import build_ui_tree, map_figma_to_ui  # noqa: E402
+from synth_figma import Generator  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, "bench", "results")
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def stages(path: str, doc: Dict[str, Any]) -> Dict[str, Callable[[], Any]]:
+    """One callable per stage; the ones that need earlier output prepare it once, outside the measurement."""
+    frame = doc["document"]["children"][0]["children"][0]
+    ui_root, id_to_class = build_ui_tree(frame)
+    return {
+        "load": lambda: load_cache(path),
+        # an id that isn't there: the search has to visit every node
+        "find_node_by_id": lambda: find_node_by_id(doc["document"], "missing"),
+        "map_figma_to_ui": lambda: map_figma_to_ui(frame),
+        "generate_css": lambda: generate_css(ui_root, id_to_class),
+        "generate_html": lambda: generate_html(ui_root, id_to_class),
+        "clean_figma_node": lambda: clean_figma_node(frame),
+    }
+
+
+def timed(fn: Callable[[], Any], repeat: int) -> float:
+    """Best of `repeat` runs, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+        del result
+    return best
+
+
+def peak_memory(fn: Callable[[], Any]) -> int:
+    """Peak bytes allocated while fn runs, including what its result keeps alive."""
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak
+
+
+def run_size(nodes: int, params: Dict[str, Any], repeat: int, memory: bool, tmp: str) -> Dict[str, Any]:
+    start = time.perf_counter()
+    doc = Generator(nodes, **params).document()
+    path = save_cache(tmp, f"SYNTH{nodes}", doc)
+    print(f"{nodes} nodes: generated in {time.perf_counter() - start:.1f}s, "
+          f"{os.path.getsize(path) / 1e6:.1f} MB cached")
+
+    result: Dict[str, Any] = {"nodes": nodes, "bytes": os.path.getsize(path), "stages": {}}
+    for name, fn in stages(path, doc).items():
+        entry = {"seconds": timed(fn, repeat)}
+        if memory:
+            entry["peak_bytes"] = peak_memory(fn)
+        result["stages"][name] = entry
+        peak = f"{entry['peak_bytes'] / 1e6:>9.1f} MB" if memory else ""
+        print(f"  {name:<18} {entry['seconds'] * 1000:>10.1f} ms {peak}")
+    os.remove(path)
+    return result
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], threshold: float) -> List[str]:
+    """Stages that got more than `threshold` (a fraction) slower or bigger, as report lines."""
+    regressions = []
+    old_sizes = {r["nodes"]: r for r in old["results"]}
+    print(f"\nagainst {old.get('commit')} ({old.get('python')}):")
+    for run in new["results"]:
+        before = old_sizes.get(run["nodes"])
+        if not before:
+            continue
+        for name, entry in run["stages"].items():
+            prev = before["stages"].get(name)
+            if not prev:
+                continue
+            for metric in ("seconds", "peak_bytes"):
+                if metric not in entry or not prev.get(metric):
+                    continue
+                change = entry[metric] / prev[metric] - 1
+                line = f"  {run['nodes']:>8} {name:<18} {metric:<10} {change:>+7.1%}"
+                if change > threshold:
+                    line += "  REGRESSION"
+                    regressions.append(line.strip())
+                print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and memory of the export pipeline at growing sizes.")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="Comma-separated node counts (default 1000,10000,100000)")
+    parser.add_argument("--depth", type=int, default=8)
+    parser.add_argument("--auto-layout", type=float, default=0.4)
+    parser.add_argument("--text", type=float, default=0.35)
+    parser.add_argument("--paints", type=int, default=24)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage (the best counts)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass")
+    parser.add_argument("-o", "--output", help="Results file (default bench/results/<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to check against")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Slowdown or growth that counts as a regression (default 0.15 = 15%%)")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    params = {"depth": args.depth, "auto_layout": args.auto_layout, "text": args.text,
+              "paints": args.paints, "seed": args.seed}
+
+    commit = git_commit()
+    report = {"commit": commit, "python": platform.python_version(), "platform": platform.platform(),
+              "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "params": params, "repeat": args.repeat,
+              "results": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        for nodes in sizes:
+            report["results"].append(run_size(nodes, params, args.repeat, not args.no_memory, tmp))
+
+    path = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults → {path}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            old = json.load(f)
+        if old.get("params") != params:
+            print("note: the earlier run used different generator parameters")
+        regressions = compare(old, report, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
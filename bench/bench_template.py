@@ -0,0 +1,73 @@
+"""
+Per-call overhead of rendering the export template, as generate_html used to
+do it (a new Environment, so a fresh compile, on every call) versus the shared
+environment in css_html, and what the on-disk bytecode cache saves a fresh
+process on its first render.
+
+    python bench/bench_template.py --calls 500
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "classic"))
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader  # noqa: E402
+
+import css_html  # noqa: E402
+
+CONTEXT = {"title": "Figma Export", "body_html": "<div></div>"}
+
+
+def per_call_environment():
+    env = Environment(loader=FileSystemLoader(css_html.TEMPLATE_DIR), autoescape=True)
+    return env.get_template(css_html.TEMPLATE_NAME).render(**CONTEXT)
+
+
+def shared_environment():
+    return css_html.get_template().render(**CONTEXT)
+
+
+def shared_environment_generate():
+    return "".join(css_html.get_template().generate(**CONTEXT))
+
+
+def first_render(bytecode_dir):
+    # a new Environment has an empty in-memory cache, like a new process
+    cache = FileSystemBytecodeCache(bytecode_dir) if bytecode_dir else None
+    env = Environment(loader=FileSystemLoader(css_html.TEMPLATE_DIR), autoescape=True, bytecode_cache=cache)
+    return env.get_template(css_html.TEMPLATE_NAME).render(**CONTEXT)
+
+
+def timed(fn, calls, *args):
+    fn(*args)  # warm-up
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn(*args)
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure export template render overhead.")
+    parser.add_argument("--calls", type=int, default=500, help="Renders per measurement")
+    args = parser.parse_args()
+
+    print(f"{'render':<34} {'µs/call':>10}")
+    rows = [
+        ("new Environment per call", timed(per_call_environment, args.calls)),
+        ("shared environment, render()", timed(shared_environment, args.calls)),
+        ("shared environment, generate()", timed(shared_environment_generate, args.calls)),
+    ]
+    with tempfile.TemporaryDirectory() as bytecode_dir:
+        rows.append(("first render, no bytecode cache", timed(first_render, args.calls, None)))
+        rows.append(("first render, bytecode cache", timed(first_render, args.calls, bytecode_dir)))
+    for name, seconds in rows:
+        print(f"{name:<34} {seconds * 1e6:>10.1f}")
+    print(f"shared environment is {rows[0][1] / rows[1][1]:.0f}x faster per call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Memory benchmark: UiNodeDict trees (map_figma_to_ui + apply_absolute_layout)
+versus compact UiNode trees (build_ui_tree).
+
+Both are built from the same synthetic frame, made by repeating the children of
+the cached sample frame with fresh ids, and parsed inside the measurement so
+only what each tree keeps alive counts as retained.
+
+    python bench/bench_ui_node.py --copies 2000
+"""
+import argparse
+import copy
+import gc
+import itertools
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "classic"))
+
+from mapper import apply_absolute_layout, build_ui_tree, map_figma_to_ui  # noqa: E402
+
+FIXTURE = os.path.join(ROOT, "cache", "f6gbTssaVTU0ik3u1q0cxL.json")
+
+
+def synthetic_frame(copies: int) -> str:
+    with open(FIXTURE, "r", encoding="utf-8") as f:
+        frame = json.load(f)["document"]["children"][0]["children"][0]
+    ids = itertools.count()
+
+    def reid(node):
+        node["id"] = f"9:{next(ids)}"
+        for c in node.get("children", []):
+            reid(c)
+
+    children = []
+    for _ in range(copies):
+        for child in frame["children"]:
+            c = copy.deepcopy(child)
+            reid(c)
+            children.append(c)
+    frame = dict(frame, children=children)
+    return json.dumps(frame)
+
+
+def measure(build, raw: str):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    tree = build(json.loads(raw))
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tree
+    return retained, peak, elapsed
+
+
+def build_dict(node):
+    ui = map_figma_to_ui(node)
+    apply_absolute_layout(ui)
+    return ui
+
+
+def build_compact(node):
+    return build_ui_tree(node)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare UiNodeDict and UiNode memory use.")
+    parser.add_argument("--copies", type=int, default=2000, help="Copies of the sample frame's children")
+    args = parser.parse_args()
+
+    raw = synthetic_frame(args.copies)
+    nodes = raw.count('"id":')
+    print(f"{nodes} nodes, {len(raw) / 1e6:.1f} MB of JSON")
+    print(f"{'representation':<16} {'retained MB':>12} {'peak MB':>10} {'seconds':>9}")
+    results = {}
+    for name, build in (("dict", build_dict), ("compact", build_compact)):
+        retained, peak, elapsed = measure(build, raw)
+        results[name] = retained
+        print(f"{name:<16} {retained / 1e6:>12.1f} {peak / 1e6:>10.1f} {elapsed:>9.2f}")
+    print(f"compact retains {results['compact'] / results['dict']:.0%} of the dict tree's memory")
+
+
+if __name__ == "__main__":
+    main()
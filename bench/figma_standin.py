@@ -0,0 +1,242 @@
+"""
+A local stand-in for api.figma.com, for exercising the clients (main.py,
+figma_sync.py, server.py) without a token or network access.
+
+Serves the Figma documents in a directory (<file key>.json, e.g. written by
+synth_figma.py -o) on the endpoints the clients use:
+    GET  /v1/files/<key>            the document
+    GET  /v1/files/<key>?depth=1    version check: metadata and pages only
+    GET  /v1/files/<key>/images     image fill URLs, pointing at /_images on this server
+    GET  /_images/<imageRef>        the image: <dir>/images/<imageRef> when that file exists,
+                                    otherwise a few bytes made up from the ref
+    POST /v1/_edit/<key>            bump the file's version, as an edit in Figma would
+    GET  /_stats                    requests served, by kind
+
+Like the real API under load it can answer slowly (--latency) and throttle:
+with --rate, requests over that many per second get a 429 with Retry-After,
+and --fail-every N answers every Nth request with one regardless.
+
+    python bench/figma_standin.py --dir /tmp/docs --port 8790 --latency 0.05 --rate 5 --burst 3
+    FIGMA_API_URL=http://127.0.0.1:8790/v1 FIGMA_TOKEN=x python classic/server.py
+"""
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+class StandIn:
+    """
+    The documents in `directory`, parsed on first request, each with a version that _edit bumps.
+      - latency: seconds added to every response
+      - rate/burst: API requests accepted per second (a token bucket); the
+        rest get a 429 with the whole seconds until the next token as Retry-After
+      - fail_every: every Nth API request gets a 429 with `retry_after`
+    `accepted` and `throttled` keep the time.monotonic() of every request let
+    through and of every 429 sent, for checking how a client paces itself.
+    """
+
+    def __init__(self, directory: str, latency: float = 0.0, rate: Optional[float] = None, burst: int = 1,
+                 fail_every: int = 0, retry_after: int = 1):
+        self.directory = directory
+        self.latency = latency
+        self.rate = rate
+        self.burst = burst
+        self.fail_every = fail_every
+        self.retry_after = retry_after
+        self.edits: Dict[str, int] = {}
+        self.stats = {"file": 0, "meta": 0, "images": 0, "downloads": 0, "edit": 0, "throttled": 0}
+        self.accepted: List[float] = []
+        self.throttled: List[float] = []
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._encoded: Dict[Tuple[str, str], bytes] = {}
+        self._lock = threading.Lock()
+        self._limit_lock = threading.Lock()
+        self._requests = 0
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def admit(self) -> Optional[int]:
+        """None when an API request may go ahead, otherwise the Retry-After of its 429."""
+        with self._limit_lock:
+            now = time.monotonic()
+            self._requests += 1
+            if self.fail_every and self._requests % self.fail_every == 0:
+                return self.retry_after
+            if self.rate:
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens < 1:
+                    return math.ceil((1 - self._tokens) / self.rate)
+                self._tokens -= 1
+            self.accepted.append(now)
+            return None
+
+    def document(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if key not in self._docs:
+                path = os.path.join(self.directory, f"{key}.json")
+                if not os.path.exists(path):
+                    return None
+                with open(path, "r", encoding="utf-8") as f:
+                    self._docs[key] = json.load(f)
+            doc = self._docs[key]
+        edits = self.edits.get(key, 0)
+        version = doc.get("version", "1")
+        return dict(doc, version=f"{version}.{edits}" if edits else version)
+
+    def encoded(self, key: str) -> Optional[bytes]:
+        doc = self.document(key)
+        if doc is None:
+            return None
+        cache_key = (key, doc["version"])
+        if cache_key not in self._encoded:
+            self._encoded[cache_key] = json.dumps(doc).encode("utf-8")
+        return self._encoded[cache_key]
+
+    def meta(self, key: str) -> Optional[Dict[str, Any]]:
+        doc = self.document(key)
+        if doc is None:
+            return None
+        document = doc["document"]
+        pages = [{k: v for k, v in page.items() if k != "children"} for page in document.get("children", [])]
+        return {"name": doc.get("name"), "version": doc["version"], "lastModified": doc.get("lastModified"),
+                "document": dict({k: v for k, v in document.items() if k != "children"}, children=pages)}
+
+    def image_refs(self, key: str) -> Optional[list]:
+        """imageRefs of every image fill in the document."""
+        doc = self.document(key)
+        if doc is None:
+            return None
+        refs: Dict[str, None] = {}
+        stack = [doc["document"]]
+        while stack:
+            node = stack.pop()
+            for fill in node.get("fills") or []:
+                if fill.get("type") == "IMAGE" and fill.get("imageRef"):
+                    refs.setdefault(fill["imageRef"])
+            stack.extend(node.get("children", []))
+        return list(refs)
+
+    def image(self, ref: str) -> bytes:
+        path = os.path.join(self.directory, "images", os.path.basename(ref))
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return f.read()
+        return b"\x89PNG\r\n\x1a\n" + ref.encode("utf-8")
+
+    def edit(self, key: str) -> Optional[str]:
+        if self.document(key) is None:
+            return None
+        self.edits[key] = self.edits.get(key, 0) + 1
+        return self.document(key)["version"]
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None,
+              content_type: str = "application/json") -> None:
+        data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+        if self.server.standin.latency:
+            time.sleep(self.server.standin.latency)
+        if status == 429:
+            self.server.standin.throttled.append(time.monotonic())
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        standin: StandIn = self.server.standin
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        if url.path == "/_stats":
+            self._send(200, standin.stats)
+            return
+        if len(parts) == 2 and parts[0] == "_images":
+            standin.stats["downloads"] += 1
+            self._send(200, standin.image(parts[1]), content_type="image/png")
+            return
+        if len(parts) < 3 or parts[:2] != ["v1", "files"]:
+            self._send(404, {"status": 404, "err": "Not found"})
+            return
+        retry_after = standin.admit()
+        if retry_after is not None:
+            standin.stats["throttled"] += 1
+            self._send(429, {"status": 429, "err": "Rate limit exceeded"}, {"Retry-After": str(retry_after)})
+            return
+        key = parts[2]
+        if len(parts) == 4 and parts[3] == "images":
+            standin.stats["images"] += 1
+            refs = standin.image_refs(key)
+            # like Figma's, the URLs point away from the API, here at /_images on the same host
+            host = self.headers.get("Host") or f"{self.server.server_address[0]}:{self.server.server_address[1]}"
+            body = None if refs is None else {"meta": {"images": {ref: f"http://{host}/_images/{ref}" for ref in refs}}}
+        elif parse_qs(url.query).get("depth") == ["1"]:
+            standin.stats["meta"] += 1
+            body = standin.meta(key)
+        else:
+            standin.stats["file"] += 1
+            body = standin.encoded(key)
+        if body is None:
+            self._send(404, {"status": 404, "err": "Not found"})
+        else:
+            self._send(200, body)
+
+    def do_POST(self) -> None:
+        parts = urlparse(self.path).path.strip("/").split("/")
+        if len(parts) == 3 and parts[:2] == ["v1", "_edit"]:
+            self.server.standin.stats["edit"] += 1
+            version = self.server.standin.edit(parts[2])
+            if version is not None:
+                self._send(200, {"version": version})
+                return
+        self._send(404, {"status": 404, "err": "Not found"})
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def serve(directory: str, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, rate: Optional[float] = None,
+          burst: int = 1, fail_every: int = 0, retry_after: int = 1) -> ThreadingHTTPServer:
+    """Starts a stand-in in a background thread; its base URL is f"http://{host}:{server.server_address[1]}/v1"."""
+    server = ThreadingHTTPServer((host, port), StandInHandler)
+    server.daemon_threads = True
+    server.standin = StandIn(directory, latency, rate, burst, fail_every, retry_after)
+    threading.Thread(target=server.serve_forever, name="figma-standin", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Figma documents from a directory like api.figma.com.")
+    parser.add_argument("--dir", required=True, help="Directory of <file key>.json documents")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--rate", type=float, help="API requests per second before answering 429 (default: no limit)")
+    parser.add_argument("--burst", type=int, default=1, help="Requests accepted back to back under --rate")
+    parser.add_argument("--fail-every", type=int, default=0, help="Answer every Nth API request with a 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds of --fail-every 429s")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), StandInHandler)
+    server.daemon_threads = True
+    server.standin = StandIn(args.dir, args.latency, args.rate, args.burst, args.fail_every, args.retry_after)
+    print(f"Serving {args.dir} on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
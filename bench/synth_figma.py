@@ -0,0 +1,282 @@
+"""
+Synthetic Figma documents for benchmarks.
+
+Builds a DOCUMENT → CANVAS → FRAME tree shaped like a real file: nested
+frames, groups and instances with rectangles, vectors and text inside, some
+containers in auto-layout, paints drawn from a fixed palette, the odd
+gradient, stroke, shadow and hidden node. Everything comes from a seeded RNG,
+so the same parameters always give the same document.
+
+    python bench/synth_figma.py --nodes 100000 --depth 8 -o /tmp/doc.json
+    python bench/synth_figma.py --nodes 100000 --cache-dir cache --file-key SYNTH100K
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from collections import deque
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FONTS = ("Inter", "Roboto", "SF Pro Text", "Helvetica Neue")
+WORDS = ("Sign", "in", "Email", "Password", "Continue", "Create", "account", "Forgot", "Settings",
+         "Profile", "Search", "Cancel", "Save", "Home", "Next", "Back", "Done", "Welcome")
+CONTAINER_TYPES = ("FRAME", "FRAME", "GROUP", "INSTANCE")
+LEAF_TYPES = ("RECTANGLE", "RECTANGLE", "VECTOR", "ELLIPSE")
+
+
+class Generator:
+    """
+    nodes:        total nodes under the document (pages and frames included)
+    depth:        deepest level below a top-level frame
+    auto_layout:  share of containers with layoutMode set
+    text:         share of leaves that are TEXT
+    paints:       number of distinct solid colors (paint diversity)
+    frames:       top-level frames on the page
+    components:   distinct components; with any, INSTANCE containers become
+                  override-free copies of one of them instead of new subtrees
+    """
+
+    def __init__(self, nodes: int = 1000, depth: int = 8, auto_layout: float = 0.4, text: float = 0.35,
+                 paints: int = 24, frames: int = 1, seed: int = 0, components: int = 0):
+        self.nodes = nodes
+        self.depth = depth
+        self.auto_layout = auto_layout
+        self.text = text
+        self.rng = random.Random(seed)
+        self.palette = [self._color() for _ in range(max(1, paints))]
+        self.frames = max(1, frames)
+        self.components = max(0, components)
+        self.component_defs: List[Dict[str, Any]] = []
+        self.next_id = 0
+        # children per container so `nodes` fit within `depth` levels
+        self.fanout = max(2.0, nodes ** (1.0 / max(1, depth)) * 1.3)
+
+    def _id(self) -> str:
+        self.next_id += 1
+        return f"{self.next_id // 1000 + 1}:{self.next_id % 1000}"
+
+    def _color(self) -> Dict[str, float]:
+        return {"r": self.rng.random(), "g": self.rng.random(), "b": self.rng.random(), "a": 1.0}
+
+    def _paint(self) -> Dict[str, Any]:
+        if self.rng.random() < 0.05:
+            return {"blendMode": "NORMAL", "type": "GRADIENT_LINEAR",
+                    "gradientHandlePositions": [{"x": 0.0, "y": 0.5}, {"x": 1.0, "y": 0.5}, {"x": 0.0, "y": 1.0}],
+                    "gradientStops": [{"color": self.rng.choice(self.palette), "position": 0.0},
+                                      {"color": self.rng.choice(self.palette), "position": 1.0}]}
+        paint = {"blendMode": "NORMAL", "type": "SOLID", "color": dict(self.rng.choice(self.palette))}
+        if self.rng.random() < 0.15:
+            paint["opacity"] = round(self.rng.uniform(0.2, 0.9), 2)
+        return paint
+
+    def _node(self, kind: str, box: Dict[str, float]) -> Dict[str, Any]:
+        rng = self.rng
+        node: Dict[str, Any] = {
+            "id": self._id(),
+            "name": f"{kind.title()} {self.next_id}",
+            "type": kind,
+            "blendMode": "PASS_THROUGH" if kind in CONTAINER_TYPES else "NORMAL",
+            "absoluteBoundingBox": box,
+            "absoluteRenderBounds": dict(box),
+            "constraints": {"vertical": "TOP", "horizontal": "LEFT"},
+            "fills": [self._paint()] if rng.random() < 0.7 else [],
+            "strokes": [self._paint()] if rng.random() < 0.2 else [],
+            "strokeWeight": 1.0,
+            "strokeAlign": "INSIDE",
+            "effects": [],
+        }
+        if rng.random() < 0.03:
+            node["visible"] = False
+        if rng.random() < 0.3:
+            node["cornerRadius"] = float(rng.choice((4, 8, 12, 16, 100)))
+            node["cornerSmoothing"] = 0.0
+        if rng.random() < 0.1:
+            node["effects"] = [{"type": "DROP_SHADOW", "visible": True, "radius": 8.0, "spread": 0.0,
+                                "color": {"r": 0.0, "g": 0.0, "b": 0.0, "a": 0.25},
+                                "offset": {"x": 0.0, "y": 4.0}, "blendMode": "NORMAL"}]
+        return node
+
+    def _text(self, box: Dict[str, float]) -> Dict[str, Any]:
+        node = self._node("TEXT", box)
+        words = self.rng.randint(1, 6)
+        node["characters"] = " ".join(self.rng.choice(WORDS) for _ in range(words))
+        size = float(self.rng.choice((11, 13, 15, 17, 20, 24, 32, 48)))
+        node["style"] = {
+            "fontFamily": self.rng.choice(FONTS),
+            "fontPostScriptName": None,
+            "fontWeight": self.rng.choice((400, 500, 600, 700)),
+            "textAutoResize": "WIDTH_AND_HEIGHT",
+            "fontSize": size,
+            "textAlignHorizontal": self.rng.choice(("LEFT", "LEFT", "CENTER", "RIGHT")),
+            "textAlignVertical": "CENTER",
+            "letterSpacing": round(-size * 0.01, 2),
+            "lineHeightPx": round(size * 1.2, 1),
+            "lineHeightPercent": 100.0,
+            "lineHeightUnit": "INTRINSIC_%",
+        }
+        node["fills"] = [{"blendMode": "NORMAL", "type": "SOLID", "color": dict(self.rng.choice(self.palette))}]
+        return node
+
+    def _make_layout(self, node: Dict[str, Any]) -> None:
+        rng = self.rng
+        node["layoutMode"] = rng.choice(("VERTICAL", "HORIZONTAL"))
+        node["itemSpacing"] = float(rng.choice((0, 4, 8, 10, 12, 16)))
+        for side in ("paddingLeft", "paddingRight", "paddingTop", "paddingBottom"):
+            node[side] = float(rng.choice((0, 8, 12, 16, 20)))
+        node["primaryAxisAlignItems"] = rng.choice(("MIN", "CENTER", "MAX", "SPACE_BETWEEN"))
+        node["counterAxisAlignItems"] = rng.choice(("MIN", "CENTER", "MAX"))
+        node["primaryAxisSizingMode"] = "FIXED"
+        node["counterAxisSizingMode"] = rng.choice(("FIXED", "AUTO"))
+        node["layoutAlign"] = "INHERIT"
+        node["layoutGrow"] = 0.0
+
+    def _child_boxes(self, parent: Dict[str, Any], count: int) -> List[Dict[str, float]]:
+        # auto-layout stacks children along its axis, anything else scatters them inside the parent
+        box = parent["absoluteBoundingBox"]
+        boxes = []
+        if parent.get("layoutMode"):
+            vertical = parent["layoutMode"] == "VERTICAL"
+            step = (box["height"] if vertical else box["width"]) / count
+            for i in range(count):
+                if vertical:
+                    boxes.append({"x": box["x"], "y": box["y"] + i * step, "width": box["width"], "height": step})
+                else:
+                    boxes.append({"x": box["x"] + i * step, "y": box["y"], "width": step, "height": box["height"]})
+        else:
+            for _ in range(count):
+                w = max(1.0, round(box["width"] * self.rng.uniform(0.2, 0.9)))
+                h = max(1.0, round(box["height"] * self.rng.uniform(0.1, 0.6)))
+                boxes.append({"x": box["x"] + round(self.rng.uniform(0, box["width"] - w)),
+                              "y": box["y"] + round(self.rng.uniform(0, box["height"] - h)),
+                              "width": w, "height": h})
+        return boxes
+
+    def _component(self, i: int) -> Dict[str, Any]:
+        box = {"x": 0.0, "y": 0.0, "width": float(self.rng.choice((120, 160, 240, 329))),
+               "height": float(self.rng.choice((40, 48, 58, 72)))}
+        root = self._node("COMPONENT", box)
+        root.pop("visible", None)
+        root["name"] = f"Component {i + 1}"
+        if self.rng.random() < self.auto_layout:
+            self._make_layout(root)
+        root["children"] = [self._text(b) if self.rng.random() < 0.5 else self._node(self.rng.choice(LEAF_TYPES), b)
+                            for b in self._child_boxes(root, self.rng.randint(2, 6))]
+        return root
+
+    def _place(self, node: Dict[str, Any], dx: float, dy: float, prefix: str) -> Dict[str, Any]:
+        copy = dict(node, id=f"{prefix};{node['id']}")
+        for key in ("absoluteBoundingBox", "absoluteRenderBounds"):
+            box = node[key]
+            copy[key] = dict(box, x=box["x"] + dx, y=box["y"] + dy)
+        if "children" in node:
+            copy["children"] = [self._place(c, dx, dy, prefix) for c in node["children"]]
+        return copy
+
+    def _instance(self, box: Dict[str, float]) -> Dict[str, Any]:
+        """An override-free instance of one of the components, at the box's corner."""
+        component = self.rng.choice(self.component_defs)
+        instance = self._place(component, box["x"], box["y"], f"I{self._id()}")
+        instance.update(type="INSTANCE", componentId=component["id"], overrides=[])
+        return instance
+
+    def document(self) -> Dict[str, Any]:
+        """The whole file, as GET /v1/files/:key returns it."""
+        frames = []
+        for i in range(self.frames):
+            frame = self._node("FRAME", {"x": i * 500.0, "y": 0.0, "width": 393.0, "height": 852.0})
+            frame["name"] = f"Screen {i + 1}"
+            frame["fills"] = [{"blendMode": "NORMAL", "type": "SOLID", "color": {"r": 1.0, "g": 1.0, "b": 1.0, "a": 1.0}}]
+            frame.pop("visible", None)
+            frame["children"] = []
+            frames.append(frame)
+        canvas = {"id": "0:1", "name": "Page 1", "type": "CANVAS", "children": frames,
+                  "backgroundColor": {"r": 0.96, "g": 0.96, "b": 0.96, "a": 1.0}}
+        remaining = self.nodes - len(frames) - 2  # document and canvas count too
+        self.component_defs = [self._component(i) for i in range(self.components)]
+
+        # breadth-first, so every level fills up before the next one starts
+        queue = deque((f, 0) for f in frames)
+        while remaining > 0:
+            if not queue:
+                queue.extend((f, 0) for f in frames)
+            parent, depth = queue.popleft()
+            count = min(remaining, max(1, round(self.rng.expovariate(1 / self.fanout))))
+            for box in self._child_boxes(parent, count):
+                container = depth + 1 < self.depth and self.rng.random() < 0.35
+                kind = self.rng.choice(CONTAINER_TYPES) if container else None
+                if kind == "INSTANCE" and self.component_defs:
+                    child = self._instance(box)
+                    remaining -= count_nodes(child) - 1
+                elif container:
+                    child = self._node(kind, box)
+                    if self.rng.random() < self.auto_layout:
+                        self._make_layout(child)
+                    child["children"] = []
+                    queue.append((child, depth + 1))
+                elif self.rng.random() < self.text:
+                    child = self._text(box)
+                else:
+                    child = self._node(self.rng.choice(LEAF_TYPES), box)
+                parent.setdefault("children", []).append(child)
+            remaining -= count
+
+        return {
+            "document": {"id": "0:0", "name": "Document", "type": "DOCUMENT", "children": [canvas]},
+            "components": {c["id"]: {"key": c["id"], "name": c["name"], "description": ""}
+                           for c in self.component_defs},
+            "componentSets": {},
+            "schemaVersion": 0,
+            "styles": {},
+            "name": f"Synthetic {self.nodes} nodes",
+            "lastModified": "2024-01-01T00:00:00Z",
+            "version": f"synthetic-{self.nodes}",
+            "role": "owner",
+            "editorType": "figma",
+        }
+
+
+def count_nodes(node: Dict[str, Any]) -> int:
+    count, stack = 0, [node]
+    while stack:
+        n = stack.pop()
+        count += 1
+        stack.extend(n.get("children", []))
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Figma document.")
+    parser.add_argument("--nodes", type=int, default=10000, help="Total node count")
+    parser.add_argument("--depth", type=int, default=8, help="Deepest level below a top-level frame")
+    parser.add_argument("--auto-layout", type=float, default=0.4, help="Share of containers with auto-layout")
+    parser.add_argument("--text", type=float, default=0.35, help="Share of leaves that are TEXT")
+    parser.add_argument("--paints", type=int, default=24, help="Distinct solid colors")
+    parser.add_argument("--frames", type=int, default=1, help="Top-level frames on the page")
+    parser.add_argument("--components", type=int, default=0,
+                        help="Distinct components; INSTANCE nodes become copies of them")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="Write the document JSON here")
+    parser.add_argument("--cache-dir", help="Save it as a cache entry in this directory instead")
+    parser.add_argument("--file-key", default="SYNTHETIC", help="File key of the cache entry")
+    args = parser.parse_args()
+
+    gen = Generator(args.nodes, args.depth, args.auto_layout, args.text, args.paints, args.frames, args.seed,
+                    args.components)
+    doc = gen.document()
+    if args.cache_dir:
+        sys.path.insert(0, os.path.join(ROOT, "classic"))
+        from figma_cache import save_cache
+        os.makedirs(args.cache_dir, exist_ok=True)
+        path = save_cache(args.cache_dir, args.file_key, doc)
+    else:
+        path = args.output or f"synthetic-{args.nodes}.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(doc, f)
+    print(f"{count_nodes(doc['document'])} nodes → {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from css_html import StyleConverter, _geometry_declarations, _iter_nodes_html, _own_style, _walk
+from mapper import UiNode, build_ui_tree
+
+# Component-instance memoization: INSTANCE nodes that render exactly like their
+# main component (Figma lists no overrides for them) and share its size are
+# mapped, styled and rendered once per component. The rules are split so that
+# only the instance's own box depends on where it sits:
+#   .cmp-N           the instance root's appearance
+#   .cmp-N-<i>       the i-th node inside (pre-order): its appearance and its
+#                    box relative to its parent, so it holds in every instance
+#   .<instance>      the instance's box, relative to the page root, as usual
+# The markup inside is the same in every instance and is rendered once.
+# Only an empty `overrides` list is shared: instances with overrides are
+# mapped in full, like any other node, rather than emitting override deltas.
+
+def _rule(cls: str, decls) -> Iterator[str]:
+    yield f".{cls} {{"
+    for d in decls:
+        yield f"  {d};"
+    yield "}"
+
+
+class Component:
+    """One component at one size: its mapped subtree, CSS rules and markup."""
+
+    def __init__(self, cls: str, root: UiNode):
+        self.cls = cls
+        self.root = root
+        self.instances = 0
+        # the nodes inside, with their position in the template, so classes are the same in every instance
+        self.nodes = [(i, n, parent_is_flex) for i, (n, parent_is_flex) in enumerate(_walk(root)) if i]
+        self.classes = {root.id: cls}
+        self.classes.update((n.id, f"{cls}-{i}") for i, n, _ in self.nodes)
+        self.parents = {c.id: n for n, _ in _walk(root) for c in n.children}
+        self._html: Optional[str] = None
+
+    def html(self) -> str:
+        """The markup inside every instance; rendered on first use."""
+        if self._html is None:
+            self._html = "".join(chunk for c in self.root.children for chunk in _iter_nodes_html(c, self.classes))
+        return self._html
+
+    def rules(self, conv: StyleConverter) -> Iterator[str]:
+        """
+        The rules shared by every instance: the instance root's appearance, and
+        for each node inside its appearance and its box, placed relative to its
+        parent's box (the instance's, for the top-level ones) rather than to the
+        page, since an instance without overrides lays out like the template.
+        """
+        style = _own_style(self.root, conv)
+        if style:
+            yield from _rule(self.cls, style)
+        for i, n, parent_is_flex in self.nodes:
+            geometry = _geometry_declarations(n, parent_is_flex, self.parents[n.id])
+            yield from _rule(self.classes[n.id], geometry + _own_style(n, conv))
+
+
+class ComponentCache:
+    """
+    Components by (componentId, width, height), built from their first instance.
+    Pass it to build_ui_tree and to the StyleConverter used for the same tree.
+    Iterating gives the components in the order they were built (nested ones first).
+    """
+
+    def __init__(self, prefix: str = "cmp", table: Optional[Dict[bytes, Dict[str, Any]]] = None):
+        self.prefix = prefix
+        self.table = table if table is not None else {}
+        self.components: Dict[Tuple[Any, ...], Component] = {}
+        self.instances = 0
+
+    @staticmethod
+    def key(node: Dict[str, Any]) -> Optional[Tuple[Any, ...]]:
+        # only an explicit, empty overrides list says the instance looks like its component
+        if node.get("type") != "INSTANCE" or not node.get("componentId") or node.get("overrides") != []:
+            return None
+        box = node.get("absoluteBoundingBox") or {}
+        return node["componentId"], box.get("width"), box.get("height")
+
+    def get(self, node: Dict[str, Any]) -> Optional[Component]:
+        """The shared component for an instance node, or None when it has to be mapped itself."""
+        key = self.key(node)
+        if key is None:
+            return None
+        component = self.components.get(key)
+        if component is None:
+            root, _ = build_ui_tree(node, table=self.table, components=self)
+            component = self.components[key] = Component(f"{self.prefix}-{len(self.components)}", root)
+        component.instances += 1
+        self.instances += 1
+        return component
+
+    def __iter__(self) -> Iterator[Component]:
+        return iter(self.components.values())
+
+    def format_stats(self) -> str:
+        nodes = sum(len(c.classes) for c in self)
+        return f"{self.instances} instances share {len(self.components)} components ({nodes} nodes mapped once)"
@@ -1,6 +1,12 @@
-from jinja2 import Environment, FileSystemLoader
+import re
+from functools import lru_cache
+from itertools import chain
 from pathlib import Path
-from typing import Dict, Any
+from typing import TYPE_CHECKING, Dict, Any, Iterable, Iterator, Optional, TextIO, Union
+from mapper import UiNode, UiNodeDict
+
+if TYPE_CHECKING:
+    from jinja2 import Environment, Template
 
 
 def _rgba_from_color(c: Dict[str, Any], opacity: float | None = None) -> str:
@@ -76,131 +82,418 @@ def _text_style_css(text_style: Dict[str, Any]) -> list[str]:
     return decls
 
 
+_MISSING = object()
+_RGBA = re.compile(r"rgba\([^)]*\)")
+_TEXT_KEYS = ("fontFamily", "fontSize", "fontWeight", "lineHeightPx", "letterSpacing", "textAlignHorizontal")
+
+
+def _color_key(c: Dict[str, Any] | None) -> tuple:
+    if not c:
+        return ()
+    return (c.get("r", 0), c.get("g", 0), c.get("b", 0), c.get("a", 1.0))
+
+def _paint_key(p: Dict[str, Any]) -> tuple:
+    # everything _extract_fill/_extract_stroke read from a paint, nothing else
+    stops = tuple((_color_key(s["color"]), s.get("position", 0)) for s in p.get("gradientStops") or ())
+    return (p.get("type", ""), _color_key(p.get("color", {})), p.get("opacity", _MISSING), stops)
+
+# Figma scaleMode -> background-size / background-repeat
+_IMAGE_SCALE = {
+    "FILL": ("cover", "no-repeat"),
+    "FIT": ("contain", "no-repeat"),
+    "STRETCH": ("100% 100%", "no-repeat"),
+    "TILE": ("auto", "repeat"),
+}
+
+def _image_declarations(url: str, scale_mode: str | None) -> list[str]:
+    size, repeat = _IMAGE_SCALE.get(scale_mode or "FILL", _IMAGE_SCALE["FILL"])
+    return [f'background-image: url("{url}")', f"background-size: {size}",
+            "background-position: center", f"background-repeat: {repeat}"]
+
+def _font_shorthand(text_style: Dict[str, Any]) -> str | None:
+    # the font-* / line-height part of _text_style_css as one `font` value
+    if "fontFamily" not in text_style or "fontSize" not in text_style:
+        return None
+    parts = []
+    if "fontWeight" in text_style:
+        parts.append(str(int(text_style["fontWeight"])))
+    size = f"{text_style['fontSize']}px"
+    if "lineHeightPx" in text_style:
+        size += f"/{text_style['lineHeightPx']}px"
+    parts.append(size)
+    parts.append(f"'{text_style['fontFamily']}', sans-serif")
+    return " ".join(parts)
+
+
+class StyleConverter:
+    """
+    Memoized paint/typography conversion for one export.
+    Paints and text styles are keyed on their normalized values, so the few
+    dozen a design system uses are converted once however many nodes share them.
+    After collect_tokens(), colors and fonts used more than once come back as
+    var(--color-N) / var(--font-N) references, declared once in :root.
+    `images` maps imageRef -> URL for the image fills that have been downloaded.
+    `components` is the ComponentCache the tree was built with, if any: its
+    rules go out with the preamble.
+    """
+
+    def __init__(self, images: Optional[Dict[str, str]] = None, components=None):
+        self.images = images or {}
+        self.components = components if components is not None else ()
+        self._memo: Dict[tuple, Any] = {}
+        self.stats = {"hits": 0, "misses": 0}
+        self.colors: Dict[str, str] = {}  # rgba(...) -> --color-N
+        self.fonts: Dict[str, str] = {}   # font shorthand -> --font-N
+
+    def _cached(self, key: tuple, convert, *args):
+        try:
+            value = self._memo[key]
+            self.stats["hits"] += 1
+        except KeyError:
+            value = self._memo[key] = convert(*args)
+            self.stats["misses"] += 1
+        return value
+
+    def _ref(self, value: str | None) -> str | None:
+        # swap token colors in a converted value for their var() reference
+        if not value or not self.colors:
+            return value
+        return self._cached(("ref", value), _RGBA.sub,
+                            lambda m: f"var({self.colors[m.group(0)]})" if m.group(0) in self.colors else m.group(0),
+                            value)
+
+    def fill(self, styles: Dict[str, Any]) -> str | None:
+        fills = styles.get("fills") or []
+        if not fills:
+            return None
+        return self._ref(self._cached(("fill", _paint_key(fills[0])), _extract_fill, {"fills": fills[:1]}))
+
+    def stroke(self, styles: Dict[str, Any]) -> str | None:
+        strokes = styles.get("strokes") or []
+        if not strokes:
+            return None
+        weight = styles.get("strokeWeight", _MISSING)
+        args = {"strokes": strokes[:1]}
+        if weight is not _MISSING:
+            args["strokeWeight"] = weight
+        return self._ref(self._cached(("stroke", _paint_key(strokes[0]), weight), _extract_stroke, args))
+
+    def image(self, styles: Dict[str, Any]) -> list[str]:
+        fills = styles.get("fills") or []
+        if not fills or fills[0].get("type") != "IMAGE":
+            return []
+        url = self.images.get(fills[0].get("imageRef"))
+        if not url:
+            return []
+        scale_mode = fills[0].get("scaleMode")
+        return self._cached(("image", url, scale_mode), _image_declarations, url, scale_mode)
+
+    def text_color(self, styles: Dict[str, Any]) -> str | None:
+        fills = styles.get("fills") or []
+        if not fills or fills[0].get("type") != "SOLID":
+            return None
+        return self.fill(styles)
+
+    def text(self, text_style: Dict[str, Any]) -> list[str]:
+        key = tuple(text_style.get(k, _MISSING) for k in _TEXT_KEYS)
+        decls = self._cached(("text", key), _text_style_css, text_style)
+        if not self.fonts:
+            return decls
+        return self._cached(("font", key), self._text_with_font, text_style, decls)
+
+    def _text_with_font(self, text_style: Dict[str, Any], decls: list[str]) -> list[str]:
+        token = self.fonts.get(_font_shorthand(text_style) or "")
+        if not token:
+            return decls
+        # font-family/size/weight and line-height collapse into the token
+        rest = [d for d in decls if not d.startswith(("font-", "line-height:"))]
+        return [f"font: var({token});"] + rest
+
+    def collect_tokens(self, root: UiNode) -> None:
+        """
+        Counts the colors and fonts used across the tree; every value used more
+        than once becomes a --color-N / --font-N custom property.
+        """
+        colors: Dict[str, int] = {}
+        fonts: Dict[str, int] = {}
+        # component templates count once, like the rules they are written as
+        roots = [root] + [c.root for c in self.components]
+        for n, _ in chain.from_iterable(_walk(r) for r in roots):
+            for d in _own_style(n, self):
+                for c in _RGBA.findall(d):
+                    colors[c] = colors.get(c, 0) + 1
+            if n.kind == "text":
+                font = _font_shorthand(n.styles.get("textStyle", {}))
+                if font:
+                    fonts[font] = fonts.get(font, 0) + 1
+        self.colors = {c: f"--color-{i}" for i, c in enumerate(c for c, k in colors.items() if k > 1)}
+        self.fonts = {f: f"--font-{i}" for i, f in enumerate(f for f, k in fonts.items() if k > 1)}
+
+    def root_rule(self) -> Iterator[str]:
+        if not self.colors and not self.fonts:
+            return
+        yield ":root {"
+        for value, token in self.colors.items():
+            yield f"  {token}: {value};"
+        for value, token in self.fonts.items():
+            yield f"  {token}: {value};"
+        yield "}"
+
+    def format_stats(self) -> str:
+        return (f"{self.stats['hits']} conversion hits, {self.stats['misses']} misses, "
+                f"{len(self.colors)} color and {len(self.fonts)} font tokens")
+
+
 # CSS generator
-def generate_css(root: Dict[str, Any], id_to_class: Dict[str, str]) -> str:
+def _geometry_declarations(n: UiNode, parent_is_flex: bool, root: UiNode) -> list[str]:
+    # placement and size: unique to nearly every node, never shared
+    # `root` is the box the node is placed in: the page root, or a parent inside a component
+    is_center_text = False
+    if n.kind == "text":
+        ts = n.styles.get("textStyle", {})
+        if ts.get("textAlignHorizontal") == "CENTER":
+            is_center_text = True
+    x = n.abs_x - root.abs_x
+    y = n.abs_y - root.abs_y
+
+    w = n.width
+    h = n.height
+
+    decls: list[str] = []
+    
+    if not parent_is_flex:
+        decls.append("position: absolute")
+        decls.append(f"left: {int(x)}px")
+        if should_be_bottom_anchored(y, h, root.height):
+            bottom_val = root.height - (y + h)
+            decls.append(f"bottom: {int(bottom_val)}px")
+        else:
+            decls.append(f"top: {int(y)}px")
+    else:
+        decls.append("position: static")
+        if n.kind == "text" and is_center_text:
+            decls.append("align-self: center")
+    decls.append(f"width: {int(w)}px")
+    decls.append(f"height: {int(h)}px")
+    return decls
+
+def _style_declarations(n: UiNode, conv: StyleConverter) -> list[str]:
+    # appearance: depends only on the node's kind and styles, so it repeats across nodes
+    styles = n.styles
+    decls: list[str] = []
+
+    flex = styles.get("flex")
+    if flex:
+        decls.append("display: flex")
+        direction = flex.get("direction", "column")
+        decls.append(f"flex-direction: {direction}")
+        gap = flex.get("gap", 0)
+        if gap:
+            decls.append(f"gap: {int(gap)}px")
+        align_map = {"MIN":"flex-start","CENTER":"center","MAX":"flex-end","SPACE_BETWEEN":"space-between"}
+        if flex.get("primaryAlign"):
+            decls.append(f"justify-content: {align_map.get(flex['primaryAlign'],'flex-start')}")
+        if flex.get("counterAlign"):
+            decls.append(f"align-items: {align_map.get(flex['counterAlign'],'flex-start')}")
+
+    if n.kind != "text":
+        fill = conv.fill(styles)
+        if fill:
+            decls.append(f"background: {fill}")
+        else:
+            decls.extend(conv.image(styles))
+
+    stroke = conv.stroke(styles)
+    if stroke:
+        decls.append(f"border: {stroke}")
+
+    if "cornerRadius" in styles:
+        decls.append(f"border-radius: {styles['cornerRadius']}px")
+    elif "cornerRadii" in styles:
+        cr = styles["cornerRadii"]
+        decls.append(f"border-radius: {cr[0]}px {cr[1]}px {cr[2]}px {cr[3]}px")
+
+    if n.kind == "text":
+        text_style = styles.get("textStyle", {})
+        decls.extend(conv.text(text_style))
+        color = conv.text_color(styles)
+        if color:
+            decls.append(f"color: {color}")
+        decls.append("white-space: pre-wrap")
+        decls.append("display: flex")
+        decls.append("align-items: center")
+        align = text_style.get("textAlignHorizontal")
+        if align == "CENTER":
+            decls.append("text-align: center")
+            decls.append("justify-content: center") 
+        elif align == "RIGHT":
+            decls.append("text-align: right")
+        else:
+            decls.append("text-align: left")
+
+    #apply padding
+    pad = styles.get("padding", {})
+    if pad:
+        l = pad.get("paddingLeft", 0)
+        r = pad.get("paddingRight", 0)
+        t = pad.get("paddingTop", 0)
+        b = pad.get("paddingBottom", 0)
+        decls.append(f"padding: {t}px {r}px {b}px {l}px")
+
+    return decls
+
+def _own_style(n: UiNode, conv: StyleConverter) -> list[str]:
+    # a shared instance's appearance is in its component's class
+    return [] if n.component is not None else _style_declarations(n, conv)
+
+def _walk(root: UiNode) -> Iterator[tuple[UiNode, bool]]:
+    # explicit stack (pre-order, same order as a recursive walk) so deep trees can't hit the recursion limit
+    stack = [(root, False)]
+    while stack:
+        n, parent_is_flex = stack.pop()
+        yield n, parent_is_flex
+        child_parent_is_flex = bool(n.styles.get("flex"))
+        stack.extend((c, child_parent_is_flex) for c in reversed(n.children))
+
+def _rule_size(cls: str, decls: list[str]) -> int:
+    # length of the rule as iter_css writes it, newlines included
+    return len(cls) + 4 + sum(len(d) + 4 for d in decls) + 2
+
+def dedupe_css(root: Union[UiNode, UiNodeDict], id_to_class: Dict[str, str],
+               conv: Optional[StyleConverter] = None) -> Dict[str, Any]:
+    """
+    Hash-conses the appearance declarations of every node (fills, borders,
+    radii, flex, text styles, padding). Each set used by two or more nodes
+    becomes one shared class; node rules then keep only their geometry and
+    whatever styles are unique to them.
+    Returns a plan for iter_css/iter_html:
+      shared  - declaration tuple -> shared class name, in first-use order
+      classes - node id -> class list for the HTML ("node_1_75 shared_3")
+      stats   - rule and byte counts before/after
+    Two linear passes; only the distinct declaration sets are kept in memory.
+    Pass the same StyleConverter to iter_css when color/font tokens are in use.
+    """
+    if isinstance(root, dict):
+        root = UiNode.from_dict(root)
+    conv = conv or StyleConverter()
+
+    counts: Dict[tuple, int] = {}
+    before = 0
+    for n, parent_is_flex in _walk(root):
+        key = tuple(_own_style(n, conv))
+        if key:
+            counts[key] = counts.get(key, 0) + 1
+        cls = id_to_class.get(n.id, "node_"+n.id.replace(":", "_"))
+        before += _rule_size(cls, _geometry_declarations(n, parent_is_flex, root) + list(key))
+
+    shared: Dict[tuple, str] = {}
+    after = 0
+    for key, count in counts.items():
+        if count > 1:
+            shared[key] = f"shared_{len(shared)}"
+            after += _rule_size(shared[key], list(key))
+
+    classes: Dict[str, str] = {}
+    deduped = 0
+    for n, parent_is_flex in _walk(root):
+        cls = id_to_class.get(n.id, "node_"+n.id.replace(":", "_"))
+        decls = _geometry_declarations(n, parent_is_flex, root)
+        key = tuple(_own_style(n, conv))
+        if key in shared:
+            classes[n.id] = f"{cls} {shared[key]}"
+            deduped += 1
+        else:
+            classes[n.id] = cls
+            decls += key
+        after += _rule_size(cls, decls)
+
+    stats = {"nodes": len(classes), "deduped": deduped, "shared_classes": len(shared),
+             "bytes_before": before, "bytes_after": after}
+    return {"shared": shared, "classes": classes, "stats": stats}
+
+def format_dedupe_stats(stats: Dict[str, int]) -> str:
+    saved = stats["bytes_before"] - stats["bytes_after"]
+    pct = 100.0 * saved / stats["bytes_before"] if stats["bytes_before"] else 0.0
+    return (f"{stats['deduped']}/{stats['nodes']} rules share {stats['shared_classes']} classes, "
+            f"{stats['bytes_before']} → {stats['bytes_after']} bytes (-{pct:.1f}%)")
+
+def iter_css(root: Union[UiNode, UiNodeDict], id_to_class: Dict[str, str],
+             plan: Optional[Dict[str, Any]] = None,
+             conv: Optional[StyleConverter] = None) -> Iterator[str]:
     """
     Improved CSS generator:
       - Avoid absolute positioning for children of auto-layout/flex containers.
       - Do not set background on text nodes; set color instead.
       - Keep fills/strokes/cornerRadius/text styles as before.
+    Yields the stylesheet line by line, one node at a time, so nothing is held
+    beyond the current rule.
+    With a plan from dedupe_css, shared classes are emitted first and node rules
+    leave out the declarations they share. A StyleConverter with collected tokens
+    adds a :root rule with the color/font custom properties.
+    Takes UiNodes from build_ui_tree; dict trees from map_figma_to_ui are converted first.
     """
-    lines: list[str] = []
-    root_layout = root.get("styles", {}).get("layout", {})
-    root_x = root_layout.get("abs_x", 0)
-    root_y = root_layout.get("abs_y", 0)
-    root_w = root_layout.get("width", 0)
-    root_h = root_layout.get("height", 0)
-
-    lines.append("/* Reset */")
-    lines.append("* { box-sizing: border-box; }")
-    lines.append("html, body { height: 100%; }")
-    lines.append("body { margin: 0; padding: 0; background: #111;}")
-    lines.append(f".canvas {{ position: relative; width: {int(root_w)}px; height: {int(root_h)}px; background: transparent; overflow: hidden; margin: 0 auto;}}")
-
-    def walk(n: Dict[str, Any], parent_is_flex: bool = False):
-        nid = n["id"]
-        cls = id_to_class.get(nid, "node_"+nid.replace(":", "_"))
-        styles = n.get("styles", {})
-        layout = styles.get("layout", {})
-        is_center_text = False
-        if n.get("kind") == "text":
-            ts = styles.get("textStyle", {})
-            if ts.get("textAlignHorizontal") == "CENTER":
-                is_center_text = True
-        x = layout.get("abs_x", 0) - root_x
-        y = layout.get("abs_y", 0) - root_y
-
-        w = layout.get("width", 0)
-        h = layout.get("height", 0)
-
-        decls: list[str] = []
-        
-        if not parent_is_flex:
-            decls.append("position: absolute")
-            decls.append(f"left: {int(x)}px")
-            if should_be_bottom_anchored(y, h, root_h):
-                bottom_val = root_h - (y + h)
-                decls.append(f"bottom: {int(bottom_val)}px")
-            else:
-                decls.append(f"top: {int(y)}px")
+    if isinstance(root, dict):
+        root = UiNode.from_dict(root)
+    conv = conv or StyleConverter()
+    shared = plan["shared"] if plan else {}
+
+    yield from css_preamble(root, shared, conv)
+    for n, parent_is_flex in _walk(root):
+        yield from node_rule(n, parent_is_flex, root, id_to_class, shared, conv)
+
+def css_preamble(root: UiNode, shared: Dict[tuple, str], conv: StyleConverter) -> Iterator[str]:
+    """Reset, canvas, :root tokens and shared classes: everything ahead of the node rules."""
+    yield "/* Reset */"
+    yield "* { box-sizing: border-box; }"
+    yield "html, body { height: 100%; }"
+    yield "body { margin: 0; padding: 0; background: #111;}"
+    yield f".canvas {{ position: relative; width: {int(root.width)}px; height: {int(root.height)}px; background: transparent; overflow: hidden; margin: 0 auto;}}"
+    yield from conv.root_rule()
+
+    for key, shared_cls in shared.items():
+        yield f".{shared_cls} {{"
+        for d in key:
+            yield f"  {d};"
+        yield "}"
+
+    for component in conv.components:
+        yield from component.rules(conv)
+
+def node_rule(n: UiNode, parent_is_flex: bool, root: UiNode, id_to_class: Dict[str, str],
+              shared: Dict[tuple, str], conv: StyleConverter) -> Iterator[str]:
+    """The lines of one node's CSS rule; a shared instance's inner boxes are in its component's rules."""
+    cls = id_to_class.get(n.id, "node_"+n.id.replace(":", "_"))
+    decls = _geometry_declarations(n, parent_is_flex, root)
+    style = _own_style(n, conv)
+    if tuple(style) not in shared:
+        decls += style
+
+    # write CSS block
+    yield f".{cls} {{"
+    for d in decls:
+        yield f"  {d};"
+    yield "}"
+
+def _write_lines(lines: Iterable[str], out: TextIO) -> None:
+    # same text as "\n".join(lines), written as it's produced
+    first = True
+    for line in lines:
+        if first:
+            out.write(line)
+            out.flush()
+            first = False
         else:
-            decls.append("position: static")
-            if n.get("kind") == "text" and is_center_text:
-                decls.append("align-self: center")
-        decls.append(f"width: {int(w)}px")
-        decls.append(f"height: {int(h)}px")
-
-        flex = styles.get("flex")
-        if flex:
-            decls.append("display: flex")
-            direction = flex.get("direction", "column")
-            decls.append(f"flex-direction: {direction}")
-            gap = flex.get("gap", 0)
-            if gap:
-                decls.append(f"gap: {int(gap)}px")
-            align_map = {"MIN":"flex-start","CENTER":"center","MAX":"flex-end","SPACE_BETWEEN":"space-between"}
-            if flex.get("primaryAlign"):
-                decls.append(f"justify-content: {align_map.get(flex['primaryAlign'],'flex-start')}")
-            if flex.get("counterAlign"):
-                decls.append(f"align-items: {align_map.get(flex['counterAlign'],'flex-start')}")
-
-        fill = _extract_fill(styles)
-        if fill and n.get("kind") != "text":
-            decls.append(f"background: {fill}")
+            out.write("\n")
+            out.write(line)
 
-        stroke = _extract_stroke(styles)
-        if stroke:
-            decls.append(f"border: {stroke}")
-
-        if "cornerRadius" in styles:
-            decls.append(f"border-radius: {styles['cornerRadius']}px")
-        elif "cornerRadii" in styles:
-            cr = styles["cornerRadii"]
-            decls.append(f"border-radius: {cr[0]}px {cr[1]}px {cr[2]}px {cr[3]}px")
-
-        if n.get("kind") == "text":
-            text_style = styles.get("textStyle", {})
-            decls.extend(_text_style_css(text_style))
-            fills = styles.get("fills") or []
-            if fills:
-                p = fills[0]
-                if p.get("type") == "SOLID":
-                    color = p.get("color", {})
-                    opacity = p.get("opacity", color.get("a", 1.0))
-                    decls.append(f"color: {_rgba_from_color(color, opacity)}")
-            decls.append("white-space: pre-wrap")
-            decls.append("display: flex")
-            decls.append("align-items: center")
-            align = text_style.get("textAlignHorizontal")
-            if align == "CENTER":
-                decls.append("text-align: center")
-                decls.append("justify-content: center") 
-            elif align == "RIGHT":
-                decls.append("text-align: right")
-            else:
-                decls.append("text-align: left")
-
-        #apply padding
-        pad = styles.get("padding", {})
-        if pad:
-            l = pad.get("paddingLeft", 0)
-            r = pad.get("paddingRight", 0)
-            t = pad.get("paddingTop", 0)
-            b = pad.get("paddingBottom", 0)
-            decls.append(f"padding: {t}px {r}px {b}px {l}px")    
-
-        # write CSS block
-        lines.append(f".{cls} {{")
-        for d in decls:
-            lines.append(f"  {d};")
-        lines.append("}")
-
-        child_parent_is_flex = bool(flex)
-        for c in n.get("children", []):
-            walk(c, parent_is_flex=child_parent_is_flex)
-
-    walk(root, parent_is_flex=False)
-    return "\n".join(lines)
+def write_css(root: Union[UiNode, UiNodeDict], id_to_class: Dict[str, str], out: TextIO,
+              plan: Optional[Dict[str, Any]] = None, conv: Optional[StyleConverter] = None) -> None:
+    """Streams the stylesheet into a file or any writable text stream."""
+    _write_lines(iter_css(root, id_to_class, plan, conv), out)
+
+def generate_css(root: Union[UiNode, UiNodeDict], id_to_class: Dict[str, str],
+                 plan: Optional[Dict[str, Any]] = None, conv: Optional[StyleConverter] = None) -> str:
+    return "\n".join(iter_css(root, id_to_class, plan, conv))
 
 def should_be_bottom_anchored(y, h, root_h, threshold=12):
     # Anchors if the bottom is very close to the canvas's bottom edge and checks usual figma 12px
@@ -208,37 +501,142 @@ def should_be_bottom_anchored(y, h, root_h, threshold=12):
 
 
 # HTML generator using Jinja2
-def generate_html(root: Dict[str, Any], id_to_class: Dict[str, str]) -> str:
-    def _escape(text: str) -> str:
-        return (text or "").replace("&","&amp;").replace("<","&lt;").replace(">","&gt;")
+_BODY_MARKER = "\x00body_html\x00"
+
+# resolved from this file, so exports work whatever the working directory
+_REPO_DIR = Path(__file__).resolve().parent.parent
+TEMPLATE_DIR = _REPO_DIR / "templates"
+BYTECODE_CACHE_DIR = _REPO_DIR / "cache" / "jinja"
+TEMPLATE_NAME = "export.html.j2"
 
-    def render(node: Dict[str, Any]) -> str:
-        cls = id_to_class.get(node["id"], "node_"+node["id"].replace(":", "_"))
-        kind = node.get("kind", "").lower()
-        name = node.get("name", "").lower()
+_env: Optional["Environment"] = None
 
-        if kind == "text":
-            return f'<div class="{cls}">{_escape(node.get("text",""))}</div>'
+def get_environment() -> "Environment":
+    """
+    The shared Jinja environment, created (and jinja2 imported) on first use.
+    Compiled templates are kept on disk in cache/jinja, so a new process skips
+    compiling them too.
+    """
+    global _env
+    if _env is None:
+        from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+        bytecode_cache = None
+        try:
+            BYTECODE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(str(BYTECODE_CACHE_DIR))
+        except OSError:
+            pass  # read-only checkout: compile in memory only
+        _env = Environment(loader=FileSystemLoader(TEMPLATE_DIR), autoescape=True,
+                           bytecode_cache=bytecode_cache)
+    return _env
+
+@lru_cache(maxsize=None)
+def get_template(name: str = TEMPLATE_NAME) -> "Template":
+    """Loads a template once per process (skipping Jinja's per-call up-to-date check)."""
+    return get_environment().get_template(name)
+
+def _escape(text: str) -> str:
+    return (text or "").replace("&","&amp;").replace("<","&lt;").replace(">","&gt;")
+
+def element_kind(node: UiNode) -> str:
+    """Which element a node renders as: "text", "input", "button" or "div"."""
+    kind = node.kind.lower()
+    name = node.name.lower()
+
+    if kind == "text":
+        return "text"
 
-        if kind == "shape":
-            children_html = "".join(render(c) for c in node.get("children", []))
-            return f'<div class="{cls}">{children_html}</div>'
+    if kind != "shape":
         #input
         if "input" in name or "email" in name or "password" in name:
-            tp = "password" if "password" in name else "text"
-            placeholder = _escape(node.get("text","") or node.get("name",""))
-            return f'<input class="{cls}" type="{tp}" placeholder="{placeholder}"/>'
+            return "input"
 
         # buttons
         if "button" in name or "sign in" in name or "continue" in name or "create account" in name:
-            label = _escape(node.get("text","") or node.get("name","Button"))
-            return f'<button class="{cls}">{label}</button>' 
+            return "button"
+
+    return "div"
+
+def node_html(node: UiNode, id_to_class: Dict[str, str]) -> tuple[str, str | None]:
+    """
+    Markup around one node's children: (opening, closing).
+    closing is None for elements rendered whole (text, inputs, buttons),
+    whose children don't appear in the page.
+    """
+    cls = id_to_class.get(node.id, "node_"+node.id.replace(":", "_"))
+    element = element_kind(node)
+    if node.component is not None:
+        cls = f"{cls} {node.component.cls}"
+
+    if element == "text":
+        return f'<div class="{cls}">{_escape(node.text)}</div>', None
+
+    if element == "input":
+        tp = "password" if "password" in node.name.lower() else "text"
+        placeholder = _escape(node.text or node.name)
+        return f'<input class="{cls}" type="{tp}" placeholder="{placeholder}"/>', None
+
+    if element == "button":
+        label = _escape(node.text or node.name)
+        return f'<button class="{cls}">{label}</button>', None
+
+    if node.component is not None:
+        # the component's markup, rendered once, stands in for the children
+        return f'<div class="{cls}">{node.component.html()}', "</div>"
+    return f'<div class="{cls}">', "</div>"
+
+def _iter_nodes_html(root_node: UiNode, id_to_class: Dict[str, str]) -> Iterator[str]:
+    # explicit stack of nodes and pending closing tags instead of recursion
+    stack: list = [root_node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            yield node
+            continue
+        opening, closing = node_html(node, id_to_class)
+        yield opening
+        if closing is not None:
+            stack.append(closing)
+            stack.extend(reversed(node.children))
+
+def html_frame(root: UiNode, id_to_class: Dict[str, str]) -> tuple[str, str]:
+    """
+    The page around the node markup, as (head, tail): the template is rendered
+    once around a marker and split, with the canvas div opened and closed.
+    """
+    head, tail = get_template().render(title="Figma Export", body_html=_BODY_MARKER).split(_BODY_MARKER)
+
+    canvas_class = id_to_class[root.id]
+    return head + f'<div class="{canvas_class} canvas">', "</div>" + tail
+
+def iter_html(root: Union[UiNode, UiNodeDict], id_to_class: Dict[str, str]) -> Iterator[str]:
+    """
+    Yields the page in chunks: the template streams through Template.generate,
+    and where the body goes the nodes are produced one by one.
+    For a deduplicated stylesheet pass the plan's "classes" as id_to_class.
+    """
+    if isinstance(root, dict):
+        root = UiNode.from_dict(root)
+
+    canvas_class = id_to_class[root.id]
+    for chunk in get_template().generate(title="Figma Export", body_html=_BODY_MARKER):
+        if _BODY_MARKER not in chunk:
+            yield chunk
+            continue
+        # str(): the chunk may be Markup, which would escape what's appended to it
+        before, after = str(chunk).split(_BODY_MARKER)
+        yield before + f'<div class="{canvas_class} canvas">'
+        yield from _iter_nodes_html(root, id_to_class)
+        yield "</div>" + after
 
-        children_html = "".join(render(c) for c in node.get("children", []))
-        return f'<div class="{cls}">{children_html}</div>'
+def write_html(root: Union[UiNode, UiNodeDict], id_to_class: Dict[str, str], out: TextIO) -> None:
+    """Streams the page into a file or any writable text stream."""
+    chunks = iter_html(root, id_to_class)
+    # push the document head out right away, then let the stream buffer the body
+    out.write(next(chunks))
+    out.flush()
+    for chunk in chunks:
+        out.write(chunk)
 
-    canvas_class = id_to_class[root["id"]]
-    body_html = f'<div class="{canvas_class} canvas">{render(root)}</div>'
-    env = Environment(loader=FileSystemLoader(Path("../templates")), autoescape=True)
-    template = env.get_template("export.html.j2")
-    return template.render(title="Figma Export", body_html=body_html)
+def generate_html(root: Union[UiNode, UiNodeDict], id_to_class: Dict[str, str]) -> str:
+    return "".join(iter_html(root, id_to_class))
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from components import Component
+from figma_cache import temp_path
+from mapper import UiNode
+from css_html import StyleConverter, css_preamble, element_kind, html_frame, node_html, node_rule
+
+MANIFEST_NAME = ".manifest.json"
+MANIFEST_VERSION = 3
+
+# per-node record: where the node's fragments sit in the previous styles.css /
+# index.html, then the inputs they were generated from (compared on re-export)
+ID, CSS_START, CSS_END, HTML_START, HTML_END, CLOSES = range(6)
+INPUTS = 6
+STYLES = INPUTS + 9  # the node's styles, stored as an index into the manifest's "styles"
+
+
+def _stamp(path: Path) -> List[int]:
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _component_key(component: Component, conv: StyleConverter) -> str:
+    # a shared instance's markup also holds the component's; its rules are in the preamble
+    body = "\n".join([component.html(), *component.rules(conv)])
+    return f"{component.cls}:{hashlib.blake2b(body.encode('utf-8'), digest_size=16).hexdigest()}"
+
+
+def _inputs(n: UiNode, id_to_class: Dict[str, str], html_classes: Dict[str, str],
+            styles_key: str, parent_is_flex: bool, hidden: bool, component_key: Optional[str]) -> list:
+    # everything a node's CSS rule and markup depend on, apart from the manifest key
+    return [id_to_class.get(n.id), html_classes.get(n.id), n.name, n.kind, n.text,
+            n.abs_x, n.abs_y, n.width, n.height, styles_key, parent_is_flex, hidden, component_key]
+
+
+def _load_manifest(out: Path, key: str):
+    """
+    The previous export's records by node id, with its styles.css and index.html
+    text, or None when they can't be trusted (missing, edited, other settings).
+    """
+    try:
+        with open(out / MANIFEST_NAME, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != MANIFEST_VERSION or manifest.get("key") != key:
+            # different canvas, template, tokens or shared classes: nothing can be reused
+            return None
+        if manifest["css"] != _stamp(out / "styles.css") or manifest["html"] != _stamp(out / "index.html"):
+            # output files were rewritten by a full export or by hand
+            return None
+        css = (out / "styles.css").read_text(encoding="utf-8")
+        html = (out / "index.html").read_text(encoding="utf-8")
+    except (OSError, ValueError, KeyError):
+        return None
+
+    styles = manifest["styles"]
+    records = {}
+    for r in manifest["nodes"]:
+        r[STYLES] = styles[r[STYLES]]
+        records[r[ID]] = r
+    return records, css, html
+
+
+def _save_manifest(out: Path, key: str, records: List[list], styles: Dict[str, int]) -> None:
+    path = out / MANIFEST_NAME
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "key": key,
+        "css": _stamp(out / "styles.css"),
+        "html": _stamp(out / "index.html"),
+        "styles": list(styles),
+        "nodes": records,
+    }
+    tmp = temp_path(str(path))
+    # dumps (C encoder) then one write; json.dump streams through the pure-Python encoder
+    body = json.dumps(manifest, separators=(",", ":"))
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(body)
+    os.replace(tmp, path)
+
+
+def export_incremental(root: UiNode, id_to_class: Dict[str, str], out_dir: str,
+                       plan: Optional[Dict[str, Any]] = None,
+                       conv: Optional[StyleConverter] = None) -> Dict[str, int]:
+    """
+    Writes styles.css + index.html into out_dir like write_css/write_html, but
+    nodes whose inputs are unchanged since the last export reuse their CSS rule
+    and markup from the previous files instead of being regenerated.
+    out_dir/.manifest.json records, per node, those inputs and where its
+    fragments sit in the files.
+    Returns {"reused": n, "rebuilt": n}.
+    """
+    conv = conv or StyleConverter()
+    shared = plan["shared"] if plan else {}
+    html_classes = plan["classes"] if plan else id_to_class
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    preamble = "\n".join(css_preamble(root, shared, conv))
+    head, tail = html_frame(root, html_classes)
+    # image URLs aren't in the node inputs: a newly downloaded image changes the key
+    images = sorted(conv.images.items())
+    key = hashlib.blake2b(repr((root.abs_x, root.abs_y, preamble, head, tail, images)).encode("utf-8"),
+                          digest_size=16).hexdigest()
+
+    previous = _load_manifest(out, key)
+    old, old_css, old_html = previous if previous else ({}, "", "")
+
+    css_parts = [preamble]
+    html_parts = [head]
+    css_pos = len(preamble)
+    html_pos = len(head)
+    records: List[list] = []
+    styles: Dict[str, int] = {}
+    style_keys: Dict[int, str] = {}
+    component_keys: Dict[str, str] = {}
+    reused = rebuilt = 0
+    in_place = True  # every fragment so far sits where it already is in the old files
+
+    # same pre-order walk as iter_css/_iter_nodes_html; strings on the stack are pending closing tags
+    stack: list = [(root, False, False)]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            html_parts.append(item)
+            html_pos += len(item)
+            continue
+        n, parent_is_flex, hidden = item
+
+        styles_key = style_keys.get(id(n.styles))
+        if styles_key is None:
+            styles_key = style_keys[id(n.styles)] = json.dumps(n.styles, sort_keys=True)
+        component_key = None
+        if n.component is not None:
+            component_key = component_keys.get(n.component.cls)
+            if component_key is None:
+                component_key = component_keys[n.component.cls] = _component_key(n.component, conv)
+        inputs = _inputs(n, id_to_class, html_classes, styles_key, parent_is_flex, hidden, component_key)
+
+        r = old.get(n.id)
+        if r is not None and r[INPUTS:] == inputs:
+            css = old_css[r[CSS_START]:r[CSS_END]]
+            opening = old_html[r[HTML_START]:r[HTML_END]]
+            closing = "</div>" if r[CLOSES] else None
+            in_place = in_place and r[CSS_START] == css_pos + 1 and r[HTML_START] == html_pos
+            reused += 1
+        else:
+            css = "\n".join(node_rule(n, parent_is_flex, root, id_to_class, shared, conv))
+            opening, closing = ("", None) if hidden else node_html(n, html_classes)
+            rebuilt += 1
+            in_place = False
+
+        css_parts.append(css)
+        html_parts.append(opening)
+        inputs[STYLES - INPUTS] = styles.setdefault(styles_key, len(styles))
+        records.append([n.id, css_pos + 1, css_pos + 1 + len(css), html_pos, html_pos + len(opening),
+                        closing is not None] + inputs)
+        css_pos += 1 + len(css)
+        html_pos += len(opening)
+
+        if closing is not None:
+            stack.append(closing)
+        child_flex = bool(n.styles.get("flex"))
+        # children of elements rendered whole still get CSS rules, but no markup
+        child_hidden = hidden or element_kind(n) != "div"
+        stack.extend((c, child_flex, child_hidden) for c in reversed(n.children))
+
+    if in_place and len(records) == len(old) and css_pos == len(old_css) and html_pos + len(tail) == len(old_html):
+        # nothing changed since the last export; the files already hold this output
+        return {"reused": reused, "rebuilt": 0}
+
+    html_parts.append(tail)
+    with open(out / "styles.css", "w", encoding="utf-8") as f:
+        f.write("\n".join(css_parts))
+    with open(out / "index.html", "w", encoding="utf-8") as f:
+        f.write("".join(html_parts))
+
+    _save_manifest(out, key, records, styles)
+    return {"reused": reused, "rebuilt": rebuilt}
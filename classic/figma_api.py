@@ -1,56 +1,127 @@
-import json
 import os
-import requests
-from dotenv import load_dotenv
-from typing import Dict, Any, Optional
+import time
+from typing import TYPE_CHECKING, Dict, Any, List, Optional
+from figma_index import has_index, list_nodes, read_node
+from figma_stream import load_subtree
+from figma_cache import (CacheError, find_cache, is_seekable, last_checked, load_cache, mark_checked,
+                         read_header, save_cache)
+from profiling import count, stage
 
-load_dotenv()
-FIGMA_TOKEN = os.getenv("FIGMA_TOKEN")
-if not FIGMA_TOKEN:
-    raise SystemExit("Please set FIGMA_TOKEN environment variable.")
-BASE_URL = "https://api.figma.com/v1"
+if TYPE_CHECKING:
+    from figma_http import FigmaClient
 
+# Importing this module has no side effects: .env is read, the token checked and
+# requests imported only once something needs them, so warm-cache runs never pay for the network stack.
 
 CACHE_DIR = "../cache"
-os.makedirs(CACHE_DIR, exist_ok=True)
 
-def _cache_path(file_key: str) -> str:
-    return os.path.join(CACHE_DIR, f"{file_key}.json")
+_env_loaded = False
+_client: Optional["FigmaClient"] = None
 
+def _load_env() -> None:
+    """Reads .env into the environment, once, the first time a setting is needed."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
 
-
-def get_file(file_key: str) -> Dict[str, Any]:
+def cache_max_age() -> Optional[float]:
     """
-    Loads Figma JSON from cache if available.
-    Otherwise fetches from Figma API once & stores it in cache directory
+    Seconds before a cached file is re-checked against Figma's current version; unset = never.
+    Read from the environment only: loading .env here would import dotenv on
+    every warm run, so a value in .env applies once a request loads it.
     """
+    value = os.environ.get("FIGMA_CACHE_MAX_AGE")
+    return float(value) if value else None
 
-    cache_file = _cache_path(file_key)
-
-    # checking cache for file key
-    if os.path.exists(cache_file):
-        print(f"[CACHE] Loaded file JSON from {cache_file}")
-        with open(cache_file, "r", encoding="utf-8") as f:
-            return json.load(f)
-
-    # if not in cache, fetch from figma
+def get_token() -> str:
+    """
+    The Figma token, required only when a request is actually about to be made.
+    Reads .env first: it may also set FIGMA_API_URL, read when figma_http is
+    imported, and FIGMA_CACHE_FORMAT for the download about to be saved.
+    """
+    _load_env()
+    token = os.getenv("FIGMA_TOKEN")
+    if not token:
+        raise SystemExit("Please set FIGMA_TOKEN environment variable.")
+    return token
+
+def get_client() -> "FigmaClient":
+    """Shared pooled client, so every request in a run reuses one session."""
+    global _client
+    if _client is None:
+        token = get_token()
+        from figma_http import FigmaClient
+        _client = FigmaClient(token)
+    return _client
+
+def _is_current(cache_file: str, file_key: str, refresh: bool) -> bool:
+    """
+    Decides whether a cached entry can be used as is.
+    Only when it's due (or `refresh` is set) does it ask Figma for the file's
+    version with a depth=1 request; a full refetch happens only if that changed.
+    """
+    if not refresh:
+        max_age = cache_max_age()
+        if max_age is None or time.time() - last_checked(cache_file) < max_age:
+            return True
+    client = get_client()
+    import requests
+    try:
+        current = client.get_file_meta(file_key)["version"]
+    except requests.RequestException as e:
+        print(f"[API] Version check failed, using cached copy: {e}")
+        return True
+    try:
+        cached = read_header(cache_file).get("version")
+    except (CacheError, ValueError):
+        cached = None
+    if current == cached:
+        mark_checked(cache_file)
+        print(f"[CACHE] {cache_file} is up to date (version {cached})")
+        return True
+    print(f"[API] File changed (version {cached} → {current})")
+    return False
+
+def _fetch(file_key: str) -> Dict[str, Any]:
     print("[API] Fetching file from Figma…")
-    headers = {"X-Figma-Token": FIGMA_TOKEN}
-    url = f"{BASE_URL}/files/{file_key}"
-    resp = requests.get(url, headers=headers)
-
-    resp.raise_for_status()
-
-    data = resp.json()
-
-    # When fetched from figma, store into the cache directory
-    with open(cache_file, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
-
+    count("figma_cache_misses")
+    client = get_client()
+    with stage("fetch") as s:
+        data = client.get_file(file_key)
+        s["requests"] = client.stats["requests"]
+    print(f"[API] {client.format_stats()}")
+
+    # When fetched from figma, store into the cache directory (format from FIGMA_CACHE_FORMAT)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    cache_file = save_cache(CACHE_DIR, file_key, data)
     print(f"[CACHE] Saved file JSON to {cache_file}")
-
     return data
 
+def get_file(file_key: str, refresh: bool = False) -> Dict[str, Any]:
+    """
+    Loads Figma JSON from cache if available.
+    Otherwise fetches from Figma API once & stores it in cache directory
+    Cached copies are re-checked against Figma when FIGMA_CACHE_MAX_AGE expires or `refresh` is set.
+    """
+    cache_file = find_cache(CACHE_DIR, file_key)
+
+    # checking cache for file key; corrupt or mismatched entries are refetched
+    if cache_file and _is_current(cache_file, file_key, refresh):
+        try:
+            with stage("cache_load") as s:
+                data = load_cache(cache_file, file_key)
+                s["bytes"] = os.path.getsize(cache_file)
+            count("figma_cache_hits")
+            print(f"[CACHE] Loaded file JSON from {cache_file}")
+            return data
+        except (CacheError, ValueError) as e:
+            print(f"[CACHE] Ignoring {cache_file}: {e}")
+
+    # if not in cache (or outdated), fetch from figma
+    return _fetch(file_key)
+
 def find_node_by_id(root: Dict[str, Any], node_id: str) -> Optional[Dict[str, Any]]:
     """Simple DFS to locate a node by ID in the Figma tree."""
     stack = [root]
@@ -60,4 +131,77 @@ def find_node_by_id(root: Dict[str, Any], node_id: str) -> Optional[Dict[str, An
             return node
         for child in node.get("children", []):
             stack.append(child)
-    return None
\ No newline at end of file
+    return None
+
+def _indexed_cache(file_key: str, refresh: bool) -> Optional[str]:
+    """
+    Returns the cache entry when it's current and JSON-backed, so nodes can be
+    read without parsing the whole file; None when the whole file has to be loaded.
+    """
+    cache_file = find_cache(CACHE_DIR, file_key)
+    if cache_file and not _is_current(cache_file, file_key, refresh):
+        _fetch(file_key)
+        cache_file = find_cache(CACHE_DIR, file_key)
+    if cache_file:
+        try:
+            if is_seekable(cache_file, file_key):
+                return cache_file
+        except CacheError as e:
+            print(f"[CACHE] Ignoring {cache_file}: {e}")
+    return None
+
+def get_nodes(file_key: str, node_ids: List[str], refresh: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    Loads several node subtrees without parsing the whole file when the cache
+    entry is JSON-backed: through the node index once it has been built,
+    otherwise by streaming each subtree out of the memory-mapped file (the
+    index is left to the listing and sync paths, so a cold --node export never
+    scans the whole document). Other entries get a single parse and a single DFS.
+    Ids that aren't found are left out.
+    """
+    cache_file = _indexed_cache(file_key, refresh)
+    if cache_file:
+        via = "index" if has_index(cache_file) else "stream"
+        load = read_node if via == "index" else load_subtree
+        print(f"[CACHE] Loaded {len(node_ids)} node(s) from {cache_file} via {via}")
+        count("figma_cache_hits")
+        with stage("node_lookup") as s:
+            nodes = {nid: load(cache_file, nid) for nid in node_ids}
+            s["via"] = via
+            s["nodes"] = sum(n is not None for n in nodes.values())
+        return {nid: n for nid, n in nodes.items() if n is not None}
+
+    wanted = set(node_ids)
+    found: Dict[str, Dict[str, Any]] = {}
+    document = get_file(file_key)["document"]
+    with stage("node_lookup") as s:
+        stack = [document]
+        while stack and len(found) < len(wanted):
+            node = stack.pop()
+            if node.get("id") in wanted:
+                found[node["id"]] = node
+            stack.extend(node.get("children", []))
+        s["via"] = "dfs"
+        s["nodes"] = len(found)
+    return {nid: found[nid] for nid in node_ids if nid in found}
+
+def get_node(file_key: str, node_id: str, refresh: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Loads a single node subtree by ID.
+    When the cached entry is JSON-backed, only the requested subtree is parsed.
+    """
+    return get_nodes(file_key, [node_id], refresh).get(node_id)
+
+def list_page_frames(file_key: str, page: str, refresh: bool = False) -> List[str]:
+    """Ids of the top-level FRAMEs on a page, given by page id or name, in document order."""
+    cache_file = _indexed_cache(file_key, refresh)
+    if cache_file:
+        return [n["id"] for n in list_nodes(cache_file, "FRAME", page=page, top_level=True)]
+    document = get_file(file_key)["document"]
+    return [
+        child["id"]
+        for canvas in document.get("children", [])
+        if canvas.get("type") == "CANVAS" and page in (canvas.get("id"), canvas.get("name"))
+        for child in canvas.get("children", [])
+        if child.get("type") == "FRAME"
+    ]
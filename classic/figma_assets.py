@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import shutil
+from typing import Any, Dict, Iterable, List, Optional
+
+from figma_api import CACHE_DIR, get_client
+from figma_cache import temp_path
+
+# Image fills are stored once by content hash, shared by every file and export:
+#   cache/assets/<blake2b>.<ext>   the image bytes
+#   cache/assets/refs.json         imageRef -> stored file name
+ASSET_DIR = os.path.join(CACHE_DIR, "assets")
+REFS_NAME = "refs.json"
+
+# exports link the images they use into <out>/assets/, so styles.css refers to them relatively
+ASSET_SUBDIR = "assets"
+
+DEFAULT_DOWNLOAD_WORKERS = 8
+
+_MAGIC = (
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"GIF8", ".gif"),
+    (b"<svg", ".svg"),
+    (b"<?xml", ".svg"),
+)
+
+
+def _extension(content: bytes) -> str:
+    if content[:4] == b"RIFF" and content[8:12] == b"WEBP":
+        return ".webp"
+    for magic, ext in _MAGIC:
+        if content.startswith(magic):
+            return ext
+    return ".bin"
+
+
+def collect_image_refs(nodes: Iterable[Dict[str, Any]]) -> List[str]:
+    """imageRefs of the image fills in these Figma subtrees, each once, in document order."""
+    refs: Dict[str, None] = {}
+    stack = list(reversed(list(nodes)))
+    while stack:
+        node = stack.pop()
+        fills = node.get("fills") or []
+        # only the first fill is rendered, like solid and gradient fills
+        if fills and fills[0].get("type") == "IMAGE" and fills[0].get("imageRef"):
+            refs.setdefault(fills[0]["imageRef"])
+        stack.extend(reversed(node.get("children", [])))
+    return list(refs)
+
+
+def load_refs(asset_dir: str = ASSET_DIR) -> Dict[str, str]:
+    """The imageRef -> file name table, limited to files that are actually present."""
+    try:
+        with open(os.path.join(asset_dir, REFS_NAME), "r", encoding="utf-8") as f:
+            refs = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {ref: name for ref, name in refs.items() if os.path.exists(os.path.join(asset_dir, name))}
+
+
+def _write_atomic(path: str, content: bytes) -> None:
+    tmp = temp_path(path)
+    with open(tmp, "wb") as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+def store_asset(content: bytes, asset_dir: str = ASSET_DIR) -> str:
+    """Stores image bytes under their content hash and returns the file name; identical images are kept once."""
+    name = hashlib.blake2b(content, digest_size=16).hexdigest() + _extension(content)
+    path = os.path.join(asset_dir, name)
+    if not os.path.exists(path):
+        _write_atomic(path, content)
+    return name
+
+
+def _download(session, url: str, timeout: float) -> bytes:
+    resp = session.get(url, timeout=timeout)
+    resp.raise_for_status()
+    return resp.content
+
+
+def fetch_assets(file_key: str, refs: Iterable[str], asset_dir: str = ASSET_DIR,
+                 workers: int = DEFAULT_DOWNLOAD_WORKERS) -> Dict[str, str]:
+    """
+    Makes sure the images behind `refs` are in the asset store and returns
+    imageRef -> file name for those that are. Refs already stored cost nothing;
+    the rest are resolved with a single images request for the file and
+    downloaded concurrently. Images that can't be fetched are left out.
+    """
+    refs = list(dict.fromkeys(refs))
+    known = load_refs(asset_dir)
+    missing = [r for r in refs if r not in known]
+    if missing:
+        known.update(_download_missing(file_key, missing, asset_dir, workers))
+    return {r: known[r] for r in refs if r in known}
+
+
+def _download_missing(file_key: str, missing: List[str], asset_dir: str, workers: int) -> Dict[str, str]:
+    try:
+        client = get_client()
+    except SystemExit as e:
+        # no token: export without these images rather than not at all
+        print(f"[ASSETS] {e} Skipping {len(missing)} image(s).")
+        return {}
+    # imported here: warm runs with every image already stored never touch the network stack
+    from concurrent.futures import ThreadPoolExecutor
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    try:
+        urls = client.get_image_fills(file_key)
+    except requests.RequestException as e:
+        print(f"[ASSETS] Could not resolve image fills: {e}")
+        return {}
+
+    wanted = {ref: urls[ref] for ref in missing if urls.get(ref)}
+    for ref in missing:
+        if ref not in wanted:
+            print(f"[ASSETS] No image for {ref}")
+    if not wanted:
+        return {}
+
+    # the URLs point at Figma's image storage, not the API: no token on these requests
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    os.makedirs(asset_dir, exist_ok=True)
+    total = 0
+    urls = list(dict.fromkeys(wanted.values()))  # refs can share one image URL
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(urls)))) as pool:
+        futures = {url: pool.submit(_download, session, url, client.timeout) for url in urls}
+        names: Dict[str, str] = {}
+        for url, future in futures.items():
+            try:
+                content = future.result()
+            except requests.RequestException as e:
+                print(f"[ASSETS] Download failed for {url}: {e}")
+                continue
+            names[url] = store_asset(content, asset_dir)
+            total += len(content)
+    stored = {ref: names[url] for ref, url in wanted.items() if url in names}
+    print(f"[ASSETS] Downloaded {len(stored)}/{len(missing)} image(s), {total} bytes → {asset_dir}")
+
+    if stored:
+        # re-read so concurrent runs sharing the store don't drop each other's entries
+        refs = load_refs(asset_dir)
+        refs.update(stored)
+        _write_atomic(os.path.join(asset_dir, REFS_NAME),
+                      json.dumps(refs, indent=2, sort_keys=True).encode("utf-8"))
+    return stored
+
+
+def link_assets(names: Iterable[str], out_dir: str, asset_dir: str = ASSET_DIR) -> Optional[str]:
+    """Hard-links (or copies) stored images into <out_dir>/assets/; returns that directory, or None if there were none."""
+    names = list(names)
+    if not names:
+        return None
+    target = os.path.join(out_dir, ASSET_SUBDIR)
+    os.makedirs(target, exist_ok=True)
+    for name in names:
+        dst = os.path.join(target, name)
+        if os.path.exists(dst):
+            continue  # content-addressed: same name, same bytes
+        src = os.path.join(asset_dir, name)
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copyfile(src, dst)
+    return target
@@ -0,0 +1,211 @@
+import argparse
+import json
+import os
+import pickle
+import threading
+import zlib
+from typing import Any, Dict, Optional
+
+SCHEMA_VERSION = 1
+MAGIC = b"FIGMACACHE"
+
+# Formats:
+#   json    - legacy indent=2 JSON in <file_key>.json (read-only unless selected)
+#   compact - header + minified JSON; nodes can still be read through the index
+#   zlib    - header + zlib-compressed minified JSON; smallest on disk
+#   pickle  - header + pickled dict; fastest to load on a warm run
+FORMATS = ("json", "compact", "zlib", "pickle")
+DEFAULT_FORMAT = "compact"
+
+
+class CacheError(Exception):
+    """Raised for cache entries that are corrupt or don't belong to the requested file."""
+
+
+def cache_format() -> str:
+    fmt = os.getenv("FIGMA_CACHE_FORMAT", DEFAULT_FORMAT)
+    if fmt not in FORMATS:
+        raise SystemExit(f"FIGMA_CACHE_FORMAT must be one of {', '.join(FORMATS)}")
+    return fmt
+
+
+def _json_path(cache_dir: str, file_key: str) -> str:
+    return os.path.join(cache_dir, f"{file_key}.json")
+
+
+def _fcache_path(cache_dir: str, file_key: str) -> str:
+    return os.path.join(cache_dir, f"{file_key}.fcache")
+
+
+def find_cache(cache_dir: str, file_key: str) -> Optional[str]:
+    """Returns the existing cache entry for a file, preferring the versioned format."""
+    for path in (_fcache_path(cache_dir, file_key), _json_path(cache_dir, file_key)):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _read_header(f) -> Dict[str, Any]:
+    if f.readline().rstrip(b"\n") != MAGIC:
+        raise CacheError("missing cache header")
+    try:
+        header = json.loads(f.readline())
+    except ValueError as e:
+        raise CacheError(f"unreadable cache header: {e}") from None
+    header["offset"] = f.tell()
+    return header
+
+
+def read_header(path: str) -> Dict[str, Any]:
+    """
+    Returns the header of a cache entry: file key, Figma version, lastModified,
+    schema version, codec and payload layout.
+    Legacy .json entries have no header, so it's built by loading the file.
+    """
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return {"schema": None, "codec": "json", "file_key": os.path.basename(path)[:-5],
+                "version": data.get("version"), "lastModified": data.get("lastModified")}
+    with open(path, "rb") as f:
+        return _read_header(f)
+
+
+def _check(header: Dict[str, Any], path: str, file_key: Optional[str]) -> None:
+    if header.get("schema") != SCHEMA_VERSION:
+        raise CacheError(f"{path} has schema {header.get('schema')}, expected {SCHEMA_VERSION}")
+    if file_key is not None and header.get("file_key") != file_key:
+        raise CacheError(f"{path} belongs to file {header.get('file_key')}, not {file_key}")
+    if os.path.getsize(path) != header["offset"] + header["payload_size"]:
+        raise CacheError(f"{path} is truncated")
+
+
+def load_cache(path: str, file_key: Optional[str] = None) -> Dict[str, Any]:
+    """Loads a full cache entry, verifying its header and checksum."""
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    with open(path, "rb") as f:
+        header = _read_header(f)
+        _check(header, path, file_key)
+        payload = f.read()
+    if zlib.crc32(payload) != header["crc32"]:
+        raise CacheError(f"{path} failed its checksum")
+
+    codec = header["codec"]
+    if codec == "compact":
+        return json.loads(payload)
+    if codec == "zlib":
+        return json.loads(zlib.decompress(payload))
+    if codec == "pickle":
+        return pickle.loads(payload)
+    raise CacheError(f"{path} uses unknown codec {codec!r}")
+
+
+def is_seekable(path: str, file_key: Optional[str] = None) -> bool:
+    """
+    True when the entry's payload is plain JSON on disk, so single nodes can be
+    read through the node index; compressed and pickled entries must be loaded whole.
+    """
+    if path.endswith(".json"):
+        return True
+    header = read_header(path)
+    _check(header, path, file_key)
+    return header["codec"] == "compact"
+
+
+def _checked_path(path: str) -> str:
+    root, _ = os.path.splitext(path)
+    return f"{root}.checked"
+
+
+def last_checked(path: str) -> float:
+    """When the entry was last confirmed current against Figma (or written, if later)."""
+    try:
+        checked = os.path.getmtime(_checked_path(path))
+    except OSError:
+        checked = 0.0
+    return max(checked, os.path.getmtime(path))
+
+
+def mark_checked(path: str) -> None:
+    # a separate marker, so the cache file's own mtime (and its node index) stay untouched
+    with open(_checked_path(path), "a"):
+        pass
+    os.utime(_checked_path(path))
+
+
+def temp_path(path: str) -> str:
+    """
+    A temp name next to `path` for a write that ends in os.replace, unique per
+    process and thread, so concurrent writers of the same file never share one.
+    """
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def save_cache(cache_dir: str, file_key: str, data: Dict[str, Any], fmt: Optional[str] = None) -> str:
+    """
+    Writes a Figma file response to the cache in the selected format, atomically,
+    and removes any entry for the same file in another format.
+    """
+    fmt = fmt or cache_format()
+    if fmt == "json":
+        path = _json_path(cache_dir, file_key)
+        body = json.dumps(data, indent=2).encode("utf-8")
+    else:
+        path = _fcache_path(cache_dir, file_key)
+        if fmt == "pickle":
+            payload = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        else:
+            payload = json.dumps(data, separators=(",", ":")).encode("utf-8")
+            if fmt == "zlib":
+                payload = zlib.compress(payload, 6)
+        header = {
+            "schema": SCHEMA_VERSION,
+            "codec": fmt,
+            "file_key": file_key,
+            "version": data.get("version"),
+            "lastModified": data.get("lastModified"),
+            "payload_size": len(payload),
+            "crc32": zlib.crc32(payload),
+        }
+        body = MAGIC + b"\n" + json.dumps(header).encode("utf-8") + b"\n" + payload
+
+    tmp = temp_path(path)
+    with open(tmp, "wb") as f:
+        f.write(body)
+    os.replace(tmp, path)
+
+    other = _fcache_path(cache_dir, file_key) if fmt == "json" else _json_path(cache_dir, file_key)
+    if os.path.exists(other):
+        os.remove(other)
+    return path
+
+
+def migrate(cache_dir: str, fmt: str) -> None:
+    """Rewrites every cached file in `cache_dir` into `fmt`."""
+    keys = sorted({
+        name.rsplit(".", 1)[0]
+        for name in os.listdir(cache_dir)
+        if name.endswith(".fcache") or (name.endswith(".json") and not name.endswith(".index.json"))
+    })
+    for file_key in keys:
+        path = find_cache(cache_dir, file_key)
+        before = os.path.getsize(path)
+        try:
+            data = load_cache(path, file_key)
+        except (CacheError, ValueError) as e:
+            print(f"[SKIP] {path}: {e}")
+            continue
+        new_path = save_cache(cache_dir, file_key, data, fmt)
+        after = os.path.getsize(new_path)
+        print(f"[MIGRATE] {path} ({before} bytes) → {new_path} ({after} bytes)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert cached Figma files to another cache format.")
+    parser.add_argument("--format", choices=FORMATS, default=DEFAULT_FORMAT, help="Target cache format")
+    parser.add_argument("--cache-dir", default="../cache", help="Cache directory to migrate")
+    args = parser.parse_args()
+    migrate(args.cache_dir, args.format)
@@ -0,0 +1,96 @@
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Point at a local stand-in server with FIGMA_API_URL=http://127.0.0.1:<port>/v1
+BASE_URL = os.getenv("FIGMA_API_URL", "https://api.figma.com/v1")
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class FigmaClient:
+    """
+    Pooled Figma REST client.
+      - one requests.Session with a connection pool, reused across calls
+      - 429/5xx and connection errors are retried, honoring Retry-After,
+        with exponential backoff capped at `max_backoff`
+      - `stats` counts requests, response bytes and retries; requests may run
+        in several threads at once, so counters go through count()
+    """
+
+    def __init__(self, token: str, base_url: str = BASE_URL, max_retries: int = 5,
+                 backoff: float = 1.0, max_backoff: float = 60.0, pool_size: int = 10,
+                 timeout: float = 60.0):
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["X-Figma-Token"] = token
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.stats = {"requests": 0, "bytes": 0, "retries": 0}
+        self._stats_lock = threading.Lock()
+
+    def count(self, key: str, amount: int = 1) -> None:
+        """Adds to one of the `stats` counters."""
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def retry_delay(self, attempt: int, resp: Optional[requests.Response]) -> float:
+        """Seconds to wait before retry `attempt`: Retry-After when given, else jittered backoff."""
+        retry_after = resp.headers.get("Retry-After") if resp is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass  # HTTP-date form; fall back to backoff
+        # full jitter keeps concurrent clients from retrying in lockstep
+        return random.uniform(0, min(self.backoff * 2 ** attempt, self.max_backoff))
+
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> requests.Response:
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        attempt = 0
+        while True:
+            resp = None
+            try:
+                self.count("requests")
+                resp = self.session.get(url, params=params, timeout=self.timeout)
+                self.count("bytes", len(resp.content))
+                if resp.status_code not in RETRY_STATUSES:
+                    resp.raise_for_status()
+                    return resp
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+            if attempt >= self.max_retries:
+                resp.raise_for_status()
+            delay = self.retry_delay(attempt, resp)
+            status = resp.status_code if resp is not None else "connection error"
+            print(f"[API] {status} on {path}, retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})")
+            self.count("retries")
+            attempt += 1
+            time.sleep(delay)
+
+    def get_file(self, file_key: str) -> Dict[str, Any]:
+        return self.get(f"files/{file_key}").json()
+
+    def get_file_meta(self, file_key: str) -> Dict[str, Any]:
+        """Cheap check of a file's current version: depth=1 skips everything below the pages."""
+        data = self.get(f"files/{file_key}", params={"depth": 1}).json()
+        return {"version": data.get("version"), "lastModified": data.get("lastModified")}
+
+    def get_image_fills(self, file_key: str) -> Dict[str, Optional[str]]:
+        """Download URLs for every image fill in the file, by imageRef (one request for the whole file)."""
+        data = self.get(f"files/{file_key}/images").json()
+        return (data.get("meta") or {}).get("images") or {}
+
+    def format_stats(self) -> str:
+        return f"{self.stats['requests']} requests, {self.stats['bytes']} bytes, {self.stats['retries']} retries"
@@ -0,0 +1,204 @@
+import argparse
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import requests
+
+from figma_api import CACHE_DIR, get_token
+from figma_cache import CacheError, find_cache, is_seekable, mark_checked, read_header, save_cache
+from figma_http import BASE_URL, RETRY_STATUSES, FigmaClient
+from figma_index import build_index
+
+# Figma's REST limits are per token and per endpoint tier; GET /files sits in the
+# lowest tier, so the defaults stay well under it. Raise them for higher plans.
+DEFAULT_RATE_PER_MINUTE = 15.0
+DEFAULT_BURST = 3
+DEFAULT_CONCURRENCY = 8
+
+
+class TokenBucket:
+    """
+    Async token bucket shared by every task in a sync.
+    `rate` tokens per second, up to `burst` banked. pause() holds the whole
+    bucket, so one 429 backs off every task instead of just the one that hit it.
+    `clock` and `sleep` default to the real ones; tests pass a fake pair.
+    """
+
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], Awaitable[None]] = asyncio.sleep):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = float(burst)
+        self.updated = clock()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, self.clock() + seconds)
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = self.clock()
+                if now < self.paused_until:
+                    await self.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await self.sleep((1 - self.tokens) / self.rate)
+
+
+class Syncer:
+    """
+    Downloads many Figma files concurrently into the cache.
+    Requests run in worker threads over one pooled FigmaClient; the client does
+    no retrying of its own, retries go through the shared bucket instead.
+    """
+
+    def __init__(self, client: FigmaClient, bucket: TokenBucket, cache_dir: str = CACHE_DIR,
+                 concurrency: int = DEFAULT_CONCURRENCY, max_retries: int = 5, force: bool = False):
+        self.client = client
+        self.bucket = bucket
+        self.cache_dir = cache_dir
+        self.max_retries = max_retries
+        self.force = force
+        self._slots = asyncio.Semaphore(concurrency)
+
+    async def _request(self, fn: Callable[..., Any], *args: Any) -> Any:
+        attempt = 0
+        while True:
+            await self.bucket.acquire()
+            try:
+                return await asyncio.to_thread(fn, *args)
+            except requests.HTTPError as e:
+                resp = e.response
+                if resp is None or resp.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    raise
+            except (requests.ConnectionError, requests.Timeout):
+                resp = None
+                if attempt >= self.max_retries:
+                    raise
+            delay = self.client.retry_delay(attempt, resp)
+            status = resp.status_code if resp is not None else "connection error"
+            print(f"[SYNC] {status}, pausing all requests for {delay:.1f}s ({attempt + 1}/{self.max_retries})")
+            self.bucket.pause(delay)
+            self.client.count("retries")
+            attempt += 1
+
+    def _cached_version(self, file_key: str) -> Optional[str]:
+        cache_file = find_cache(self.cache_dir, file_key)
+        if not cache_file:
+            return None
+        try:
+            return read_header(cache_file).get("version")
+        except (CacheError, ValueError):
+            return None
+
+    def _save(self, file_key: str, data: Dict[str, Any]) -> str:
+        # save_cache writes to a temp file and renames, so readers never see a partial entry
+        os.makedirs(self.cache_dir, exist_ok=True)
+        cache_file = save_cache(self.cache_dir, file_key, data)
+        if is_seekable(cache_file, file_key):
+            build_index(cache_file)
+        return cache_file
+
+    async def sync_file(self, file_key: str) -> Dict[str, Any]:
+        """Brings one file's cache entry up to date; cached files are first checked with a depth=1 request."""
+        async with self._slots:
+            start = time.perf_counter()
+            result: Dict[str, Any] = {"key": file_key, "status": "downloaded", "bytes": 0}
+            try:
+                cached = None if self.force else await asyncio.to_thread(self._cached_version, file_key)
+                if cached is not None:
+                    meta = await self._request(self.client.get_file_meta, file_key)
+                    if meta["version"] == cached:
+                        mark_checked(find_cache(self.cache_dir, file_key))
+                        result["status"] = "current"
+                if result["status"] == "downloaded":
+                    data = await self._request(self.client.get_file, file_key)
+                    cache_file = await asyncio.to_thread(self._save, file_key, data)
+                    result["bytes"] = os.path.getsize(cache_file)
+            except (requests.RequestException, CacheError, OSError) as e:
+                result["status"] = "failed"
+                result["error"] = str(e)
+            result["seconds"] = time.perf_counter() - start
+            return result
+
+    async def sync(self, file_keys: List[str]) -> List[Dict[str, Any]]:
+        """Syncs every key concurrently; results come back in input order."""
+        return await asyncio.gather(*(self.sync_file(k) for k in file_keys))
+
+
+def sync_files(file_keys: List[str], client: Optional[FigmaClient] = None, cache_dir: str = CACHE_DIR,
+               rate_per_minute: float = DEFAULT_RATE_PER_MINUTE, burst: int = DEFAULT_BURST,
+               concurrency: int = DEFAULT_CONCURRENCY, max_retries: int = 5,
+               force: bool = False) -> List[Dict[str, Any]]:
+    """
+    Blocking entry point: syncs `file_keys` into `cache_dir` and returns one
+    result per key. Pass a client to point at another server or read its stats;
+    it must not retry on its own (max_retries=0).
+    """
+    if client is None:
+        client = make_client(concurrency)
+    syncer = Syncer(client, TokenBucket(rate_per_minute / 60.0, burst), cache_dir,
+                    concurrency=concurrency, max_retries=max_retries, force=force)
+    return asyncio.run(syncer.sync(file_keys))
+
+
+def make_client(concurrency: int = DEFAULT_CONCURRENCY) -> FigmaClient:
+    token = get_token()
+    # read after get_token(), which loads .env
+    base_url = os.getenv("FIGMA_API_URL", BASE_URL)
+    return FigmaClient(token, base_url=base_url, max_retries=0, pool_size=concurrency)
+
+
+def _read_keys(args: argparse.Namespace) -> List[str]:
+    keys = list(args.file_keys)
+    if args.from_file:
+        with open(args.from_file, "r", encoding="utf-8") as f:
+            keys += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    # keep the first occurrence of each key
+    return list(dict.fromkeys(keys))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download many Figma files into the cache concurrently.")
+    parser.add_argument("file_keys", nargs="*", help="Figma file keys")
+    parser.add_argument("--from-file", help="Text file with one file key per line")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="Cache directory to sync into")
+    parser.add_argument("--rate-per-minute", type=float, default=DEFAULT_RATE_PER_MINUTE,
+                        help="Requests per minute across all downloads")
+    parser.add_argument("--burst", type=int, default=DEFAULT_BURST, help="Requests allowed back to back")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Downloads in flight")
+    parser.add_argument("--retries", type=int, default=5, help="Retries per request on 429/5xx")
+    parser.add_argument("--force", action="store_true", help="Download even when the cached version is current")
+    args = parser.parse_args()
+
+    keys = _read_keys(args)
+    if not keys:
+        parser.error("no file keys given")
+
+    client = make_client(args.concurrency)
+    start = time.perf_counter()
+    results = sync_files(keys, client, cache_dir=args.cache_dir, rate_per_minute=args.rate_per_minute,
+                         burst=args.burst, concurrency=args.concurrency,
+                         max_retries=args.retries, force=args.force)
+    elapsed = time.perf_counter() - start
+
+    for r in results:
+        detail = r.get("error") or f"{r['bytes'] / 1e6:.2f} MB"
+        print(f"  {r['key']:<24} {r['status']:<10} {r['seconds']:6.2f}s  {detail}")
+    counts = {s: sum(r["status"] == s for r in results) for s in ("downloaded", "current", "failed")}
+    total = sum(r["bytes"] for r in results)
+    print(f"[SYNC] {len(results)} files ({counts['downloaded']} downloaded, {counts['current']} current, "
+          f"{counts['failed']} failed) in {elapsed:.2f}s: {len(results) / elapsed:.2f} files/s, "
+          f"{total / 1e6 / elapsed:.2f} MB/s; {client.format_stats()}")
+    if counts["failed"]:
+        raise SystemExit(1)
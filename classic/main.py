@@ -1,59 +1,227 @@
 import argparse
+import os
+import time
+from functools import partial
 from pathlib import Path
-from figma_api import get_file, find_node_by_id
-from mapper import map_figma_to_ui, apply_absolute_layout
-from css_html import generate_css, generate_html
+from figma_api import get_file, get_nodes, list_page_frames
+from figma_assets import ASSET_SUBDIR, collect_image_refs, fetch_assets, link_assets
+from mapper import build_ui_tree
+from css_html import StyleConverter, dedupe_css, format_dedupe_stats, write_css, write_html
+from simplify import format_simplify_stats, simplify_tree
+from components import ComponentCache
+import profiling
+from profiling import count, stage
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Figma → HTML/CSS exporter (Softlight assignment).")
     parser.add_argument("file_key", help="Figma file key from the URL")
-    parser.add_argument("--node", dest="node_id", help="Optional node/frame id (from node-id in Figma URL)")
+    parser.add_argument("--node", dest="node_ids", action="append", default=[],
+                        help="Node/frame id (from node-id in Figma URL); repeat to export several frames")
+    parser.add_argument("--page", help="Export every top-level frame on this page (page id or name)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes for multi-frame exports")
+    parser.add_argument("--refresh", action="store_true", help="Check Figma for a newer version of the cached file")
+    parser.add_argument("--dedupe-css", action="store_true",
+                        help="Move repeated style declarations into shared classes")
+    parser.add_argument("--css-tokens", action="store_true",
+                        help="Emit repeated colors and fonts once as --color-N/--font-N custom properties")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Regenerate only the subtrees that changed since the last export into the same directory")
+    parser.add_argument("--no-images", action="store_true",
+                        help="Don't download image fills (they are left out of the CSS)")
+    parser.add_argument("--components", action="store_true",
+                        help="Map and style each component once; instances share its rules and markup")
+    parser.add_argument("--simplify", action="store_true",
+                        help="Drop no-op nodes, collapse pass-through wrappers and merge text lines before generating")
+    profiling.add_arguments(parser)
     return parser.parse_args()
 
-def assign_classes(node, id_to_class, prefix="node"):
+def _safe_id(node_id):
+    return node_id.replace(":", "-").replace(";", "-")
+
+def export_node(node, out_dir, dedupe=False, tokens=False, incremental=False, assets=None, simplify=False,
+                components=False):
+    """
+    Maps one Figma node and writes its styles.css + index.html into out_dir.
+    `assets` maps imageRef -> stored file name (see figma_assets); the images
+    this node uses are linked into out_dir/assets/.
+    With `simplify`, the mapped tree goes through simplify_tree first.
+    With `components`, instances without overrides share one mapped subtree per component.
+    Runs in a worker process for batch exports, so it only takes picklable arguments.
+    """
+    start = time.perf_counter()
+    with stage("export") as frame_stage:
+        frame_stage["id"] = node["id"]
+
+        # Map figma JSON → UiNode structure, with absolute offsets and CSS classes, in one pass
+        # (so the "map" stage covers the layout pass too)
+        cache = ComponentCache() if components else None
+        with stage("map") as s:
+            ui_root, id_to_class = build_ui_tree(node, components=cache)
+            s["nodes"] = len(id_to_class)
+            if cache is not None:
+                s["instances"] = cache.instances
+                s["components"] = len(cache.components)
+
+        # Optionally shrink the DOM: no-op nodes, pass-through wrappers, split text lines
+        shrunk = None
+        if simplify:
+            with stage("simplify") as s:
+                shrunk = simplify_tree(ui_root)
+                s["removed"] = shrunk["before"] - shrunk["after"]
+
+        out = Path(out_dir)
+        out.mkdir(parents=True, exist_ok=True)
+
+        # Image fills point at copies of the stored images next to styles.css
+        images = {}
+        if assets:
+            used = {ref: assets[ref] for ref in collect_image_refs([node]) if ref in assets}
+            link_assets(used.values(), out_dir)
+            images = {ref: f"{ASSET_SUBDIR}/{name}" for ref, name in used.items()}
+
+        # Paint/text conversions are memoized for the whole frame; optionally
+        # repeated colors and fonts become custom properties
+        conv = StyleConverter(images, cache)
+        if tokens:
+            conv.collect_tokens(ui_root)
+
+        # Optionally fold repeated declarations into shared classes
+        plan = None
+        if dedupe:
+            with stage("dedupe"):
+                plan = dedupe_css(ui_root, id_to_class, conv)
+        html_classes = plan["classes"] if plan else id_to_class
+
+        reuse = None
+        if incremental:
+            # Splice unchanged nodes back in from the previous export's manifest
+            from export_manifest import export_incremental
+            with stage("incremental") as s:
+                reuse = export_incremental(ui_root, id_to_class, out_dir, plan, conv)
+                s["reused"] = reuse["reused"]
+                s["rebuilt"] = reuse["rebuilt"]
+        else:
+            # Generate CSS + HTML straight into the output files, node by node
+            # (generation and writing are one streamed stage each)
+            with stage("css") as s, open(out / "styles.css", "w", encoding="utf-8") as f:
+                write_css(ui_root, id_to_class, f, plan, conv)
+                s["bytes"] = f.tell()
+            with stage("html") as s, open(out / "index.html", "w", encoding="utf-8") as f:
+                write_html(ui_root, html_classes, f)
+                s["bytes"] = f.tell()
+        count("style_cache_hits", conv.stats["hits"])
+        count("style_cache_misses", conv.stats["misses"])
+
+    return {"id": node["id"], "name": node.get("name", ""), "out": str(out),
+            "nodes": shrunk["after"] if shrunk else len(id_to_class), "seconds": time.perf_counter() - start,
+            "simplify": format_simplify_stats(shrunk) if shrunk else None,
+            "components": cache.format_stats() if cache is not None else None,
+            "css": format_dedupe_stats(plan["stats"]) if plan else None,
+            "styles": conv.format_stats(), "images": len(images),
+            "reuse": f"{reuse['reused']} nodes reused, {reuse['rebuilt']} rebuilt" if reuse else None}
+
+def export_batch(nodes, out_root, workers, **options):
     """
-    Assign a unique CSS class to every node based on its ID.
+    Exports several frames, one output directory per frame (output/<node-id>/).
+    Results come back in input order whatever the worker count, so the output
+    and the summary are deterministic.
     """
-    safe = node["id"].replace(":", "-").replace(";", "-")
-    cls = f"{prefix}-{safe}"
-    id_to_class[node["id"]] = cls
+    start = time.perf_counter()
+    out_dirs = [str(Path(out_root) / _safe_id(n["id"])) for n in nodes]
+    workers = max(1, min(workers, len(nodes)))
+    if workers == 1:
+        results = [export_node(n, d, **options) for n, d in zip(nodes, out_dirs)]
+    else:
+        # imported here: single-frame runs don't need the process pool machinery
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(partial(export_node, **options), nodes, out_dirs))
+
+    print(f"[BATCH] Exported {len(results)} frames with {workers} worker(s) in {time.perf_counter() - start:.2f}s")
+    for r in results:
+        print(f"  {r['id']:<12} {r['seconds'] * 1000:8.1f} ms  {r['nodes']:>6} nodes  → {r['out']}/index.html  ({r['name']})")
+        if r["components"]:
+            print(f"  {'':<12} [COMPONENTS] {r['components']}")
+        if r["simplify"]:
+            print(f"  {'':<12} [SIMPLIFY] {r['simplify']}")
+        if r["css"]:
+            print(f"  {'':<12} [CSS] {r['css']}")
+        if options.get("tokens"):
+            print(f"  {'':<12} [CSS] {r['styles']}")
+        if r["reuse"]:
+            print(f"  {'':<12} [INCREMENTAL] {r['reuse']}")
+        if r["images"]:
+            print(f"  {'':<12} [ASSETS] {r['images']} image(s) → {r['out']}/{ASSET_SUBDIR}")
 
-    for c in node.get("children", []):
-        assign_classes(c, id_to_class, prefix)
+def fetch_images(file_key, nodes):
+    """imageRef -> stored file name for the image fills in these nodes, downloading only what's missing."""
+    with stage("assets") as s:
+        refs = collect_image_refs(nodes)
+        assets = fetch_assets(file_key, refs) if refs else {}
+        s["images"] = len(assets)
+    return assets
 
 def main():
     args = parse_args()
-    file_data = get_file(args.file_key)
-    document = file_data["document"]
-
-    # locate requested node in argument
-    node = document
-    if args.node_id:
-        found = find_node_by_id(document, args.node_id)
-        if found:
-            node = found
-        else:
-            print("Node ID not found — exporting root")
+    if profiling.setup(args):
+        try:
+            run(args)
+        finally:
+            profiling.finish()
+    else:
+        run(args)
 
-    # Map figma JSON → UiNode structure
-    ui_root = map_figma_to_ui(node)
-    apply_absolute_layout(ui_root)
-    # Assign the CSS classes BEFORE generating CSS
-    id_to_class = {}
-    assign_classes(ui_root, id_to_class)
+def run(args):
 
-    # Generate CSS + HTML
-    css = generate_css(ui_root, id_to_class)
-    html = generate_html(ui_root, id_to_class)
+    node_ids = list(args.node_ids)
+    if args.page:
+        page_frames = list_page_frames(args.file_key, args.page, refresh=args.refresh)
+        if not page_frames:
+            print(f"No top-level frames found on page {args.page!r}")
+        node_ids += [nid for nid in page_frames if nid not in node_ids]
 
-    # Write output
-    out = Path("output")
-    out.mkdir(exist_ok=True)
+    # locate requested nodes in arguments (only their subtrees are loaded)
+    # (a --page lookup already did any version check)
+    found = get_nodes(args.file_key, node_ids, refresh=args.refresh and not args.page) if node_ids else {}
+    nodes = [found[nid] for nid in node_ids if nid in found]
 
-    (out / "styles.css").write_text(css, encoding="utf-8")
-    (out / "index.html").write_text(html, encoding="utf-8")
+    if len(node_ids) > 1 or args.page:
+        for nid in node_ids:
+            if nid not in found:
+                print(f"Node ID {nid} not found — skipping")
+        assets = {} if args.no_images else fetch_images(args.file_key, nodes)
+        workers = args.workers
+        if profiling.enabled() and workers > 1:
+            # worker processes would profile into nothing; run the frames in this one
+            print("[PROFILE] Exporting frames in-process")
+            workers = 1
+        export_batch(nodes, "output", workers, dedupe=args.dedupe_css, tokens=args.css_tokens,
+                     incremental=args.incremental, assets=assets, simplify=args.simplify,
+                     components=args.components)
+        return
+
+    if not nodes:
+        if node_ids:
+            print("Node ID not found — exporting root")
+        nodes = [get_file(args.file_key, refresh=args.refresh)["document"]]
 
+    assets = {} if args.no_images else fetch_images(args.file_key, nodes)
+    result = export_node(nodes[0], "output", args.dedupe_css, args.css_tokens, args.incremental, assets,
+                         args.simplify, args.components)
+    if result["components"]:
+        print(f"[COMPONENTS] {result['components']}")
+    if result["simplify"]:
+        print(f"[SIMPLIFY] {result['simplify']}")
+    if result["css"]:
+        print(f"[CSS] {result['css']}")
+    if args.css_tokens:
+        print(f"[CSS] {result['styles']}")
+    if result["reuse"]:
+        print(f"[INCREMENTAL] {result['reuse']}")
+    if result["images"]:
+        print(f"[ASSETS] {result['images']} image(s) → output/{ASSET_SUBDIR}")
     print("Export complete → output/index.html")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,13 +1,82 @@
-from typing import Any, Dict, List, TypedDict
+import marshal
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Tuple, TypedDict
 
-class UiNode(TypedDict, total=False):
+class UiNodeDict(TypedDict, total=False):
     id: str
     name: str
     kind: str
-    children: List["UiNode"]
+    children: List["UiNodeDict"]
     styles: Dict[str, Any]
     text: str
 
+class UiNode:
+    """
+    Compact node used by the CSS/HTML generators.
+    Geometry lives in slots instead of a nested layout dict, and `styles` (fills,
+    strokes, radii, text style, flex, padding - everything except layout) is an
+    interned dict shared by every node with the same styling, so it must be
+    treated as read-only.
+    `component` is set on instances whose subtree is shared through a
+    ComponentCache (see components.py); their children then live in the
+    component's template, not in `children`.
+    """
+    __slots__ = ("id", "name", "kind", "text", "styles", "children",
+                 "x", "y", "width", "height", "abs_x", "abs_y", "component")
+
+    def __init__(self, id: str, name: str, kind: str, styles: Dict[str, Any], text: str = "",
+                 x: float = 0, y: float = 0, width: float = 0, height: float = 0):
+        self.id = id
+        self.name = name
+        self.kind = kind
+        self.text = text
+        self.styles = styles
+        self.children: List["UiNode"] = []
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.abs_x = 0
+        self.abs_y = 0
+        self.component = None
+
+    @classmethod
+    def from_dict(cls, root: UiNodeDict) -> "UiNode":
+        """Converts a UiNodeDict tree (from map_figma_to_ui) into UiNodes."""
+        table: Dict[bytes, Dict[str, Any]] = {}
+
+        def convert(d: UiNodeDict) -> "UiNode":
+            styles = {k: v for k, v in d.get("styles", {}).items() if k != "layout"}
+            layout = d.get("styles", {}).get("layout", {})
+            n = cls(d["id"], d.get("name", ""), d.get("kind", ""), intern_styles(styles, table),
+                    d.get("text", ""), layout.get("x", 0), layout.get("y", 0),
+                    layout.get("width", 0), layout.get("height", 0))
+            n.abs_x = layout.get("abs_x", 0)
+            n.abs_y = layout.get("abs_y", 0)
+            return n
+
+        root_node = convert(root)
+        stack = [(root, root_node)]
+        while stack:
+            d, n = stack.pop()
+            for c in d.get("children", []):
+                child = convert(c)
+                n.children.append(child)
+                stack.append((c, child))
+        return root_node
+
+def intern_styles(styles: Dict[str, Any], table: Dict[bytes, Dict[str, Any]]) -> Dict[str, Any]:
+    """Returns the shared copy of an equal styles dict from `table`, adding it if new."""
+    # marshal serializes the plain JSON values in C, several times faster than
+    # json.dumps; version 2 predates back-references, so equal dicts give equal bytes.
+    # Key order counts, which is fine: _map_styles fixes the top level and the API
+    # writes nested objects in a fixed order.
+    key = marshal.dumps(styles, 2)
+    shared = table.get(key)
+    if shared is None:
+        table[key] = shared = styles
+    return shared
+
 def _detect_kind(node: Dict[str, Any]) -> str:
     t = node.get("type")
     if t in ("FRAME", "COMPONENT", "INSTANCE"):
@@ -20,17 +89,9 @@ def _detect_kind(node: Dict[str, Any]) -> str:
         return "text"
     return "other"
 
-def map_figma_to_ui(node: Dict[str, Any]) -> UiNode:
-    kind = _detect_kind(node)
+def _map_styles(node: Dict[str, Any], kind: str) -> Dict[str, Any]:
+    """Everything UiNode styles carry apart from layout."""
     styles: Dict[str, Any] = {}
-    box = node.get("absoluteBoundingBox")
-    if box:
-        styles["layout"] = {
-            "x": box.get("x", 0),
-            "y": box.get("y", 0),
-            "width": box.get("width", 0),
-            "height": box.get("height", 0),
-        }
     layout_mode = node.get("layoutMode")
     if layout_mode and layout_mode != "NONE":
         styles["flex"] = {
@@ -68,10 +129,24 @@ def map_figma_to_ui(node: Dict[str, Any]) -> UiNode:
     if padding:
         styles["padding"] = padding
 
+    return styles
 
+def _map_node(node: Dict[str, Any]) -> UiNodeDict:
+    """Maps a single Figma node (without its children) to a UiNodeDict."""
+    kind = _detect_kind(node)
+    styles: Dict[str, Any] = {}
+    box = node.get("absoluteBoundingBox")
+    if box:
+        styles["layout"] = {
+            "x": box.get("x", 0),
+            "y": box.get("y", 0),
+            "width": box.get("width", 0),
+            "height": box.get("height", 0),
+        }
+    styles.update(_map_styles(node, kind))
 
     # Creating UI Node
-    ui: UiNode = {
+    ui: UiNodeDict = {
         "id": node["id"],
         "name": node.get("name", ""),
         "kind": kind,
@@ -82,6 +157,10 @@ def map_figma_to_ui(node: Dict[str, Any]) -> UiNode:
     if kind == "text":
         ui["text"] = node.get("characters", "")
 
+    return ui
+
+def _visible_children(node: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Visible children in order, skipping ids repeated under the same parent."""
     seen_ids = set()
 
     for c in node.get("children", []):
@@ -91,6 +170,12 @@ def map_figma_to_ui(node: Dict[str, Any]) -> UiNode:
         if cid in seen_ids:
             continue
         seen_ids.add(cid)
+        yield c
+
+def map_figma_to_ui(node: Dict[str, Any]) -> UiNodeDict:
+    ui = _map_node(node)
+
+    for c in _visible_children(node):
         child_ui = map_figma_to_ui(c)
         ui["children"].append(child_ui)
 
@@ -111,3 +196,64 @@ def apply_absolute_layout(node, root_x=None, root_y=None):
 
     for child in node.get("children", []):
         apply_absolute_layout(child, root_x, root_y)
+
+def class_name(node_id: str, prefix: str = "node") -> str:
+    """Unique CSS class for a node, based on its ID."""
+    safe = node_id.replace(":", "-").replace(";", "-")
+    return f"{prefix}-{safe}"
+
+def _compact_node(node: Dict[str, Any], table: Dict[bytes, Dict[str, Any]],
+                  origin: Optional[Tuple[float, float]] = None) -> UiNode:
+    kind = _detect_kind(node)
+    box = node.get("absoluteBoundingBox") or {}
+    ui = UiNode(
+        node["id"],
+        sys.intern(node.get("name", "")),
+        kind,
+        intern_styles(_map_styles(node, kind), table),
+        node.get("characters", "") if kind == "text" else "",
+        box.get("x", 0), box.get("y", 0), box.get("width", 0), box.get("height", 0),
+    )
+    # offsets relative to the root frame; nodes without a bounding box stay at 0, 0
+    if box and origin is not None:
+        ui.abs_x = ui.x - origin[0]
+        ui.abs_y = ui.y - origin[1]
+    return ui
+
+def build_ui_tree(node: Dict[str, Any], prefix: str = "node",
+                  table: Optional[Dict[bytes, Dict[str, Any]]] = None,
+                  components=None) -> Tuple[UiNode, Dict[str, str]]:
+    """
+    Single traversal that does the work of map_figma_to_ui, apply_absolute_layout
+    and class assignment, producing compact UiNodes.
+    Uses an explicit stack instead of recursion, so arbitrarily deep trees are fine.
+    `table` holds the interned styles and can be shared across calls.
+    With a ComponentCache as `components`, instances it can share are not
+    descended into: their subtree is mapped once per component.
+    Returns the UiNode root and the node id → CSS class map.
+    """
+    if table is None:
+        table = {}
+    root = _compact_node(node, table)
+    origin = (root.x, root.y)
+    id_to_class: Dict[str, str] = {}
+
+    stack = [(node, root)]
+    while stack:
+        figma_node, ui = stack.pop()
+        id_to_class[ui.id] = class_name(ui.id, prefix)
+
+        pending = []
+        for c in _visible_children(figma_node):
+            child_ui = _compact_node(c, table, origin)
+            ui.children.append(child_ui)
+            if components is not None:
+                child_ui.component = components.get(c)
+                if child_ui.component is not None:
+                    id_to_class[child_ui.id] = class_name(child_ui.id, prefix)
+                    continue
+            pending.append((c, child_ui))
+        # reversed, so children are visited in document order
+        stack.extend(reversed(pending))
+
+    return root, id_to_class
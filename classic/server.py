@@ -0,0 +1,431 @@
+import argparse
+import json
+import math
+import os
+import signal
+import socketserver
+import threading
+import time
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import figma_api
+from components import ComponentCache
+from css_html import StyleConverter, dedupe_css, generate_css, generate_html
+from figma_api import get_client, get_file
+from figma_cache import CacheError
+from mapper import build_ui_tree
+from simplify import simplify_tree
+
+# Export daemon: one long-running process that keeps parsed Figma documents and
+# rendered frames in memory, so an export of a frame it has seen comes back in
+# milliseconds instead of paying for imports, parsing the cache entry and
+# compiling the template every time.
+#   GET  /export?file=<key>&node=<id>[&dedupe=1&tokens=1&simplify=1&components=1]
+#        → {"css", "html", "version", "cache", "ms", ...}; &format=html or css for the page alone
+#   GET  /stats   latency percentiles (warm / document / cold) and cache counters
+#   POST /poll    check the warm documents' versions now
+#   GET  /health
+# Documents and frames live in bounded LRU caches. With --poll, every warm
+# document's version is checked with a depth=1 request; only a file that changed
+# is downloaded again, and the frames that were warm for it are re-rendered.
+# Image fills are left out, as with main.py --no-images.
+
+DEFAULT_PORT = 8765
+DEFAULT_DOCUMENTS = 4
+DEFAULT_FRAMES = 256
+OPTIONS = ("dedupe", "tokens", "simplify", "components")
+
+
+class LruCache:
+    """Thread-safe, count-bounded LRU map with hit/miss/eviction counters."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._items: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.stats["misses"] += 1
+                return None
+            self._items.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """get() without touching the order or the counters."""
+        with self._lock:
+            return self._items.get(key)
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def pop_where(self, predicate: Callable[[Hashable], bool]) -> List[Hashable]:
+        """Removes and returns the keys matching predicate."""
+        with self._lock:
+            keys = [k for k in self._items if predicate(k)]
+            for k in keys:
+                del self._items[k]
+            return keys
+
+    def keys(self) -> List[Hashable]:
+        with self._lock:
+            return list(self._items)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def summary(self) -> Dict[str, int]:
+        """Size, capacity and counters, read together under the lock."""
+        with self._lock:
+            return {"size": len(self._items), "capacity": self.capacity, **self.stats}
+
+
+class LatencyRecorder:
+    """The last `window` latencies per kind, summarized as percentiles."""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(kind, deque(maxlen=self.window)).append(seconds)
+
+    @staticmethod
+    def _percentile(ordered: List[float], p: float) -> float:
+        # nearest rank
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Milliseconds by kind: count, p50, p90, p99 and max."""
+        with self._lock:
+            samples = {k: sorted(v) for k, v in self._samples.items()}
+        return {k: {"count": len(v), **{f"p{p}": round(self._percentile(v, p) * 1000, 3) for p in (50, 90, 99)},
+                    "max": round(v[-1] * 1000, 3)}
+                for k, v in samples.items() if v}
+
+
+def format_latency(summary: Dict[str, Dict[str, float]]) -> str:
+    return "; ".join(f"{k} n={s['count']} p50={s['p50']:.1f}ms p90={s['p90']:.1f}ms p99={s['p99']:.1f}ms"
+                     for k, s in summary.items())
+
+
+class Document:
+    """One parsed Figma file, with an id → node index built on first lookup."""
+
+    def __init__(self, file_key: str, data: Dict[str, Any]):
+        self.file_key = file_key
+        self.data = data
+        self.version = data.get("version")
+        self._index: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def node(self, node_id: str) -> Optional[Dict[str, Any]]:
+        if self._index is None:
+            index = {}
+            stack = [self.data["document"]]
+            while stack:
+                n = stack.pop()
+                index[n.get("id")] = n
+                stack.extend(n.get("children", []))
+            self._index = index
+        return self._index.get(node_id)
+
+
+class Frame:
+    """
+    A rendered frame. Its fields are also kept encoded as JSON object members,
+    so a warm response is a concatenation rather than an encoding of megabytes of markup.
+    """
+
+    __slots__ = ("nodes", "css", "html", "members")
+
+    def __init__(self, nodes: int, css: str, html: str):
+        self.nodes = nodes
+        self.css = css
+        self.html = html
+        self.members = json.dumps({"nodes": nodes, "css": css, "html": html})[1:-1].encode("utf-8")
+
+
+def render_frame(node: Dict[str, Any], dedupe: bool = False, tokens: bool = False, simplify: bool = False,
+                 components: bool = False) -> Frame:
+    """export_node's pipeline, producing the CSS and HTML as strings instead of files."""
+    cache = ComponentCache() if components else None
+    ui_root, id_to_class = build_ui_tree(node, components=cache)
+    nodes = simplify_tree(ui_root)["after"] if simplify else len(id_to_class)
+    conv = StyleConverter(None, cache)
+    if tokens:
+        conv.collect_tokens(ui_root)
+    plan = dedupe_css(ui_root, id_to_class, conv) if dedupe else None
+    css = generate_css(ui_root, id_to_class, plan, conv)
+    html = generate_html(ui_root, plan["classes"] if plan else id_to_class)
+    return Frame(nodes, css, html)
+
+
+class ExportService:
+    """
+    Warm exports: parsed documents by file key and rendered frames by
+    (file key, version, node id, options), each in a bounded LRU cache.
+    A frame's key carries its document's version, so a changed file never
+    serves a stale frame.
+    """
+
+    def __init__(self, max_documents: int = DEFAULT_DOCUMENTS, max_frames: int = DEFAULT_FRAMES):
+        self.documents = LruCache(max_documents)
+        self.frames = LruCache(max_frames)
+        self.latency = LatencyRecorder()
+        self.polls = {"checks": 0, "changed": 0, "errors": 0}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, file_key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(file_key, threading.Lock())
+
+    def document(self, file_key: str) -> Tuple[Document, bool]:
+        """The warm document, loading it (once, however many requests wait) if needed; and whether it was."""
+        doc = self.documents.get(file_key)
+        if doc is not None:
+            return doc, False
+        with self._lock(file_key):
+            # loaded by another request while this one waited
+            doc = self.documents.peek(file_key)
+            if doc is not None:
+                return doc, False
+            doc = Document(file_key, get_file(file_key))
+            self.documents.put(file_key, doc)
+            return doc, True
+
+    def export(self, file_key: str, node_id: str, **options: bool) -> Optional[Dict[str, Any]]:
+        """
+        The rendered frame ("frame") and how it was served ("cache"): "warm"
+        (from the frame cache), "document" (rendered from a warm document) or
+        "cold" (document loaded first). None when the node isn't in the file.
+        """
+        start = time.perf_counter()
+        flags = tuple(bool(options.get(o)) for o in OPTIONS)
+        doc, loaded = self.document(file_key)
+        key = (file_key, doc.version, node_id, flags)
+        frame = self.frames.get(key)
+        served = "warm"
+        if frame is None:
+            node = doc.node(node_id)
+            if node is None:
+                return None
+            frame = render_frame(node, *flags)
+            self.frames.put(key, frame)
+            served = "cold" if loaded else "document"
+        elapsed = time.perf_counter() - start
+        self.latency.record(served, elapsed)
+        return {"file": file_key, "node": node_id, "version": doc.version, "cache": served,
+                "ms": round(elapsed * 1000, 3), "frame": frame}
+
+    def poll(self) -> List[str]:
+        """
+        Checks every warm document against Figma's current version (depth=1);
+        reloads the ones that changed and re-renders their warm frames.
+        Returns the keys of the files that changed.
+        """
+        import requests
+        changed = []
+        for file_key in self.documents.keys():
+            doc = self.documents.get(file_key)
+            if doc is None:
+                continue
+            self.polls["checks"] += 1
+            try:
+                version = get_client().get_file_meta(file_key)["version"]
+            except requests.RequestException as e:
+                self.polls["errors"] += 1
+                print(f"[SERVER] Version check of {file_key} failed: {e}")
+                continue
+            if version == doc.version:
+                continue
+            print(f"[SERVER] {file_key} changed (version {doc.version} → {version})")
+            try:
+                with self._lock(file_key):
+                    fresh = Document(file_key, get_file(file_key, refresh=True))
+                    self.documents.put(file_key, fresh)
+            except (requests.RequestException, CacheError, ValueError) as e:
+                self.polls["errors"] += 1
+                print(f"[SERVER] Reloading {file_key} failed: {e}")
+                continue
+            self.polls["changed"] += 1
+            changed.append(file_key)
+            stale = self.frames.pop_where(lambda k: k[0] == file_key and k[1] != fresh.version)
+            for _, _, node_id, flags in stale:
+                node = fresh.node(node_id)
+                if node is not None:
+                    self.frames.put((file_key, fresh.version, node_id, flags), render_frame(node, *flags))
+            print(f"[SERVER] Re-rendered {len(stale)} warm frame(s) of {file_key}")
+        return changed
+
+    def start_polling(self, interval: float) -> threading.Thread:
+        def loop():
+            while True:
+                time.sleep(interval)
+                self.poll()
+
+        thread = threading.Thread(target=loop, name="figma-poll", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self) -> Dict[str, Any]:
+        return {"latency_ms": self.latency.summary(), "documents": self.documents.summary(),
+                "frames": self.frames.summary(), "polls": dict(self.polls)}
+
+
+def _flag(query: Dict[str, List[str]], name: str) -> bool:
+    return query.get(name, ["0"])[-1].lower() in ("1", "true", "yes")
+
+
+class ExportHandler(BaseHTTPRequestHandler):
+    server_version = "FigmaExport/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status: int, body: Dict[str, Any]) -> None:
+        self._send_bytes(status, json.dumps(body).encode("utf-8"))
+
+    def _send_bytes(self, status: int, data: bytes, content_type: str = "application/json") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        service: ExportService = self.server.service
+        if url.path == "/health":
+            self._send(200, {"ok": True})
+        elif url.path == "/stats":
+            self._send(200, service.stats())
+        elif url.path == "/export":
+            self._export(service, parse_qs(url.query))
+        else:
+            self._send(404, {"error": f"no route {url.path}"})
+
+    def do_POST(self) -> None:
+        if urlparse(self.path).path != "/poll":
+            self._send(404, {"error": f"no route {self.path}"})
+            return
+        try:
+            self._send(200, {"changed": self.server.service.poll()})
+        except SystemExit as e:
+            self._send(502, {"error": str(e)})
+
+    def _export(self, service: ExportService, query: Dict[str, List[str]]) -> None:
+        file_key = query.get("file", [None])[-1]
+        node_id = query.get("node", [None])[-1]
+        if not file_key or not node_id:
+            self._send(400, {"error": "file and node are required"})
+            return
+        if query.get("format", ["json"])[-1] not in ("json", "html", "css"):
+            self._send(400, {"error": "format must be json, html or css"})
+            return
+        try:
+            result = service.export(file_key, node_id, **{o: _flag(query, o) for o in OPTIONS})
+        except SystemExit as e:
+            # get_token's "Please set FIGMA_TOKEN" for a file that isn't cached
+            self._send(502, {"error": str(e)})
+            return
+        except (CacheError, OSError, ValueError) as e:
+            self._send(502, {"error": str(e)})
+            return
+        if result is None:
+            self._send(404, {"error": f"node {node_id} not found in {file_key}"})
+            return
+        frame = result.pop("frame")
+        fmt = query.get("format", ["json"])[-1]
+        if fmt == "html":
+            self._send_bytes(200, frame.html.encode("utf-8"), "text/html; charset=utf-8")
+        elif fmt == "css":
+            self._send_bytes(200, frame.css.encode("utf-8"), "text/css; charset=utf-8")
+        else:
+            self._send_bytes(200, json.dumps(result)[:-1].encode("utf-8") + b", " + frame.members + b"}")
+        if self.server.log_requests:
+            print(f"[SERVER] {file_key} {node_id} {result['cache']} {result['ms']:.1f} ms")
+
+    def address_string(self) -> str:
+        # Unix-socket clients have no (host, port)
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service: ExportService, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                socket_path: Optional[str] = None, log_requests: bool = True) -> socketserver.BaseServer:
+    """A threaded HTTP server for `service` on host:port, or on a Unix socket when socket_path is given."""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = UnixHTTPServer(socket_path, ExportHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), ExportHandler)
+        server.daemon_threads = True
+    server.service = service
+    server.log_requests = log_requests
+    return server
+
+
+def _stop(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve exports from a warm, long-running process.")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="TCP port")
+    parser.add_argument("--socket", help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("--cache-dir", default=figma_api.CACHE_DIR, help="Figma JSON cache directory")
+    parser.add_argument("--documents", type=int, default=DEFAULT_DOCUMENTS, help="Parsed documents kept warm")
+    parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES, help="Rendered frames kept warm")
+    parser.add_argument("--poll", type=float, default=0.0,
+                        help="Seconds between version checks of the warm documents (0 = only on POST /poll)")
+    parser.add_argument("--preload", action="append", default=[], metavar="FILE_KEY",
+                        help="Parse this file at startup; repeat for several")
+    parser.add_argument("--quiet", action="store_true", help="Don't print a line per export")
+    args = parser.parse_args()
+
+    figma_api.CACHE_DIR = args.cache_dir
+    service = ExportService(args.documents, args.frames)
+    for file_key in args.preload:
+        service.document(file_key)
+    if args.poll > 0:
+        get_client()  # fail now, not in the poller, when there's no token
+        service.start_polling(args.poll)
+    server = make_server(service, args.host, args.port, args.socket, not args.quiet)
+    where = args.socket or f"http://{args.host}:{server.server_address[1]}"
+    print(f"[SERVER] Listening on {where}")
+    signal.signal(signal.SIGTERM, _stop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+        print(f"[SERVER] {format_latency(service.latency.summary()) or 'no exports served'}")
+
+
+if __name__ == "__main__":
+    main()
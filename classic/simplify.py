@@ -0,0 +1,168 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from css_html import _extract_stroke, element_kind, should_be_bottom_anchored
+from mapper import UiNode
+
+# Tree simplification between build_ui_tree and CSS/HTML generation.
+# Every node is an absolutely positioned div whose left/top come from its
+# offset to the root frame, and it is the containing block of its own children.
+# Within that model the pass
+#   - drops leaves that paint nothing (no visible fill or border, empty text,
+#     zero-size boxes),
+#   - collapses pass-through wrappers (a single child, no paint, no border, no
+#     auto-layout) into their child, adding the wrapper's left/top to the
+#     child's so it lands on the same pixels,
+#   - merges consecutive text boxes with the same style that sit directly on
+#     top of each other into one multi-line box.
+# Children of auto-layout frames are never touched: they are laid out in flow,
+# so removing or merging one would move its siblings. Inputs and buttons,
+# which render as controls, are kept too.
+
+
+def _offset(n: UiNode, root: UiNode) -> Tuple[float, float]:
+    # the left/top values _geometry_declarations writes
+    return n.abs_x - root.abs_x, n.abs_y - root.abs_y
+
+
+def _fill_painted(styles: Dict[str, Any]) -> bool:
+    """Whether the first fill (the only one the CSS uses) shows anything."""
+    fills = styles.get("fills") or []
+    if not fills:
+        return False
+    p = fills[0]
+    t = p.get("type", "")
+    if t == "SOLID":
+        color = p.get("color", {})
+        return p.get("opacity", color.get("a", 1.0)) > 0
+    if "GRADIENT" in t:
+        return any(s["color"].get("a", 1.0) > 0 for s in p.get("gradientStops") or [])
+    return t == "IMAGE"
+
+
+def _stroke_painted(styles: Dict[str, Any]) -> bool:
+    strokes = styles.get("strokes") or []
+    if not strokes or _extract_stroke(styles) is None:
+        return False
+    s = strokes[0]
+    color = s.get("color", {})
+    return s.get("opacity", color.get("a", 1.0)) > 0 and styles.get("strokeWeight", 1) > 0
+
+
+def _renders_nothing(n: UiNode) -> bool:
+    if n.children or n.component is not None:
+        return False
+    if element_kind(n) not in ("div", "text") or _stroke_painted(n.styles):
+        return False
+    if n.kind == "text":
+        return not n.text.strip()
+    return not _fill_painted(n.styles) or n.width <= 0 or n.height <= 0
+
+
+def _bottom_anchored(n: UiNode, root: UiNode, dy: float = 0) -> bool:
+    return should_be_bottom_anchored(_offset(n, root)[1] + dy, n.height, root.height)
+
+
+def _collapse(w: UiNode, root: UiNode) -> Optional[UiNode]:
+    """
+    The wrapper's only child, moved to where it rendered inside the wrapper,
+    or None when the wrapper does something of its own.
+    """
+    if len(w.children) != 1 or w.kind == "text" or element_kind(w) != "div":
+        return None
+    styles = w.styles
+    # a border (even a transparent one) shifts the children by its width
+    if styles.get("flex") or _fill_painted(styles) or _extract_stroke(styles) is not None:
+        return None
+    child = w.children[0]
+    wx, wy = _offset(w, root)
+    cx, cy = _offset(child, root)
+    if _bottom_anchored(w, root) or _bottom_anchored(child, root):
+        return None
+    # left/top are truncated to whole pixels, so add the values the CSS actually had
+    dx = int(wx) + int(cx) - cx
+    dy = int(wy) + int(cy) - cy
+    if _bottom_anchored(child, root, dy):
+        return None
+    child.abs_x += dx
+    child.abs_y += dy
+    return child
+
+
+def _whole(v: float) -> bool:
+    return float(v).is_integer()
+
+
+def _mergeable(a: UiNode, b: UiNode, root: UiNode) -> bool:
+    """
+    b is the next line of a: same style (styles are interned), same column and
+    b's box starts where a's ends. Both are whole numbers of lines tall, with
+    whole-pixel geometry, so the merged box puts every line on the same pixels.
+    """
+    if a.kind != "text" or b.kind != "text" or a.styles is not b.styles or a.children or b.children:
+        return False
+    line = a.styles.get("textStyle", {}).get("lineHeightPx")
+    if not line or a.abs_x != b.abs_x or a.width != b.width or b.abs_y != a.abs_y + a.height:
+        return False
+    values = (a.abs_x - root.abs_x, a.abs_y - root.abs_y, a.width, a.height, b.height)
+    if not all(_whole(v) for v in values):
+        return False
+    if a.height % line or b.height % line:
+        return False
+    return not (_bottom_anchored(a, root) or _bottom_anchored(b, root))
+
+
+def simplify_tree(root: UiNode) -> Dict[str, int]:
+    """
+    Simplifies a build_ui_tree tree in place, leaving the rendered geometry of
+    everything that paints unchanged. Removed nodes keep their id_to_class
+    entries; they just no longer appear in the CSS or HTML.
+    Returns counts: nodes before and after, and how many were removed,
+    collapsed and merged.
+    """
+    # pre-order with the parent's auto-layout flag, then bottom-up, so a
+    # parent sees its children already simplified
+    order: List[Tuple[UiNode, bool]] = []
+    stack = [(root, False)]
+    before = 0
+    while stack:
+        n, in_flex = stack.pop()
+        before += 1
+        order.append((n, in_flex))
+        flex = bool(n.styles.get("flex"))
+        stack.extend((c, flex) for c in reversed(n.children))
+
+    stats = {"before": before, "removed": 0, "collapsed": 0, "merged": 0}
+    for n, in_flex in reversed(order):
+        if not n.children or n.styles.get("flex"):
+            continue
+        kept: List[UiNode] = []
+        for c in n.children:
+            if _renders_nothing(c):
+                stats["removed"] += 1
+                continue
+            # a wrapper's child is placed against the wrapper's box; lifted into
+            # n it's placed against n's, which only works if n is positioned itself
+            if not in_flex:
+                child = _collapse(c, root)
+                while child is not None:
+                    stats["collapsed"] += 1
+                    c = child
+                    child = _collapse(c, root)
+            if kept and _mergeable(kept[-1], c, root):
+                a = kept[-1]
+                a.text = f"{a.text}\n{c.text}"
+                a.height += c.height
+                stats["merged"] += 1
+                continue
+            kept.append(c)
+        n.children = kept
+
+    stats["after"] = before - stats["removed"] - stats["collapsed"] - stats["merged"]
+    return stats
+
+
+def format_simplify_stats(stats: Dict[str, int]) -> str:
+    removed = stats["before"] - stats["after"]
+    pct = 100.0 * removed / stats["before"] if stats["before"] else 0.0
+    return (f"{stats['before']} → {stats['after']} nodes (-{pct:.1f}%): {stats['removed']} no-op, "
+            f"{stats['collapsed']} wrappers collapsed, {stats['merged']} text runs merged")
@@ -0,0 +1,38 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# The pipelines are flat script directories run from inside themselves, so the
+# tests put them on the path the same way bench/ does. The helper modules both
+# directories share are identical, so whichever copy is imported first serves both.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for sub in ("bench", "ai", "classic"):
+    sys.path.insert(0, os.path.join(ROOT, sub))
+
+
+class FakeOpenAI:
+    """
+    Stands in for openai.OpenAI: chat.completions.create passes its arguments to
+    `create` and wraps the text it returns as a completion, or as a stream of
+    chunks with stream=True. The arguments of every call are kept in `calls`.
+    """
+
+    def __init__(self, create):
+        self._create = create
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        text = self._create(**kwargs)
+        if kwargs.get("stream"):
+            return iter([SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text[i:i + 16]))])
+                         for i in range(0, len(text), 16)])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+@pytest.fixture
+def fake_openai():
+    return FakeOpenAI
@@ -0,0 +1,127 @@
+import re
+
+import pytest
+
+from components import ComponentCache
+from css_html import StyleConverter, generate_css, generate_html
+from mapper import build_ui_tree
+from synth_figma import Generator
+
+GEOMETRY = ("position", "left", "top", "bottom", "width", "height", "align-self")
+RED = [{"type": "SOLID", "color": {"r": 1, "g": 0, "b": 0, "a": 1}}]
+
+
+def _rules(css):
+    return {cls: [d.strip().rstrip(";") for d in body.splitlines()]
+            for cls, body in re.findall(r"^\.([\w-]+) \{\n(.*?)\n\}", css, re.M | re.S)}
+
+
+def _box(x, y, w, h):
+    return {"x": x, "y": y, "width": w, "height": h}
+
+
+def _button(prefix, x, y):
+    return {"id": f"{prefix}5:1", "type": "INSTANCE", "name": "Button", "componentId": "5:0", "overrides": [],
+            "absoluteBoundingBox": _box(x, y, 80, 24), "fills": RED,
+            "children": [{"id": f"{prefix}5:2", "type": "TEXT", "name": "Label", "characters": "Go",
+                          "absoluteBoundingBox": _box(x + 8, y + 4, 40, 16),
+                          "style": {"fontFamily": "Inter", "fontSize": 12, "textAlignHorizontal": "CENTER"}}]}
+
+
+def _card(n, x, y):
+    prefix = f"I{n};"
+    return {"id": f"{n}:0", "type": "INSTANCE", "name": "Card", "componentId": "4:0", "overrides": [],
+            "absoluteBoundingBox": _box(x, y, 200, 100), "cornerRadius": 8,
+            "layoutMode": "NONE",
+            "children": [
+                {"id": f"{prefix}4:1", "type": "TEXT", "name": "Title", "characters": "Card",
+                 "absoluteBoundingBox": _box(x + 10, y + 10, 120, 20), "style": {"fontFamily": "Inter"}},
+                {"id": f"{prefix}4:2", "type": "FRAME", "name": "Row", "layoutMode": "HORIZONTAL", "itemSpacing": 4,
+                 "absoluteBoundingBox": _box(x + 10, y + 60, 180, 32),
+                 "children": [_button(prefix + "a", x + 14, y + 64), _button(prefix + "b", x + 100, y + 64)]}]}
+
+
+def _nested_frame():
+    # the second card sits on the frame's bottom edge, so its boxes are bottom-anchored
+    return {"id": "1:1", "type": "FRAME", "name": "Screen", "absoluteBoundingBox": _box(50, 50, 393, 852),
+            "children": [_card(2, 70, 100), _card(3, 120, 802)]}
+
+
+def _synth_frame():
+    doc = Generator(nodes=1500, components=5, seed=3).document()
+    return doc["document"]["children"][0]["children"][0]
+
+
+def _pairs(off_root, on_root, on_classes):
+    """
+    (flag-off node, its parent inside a shared instance or None, classes of the
+    rules that style its counterpart in the flag-on export).
+    """
+    stack = [(off_root, on_root, on_classes[on_root.id], None, None)]
+    while stack:
+        off, on, cls, component, parent = stack.pop()
+        if on.component is not None:
+            yield off, parent, (cls, on.component.cls)
+            component, children = on.component, on.component.root.children
+        else:
+            yield off, parent, (cls,)
+            children = on.children
+        for o, t in zip(off.children, children):
+            child_cls = on_classes[t.id] if component is None else component.classes[t.id]
+            stack.append((o, t, child_cls, component, off if component is not None else None))
+
+
+def _geometry(decls):
+    return dict(d.split(": ", 1) for d in decls if d.startswith(GEOMETRY))
+
+
+@pytest.mark.parametrize("make_frame", [_nested_frame, _synth_frame])
+def test_components_only_change_sharing(make_frame):
+    frame = make_frame()
+    off_root, off_classes = build_ui_tree(frame)
+    off_css = _rules(generate_css(off_root, off_classes))
+    cache = ComponentCache()
+    on_root, on_classes = build_ui_tree(frame, components=cache)
+    on_css = _rules(generate_css(on_root, on_classes, conv=StyleConverter(components=cache)))
+    assert cache.instances > 1
+
+    checked = inside = 0
+    for off, parent, classes in _pairs(off_root, on_root, on_classes):
+        decls = [d for cls in classes for d in on_css.get(cls, [])]
+        off_decls = off_css[off_classes[off.id]]
+        # the same appearance, from the node's own rule or from wherever it's shared
+        assert sorted(d for d in decls if not d.startswith(GEOMETRY)) == \
+            sorted(d for d in off_decls if not d.startswith(GEOMETRY)), (off.id, classes)
+        on_box, off_box = _geometry(decls), _geometry(off_decls)
+        if parent is None:
+            assert on_box == off_box, (off.id, classes)
+        else:
+            # inside a shared instance the box is the same, placed relative to its parent
+            for key in ("position", "width", "height", "align-self"):
+                assert on_box.get(key) == off_box.get(key), (off.id, key)
+            if "left" in on_box:
+                x, y = off.abs_x - parent.abs_x, off.abs_y - parent.abs_y
+                assert on_box["left"] == f"{int(x)}px"
+                assert on_box.get("top") == f"{int(y)}px" or \
+                    on_box.get("bottom") == f"{int(parent.height - (y + off.height))}px"
+            inside += 1
+        checked += 1
+    assert checked == len(off_classes) and inside
+
+    strip = lambda html: re.sub(r' class="[^"]*"', "", html)
+    assert strip(generate_html(on_root, on_classes)) == strip(generate_html(off_root, off_classes))
+
+
+def test_inner_rules_are_written_once_per_component():
+    def rules(cards):
+        frame = {"id": "1:1", "type": "FRAME", "name": "Screen", "absoluteBoundingBox": _box(0, 0, 400, 120 * cards),
+                 "children": [_card(2 + i, 10, 10 + 120 * i) for i in range(cards)]}
+        cache = ComponentCache()
+        root, classes = build_ui_tree(frame, components=cache)
+        return _rules(generate_css(root, classes, conv=StyleConverter(components=cache)))
+
+    two, ten = rules(2), rules(10)
+    # each extra card adds only its own box
+    assert len(ten) - len(two) == 8
+    assert {c: r for c, r in ten.items() if c.startswith("cmp-")} == \
+        {c: r for c, r in two.items() if c.startswith("cmp-")}
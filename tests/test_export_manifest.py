@@ -0,0 +1,49 @@
+import pytest
+
+from main import export_node
+from synth_figma import Generator
+
+
+def _frame():
+    doc = Generator(nodes=3000, components=6, seed=1).document()
+    return doc["document"]["children"][0]["children"][0]
+
+
+def _descendants(node):
+    stack = list(node.get("children", []))
+    while stack:
+        n = stack.pop()
+        yield n
+        stack.extend(n.get("children", []))
+
+
+def _read(out):
+    return (out / "styles.css").read_text(encoding="utf-8"), (out / "index.html").read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize("components", [False, True])
+def test_incremental_export_matches_a_full_one_after_an_edit(tmp_path, components):
+    frame = _frame()
+    out = tmp_path / "incremental"
+    first = export_node(frame, str(out), incremental=True, components=components)
+    assert first["reuse"].startswith("0 nodes reused")
+    assert "0 rebuilt" in export_node(frame, str(out), incremental=True, components=components)["reuse"]
+
+    # change the text inside every instance of one component, as an edit to the main component would
+    instances = [n for n in _descendants(frame) if n.get("type") == "INSTANCE"]
+    component_id = instances[0]["componentId"]
+    edited = 0
+    for instance in instances:
+        if instance["componentId"] == component_id:
+            for n in _descendants(instance):
+                if n.get("type") == "TEXT":
+                    n["characters"] = "CHANGED"
+                    edited += 1
+    assert edited
+
+    result = export_node(frame, str(out), incremental=True, components=components)
+    assert "0 rebuilt" not in result["reuse"]
+    full = tmp_path / "full"
+    export_node(frame, str(full), components=components)
+    assert _read(out) == _read(full)
+    assert "CHANGED" in _read(out)[1]
@@ -0,0 +1,110 @@
+import os
+
+import pytest
+
+import figma_api
+from figma_cache import _checked_path, find_cache, mark_checked, read_header, save_cache
+
+
+def _doc(version, text="before"):
+    return {"version": version, "document": {"id": "0:0", "type": "DOCUMENT", "children": [
+        {"id": "1:1", "type": "CANVAS", "name": "Page", "children": [
+            {"id": "1:2", "type": "TEXT", "name": "Label", "characters": text}]}]}}
+
+
+class FakeClient:
+    """Serves one document at `version`, counting version checks and full downloads."""
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.stats = {"requests": 0, "bytes": 0, "retries": 0}
+        self.meta_calls = 0
+        self.file_calls = 0
+
+    def get_file_meta(self, file_key):
+        self.meta_calls += 1
+        return {"version": self.doc["version"], "lastModified": None}
+
+    def get_file(self, file_key):
+        self.file_calls += 1
+        return self.doc
+
+    def format_stats(self):
+        return ""
+
+
+@pytest.fixture
+def cached(tmp_path, monkeypatch):
+    """A cache entry at version 1, with figma_api pointed at it; returns a function installing a fake Figma."""
+    monkeypatch.setattr(figma_api, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("FIGMA_CACHE_MAX_AGE", "60")
+    path = save_cache(str(tmp_path), "KEY", _doc("1"))
+
+    def figma(doc):
+        client = FakeClient(doc)
+        monkeypatch.setattr(figma_api, "_client", client)
+        return client
+
+    def age(seconds):
+        # backdate both the entry and its checked marker
+        mark_checked(path)
+        then = os.path.getmtime(path) - seconds
+        for p in (path, _checked_path(path)):
+            os.utime(p, (then, then))
+    return figma, age, path
+
+
+def test_fresh_entry_is_used_without_a_request(cached):
+    figma, age, _ = cached
+    client = figma(_doc("2", "after"))
+    assert figma_api.get_node("KEY", "1:2")["characters"] == "before"
+    assert client.meta_calls == client.file_calls == 0
+
+
+def test_expired_entry_with_the_same_version_is_kept(cached):
+    figma, age, path = cached
+    client = figma(_doc("1"))
+    age(120)
+    assert figma_api.get_node("KEY", "1:2")["characters"] == "before"
+    assert (client.meta_calls, client.file_calls) == (1, 0)
+    # the check was recorded: the next run within the max age asks nothing
+    figma_api.get_node("KEY", "1:2")
+    assert client.meta_calls == 1
+
+
+def test_expired_entry_with_a_new_version_is_refetched(cached):
+    figma, age, path = cached
+    client = figma(_doc("2", "after"))
+    age(120)
+    assert figma_api.get_file("KEY")["document"]["children"][0]["children"][0]["characters"] == "after"
+    assert (client.meta_calls, client.file_calls) == (1, 1)
+    assert read_header(find_cache(figma_api.CACHE_DIR, "KEY"))["version"] == "2"
+
+
+def test_refresh_checks_even_a_fresh_entry(cached):
+    figma, age, _ = cached
+    client = figma(_doc("2", "after"))
+    assert figma_api.get_node("KEY", "1:2", refresh=True)["characters"] == "after"
+    assert (client.meta_calls, client.file_calls) == (1, 1)
+
+
+def test_ai_pipeline_revalidates_through_figma_api(cached):
+    from util import get_figma_node
+    figma, age, _ = cached
+    client = figma(_doc("2", "after"))
+    age(120)
+    assert get_figma_node("KEY", "1:2", cache_dir=figma_api.CACHE_DIR)["characters"] == "after"
+    assert (client.meta_calls, client.file_calls) == (1, 1)
+    assert get_figma_node("KEY", cache_dir=figma_api.CACHE_DIR)["id"] == "0:0"
+
+
+def test_max_age_is_read_without_loading_env(monkeypatch):
+    def load_env():
+        raise AssertionError(".env loaded on a warm run")
+    monkeypatch.setattr(figma_api, "_load_env", load_env)
+    monkeypatch.delenv("FIGMA_CACHE_MAX_AGE", raising=False)
+    assert figma_api.cache_max_age() is None
+    monkeypatch.setenv("FIGMA_CACHE_MAX_AGE", "")
+    assert figma_api.cache_max_age() is None
+    monkeypatch.setenv("FIGMA_CACHE_MAX_AGE", "90")
+    assert figma_api.cache_max_age() == 90.0
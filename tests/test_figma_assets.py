@@ -0,0 +1,74 @@
+import json
+import os
+
+import pytest
+
+import figma_api
+from figma_assets import REFS_NAME, collect_image_refs, fetch_assets, link_assets
+from figma_http import FigmaClient
+from figma_standin import serve
+
+PHOTO = b"\x89PNG\r\n\x1a\n" + b"photo" * 100
+
+
+def _image(node_id, ref):
+    return {"id": node_id, "type": "RECTANGLE", "name": "Image",
+            "fills": [{"type": "IMAGE", "imageRef": ref, "scaleMode": "FILL"}]}
+
+
+def _doc(*refs):
+    frame = {"id": "1:1", "type": "FRAME", "name": "Frame",
+             "children": [_image(f"2:{i}", ref) for i, ref in enumerate(refs)]}
+    return {"version": "1", "document": {"id": "0:0", "type": "DOCUMENT", "children": [
+        {"id": "0:1", "type": "CANVAS", "name": "Page", "children": [frame]}]}}
+
+
+@pytest.fixture
+def figma(tmp_path, monkeypatch):
+    """A stand-in serving two files that share images, with figma_api's client pointed at it."""
+    docs = tmp_path / "docs"
+    (docs / "images").mkdir(parents=True)
+    # "copy" is the same picture as "photo" under another ref: it should be stored once
+    for ref in ("photo", "copy"):
+        (docs / "images" / ref).write_bytes(PHOTO)
+    for key, doc in (("KEY", _doc("photo", "icon", "photo", "copy")), ("OTHER", _doc("icon", "copy"))):
+        with open(docs / f"{key}.json", "w", encoding="utf-8") as f:
+            json.dump(doc, f)
+    server = serve(str(docs))
+    client = FigmaClient("stand-in", base_url=f"http://127.0.0.1:{server.server_address[1]}/v1")
+    monkeypatch.setattr(figma_api, "_client", client)
+    yield server.standin, _doc("photo", "icon", "photo", "copy")
+    server.shutdown()
+    server.server_close()
+
+
+def test_images_are_downloaded_once_and_stored_by_content(figma, tmp_path):
+    standin, doc = figma
+    asset_dir = str(tmp_path / "assets")
+    refs = collect_image_refs([doc["document"]])
+    assert refs == ["photo", "icon", "copy"]
+
+    assets = fetch_assets("KEY", refs, asset_dir)
+    assert set(assets) == {"photo", "icon", "copy"}
+    assert assets["photo"] == assets["copy"] and assets["photo"].endswith(".png")
+    assert standin.stats["images"] == 1 and standin.stats["downloads"] == 3
+    assert sorted(os.listdir(asset_dir)) == sorted({*assets.values(), REFS_NAME})
+    with open(os.path.join(asset_dir, assets["photo"]), "rb") as f:
+        assert f.read() == PHOTO
+
+    # a second run, and another file using the same images, download nothing
+    assert fetch_assets("KEY", refs, asset_dir) == assets
+    assert fetch_assets("OTHER", ["icon", "copy"], asset_dir) == {"icon": assets["icon"], "copy": assets["copy"]}
+    assert standin.stats["images"] == 1 and standin.stats["downloads"] == 3
+
+
+def test_exports_link_the_stored_files(figma, tmp_path):
+    _, doc = figma
+    asset_dir = str(tmp_path / "assets")
+    assets = fetch_assets("KEY", collect_image_refs([doc["document"]]), asset_dir)
+    for out in ("first", "second"):
+        target = link_assets(set(assets.values()), str(tmp_path / out), asset_dir)
+        assert sorted(os.listdir(target)) == sorted(set(assets.values()))
+    stored = os.stat(os.path.join(asset_dir, assets["photo"]))
+    linked = os.stat(os.path.join(tmp_path, "second", "assets", assets["photo"]))
+    assert (linked.st_ino, linked.st_dev) == (stored.st_ino, stored.st_dev)
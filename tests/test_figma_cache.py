@@ -0,0 +1,27 @@
+import os
+import threading
+
+from figma_cache import find_cache, load_cache, save_cache
+from figma_index import build_index
+
+
+def test_concurrent_writers_of_one_entry(tmp_path):
+    errors = []
+
+    def writer(n):
+        try:
+            for i in range(20):
+                doc = {"version": f"{n}.{i}", "document": {"id": "0:0", "type": "DOCUMENT", "children": []}}
+                build_index(save_cache(str(tmp_path), "KEY", doc))
+        except Exception as e:  # noqa: BLE001 - any failure of a writer fails the test
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert load_cache(find_cache(str(tmp_path), "KEY"), "KEY")["document"]["id"] == "0:0"
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
@@ -0,0 +1,90 @@
+import json
+
+import pytest
+import requests
+
+import figma_http
+from figma_http import FigmaClient
+
+
+def _response(status, body=None, retry_after=None):
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = json.dumps(body if body is not None else {"status": status}).encode("utf-8")
+    resp.url = "http://figma.test/v1/files/KEY"
+    if retry_after is not None:
+        resp.headers["Retry-After"] = retry_after
+    return resp
+
+
+class ScriptedSession:
+    """Stands in for requests.Session: answers each get with the next scripted response or exception."""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append((url, params))
+        item = self.script.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(figma_http.time, "sleep", delays.append)
+    return delays
+
+
+def _client(*script, **kwargs):
+    client = FigmaClient("token", base_url="http://figma.test/v1", **kwargs)
+    client.session = ScriptedSession(*script)
+    return client
+
+
+def test_retry_after_is_honored(sleeps):
+    client = _client(_response(429, retry_after="3"), _response(200, {"version": "7"}))
+    assert client.get_file("KEY") == {"version": "7"}
+    assert sleeps == [3.0]
+    assert client.stats["requests"] == 2 and client.stats["retries"] == 1
+
+
+def test_retry_after_is_capped_and_dates_fall_back_to_backoff(sleeps):
+    client = _client(_response(429, retry_after="600"), _response(503, retry_after="Wed, 21 Oct 2026 07:28:00 GMT"),
+                     _response(200, {}), max_backoff=30, backoff=2)
+    client.get_file("KEY")
+    assert sleeps[0] == 30
+    # the second retry has no usable Retry-After: full jitter up to backoff * 2**attempt
+    assert 0 <= sleeps[1] <= 4
+
+
+def test_connection_errors_are_retried(sleeps):
+    client = _client(requests.ConnectionError("reset"), requests.Timeout("slow"), _response(200, {"ok": 1}))
+    assert client.get("files/KEY").json() == {"ok": 1}
+    assert len(sleeps) == 2 and client.stats["retries"] == 2
+
+
+def test_gives_up_after_max_retries(sleeps):
+    client = _client(*[_response(502)] * 4, max_retries=3)
+    with pytest.raises(requests.HTTPError):
+        client.get_file("KEY")
+    assert len(sleeps) == 3 and client.stats["requests"] == 4
+    client = _client(*[requests.ConnectionError("down")] * 3, max_retries=2)
+    with pytest.raises(requests.ConnectionError):
+        client.get_file("KEY")
+
+
+def test_other_errors_are_not_retried(sleeps):
+    client = _client(_response(404))
+    with pytest.raises(requests.HTTPError):
+        client.get_file("KEY")
+    assert sleeps == []
+
+
+def test_version_check_asks_for_depth_1():
+    client = _client(_response(200, {"version": "9", "lastModified": "now", "document": {}}))
+    assert client.get_file_meta("KEY") == {"version": "9", "lastModified": "now"}
+    assert client.session.calls == [("http://figma.test/v1/files/KEY", {"depth": 1})]
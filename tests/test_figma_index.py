@@ -0,0 +1,62 @@
+from figma_api import find_node_by_id
+from figma_cache import save_cache
+from figma_index import _RECORD, build_index, index_path, list_nodes, read_node
+from synth_figma import Generator
+
+
+def _cached(tmp_path, nodes=3000):
+    doc = Generator(nodes=nodes, frames=3, components=4).document()
+    return doc, save_cache(str(tmp_path), "KEY", doc)
+
+
+def _ids(root):
+    stack = [root]
+    while stack:
+        n = stack.pop()
+        yield n["id"]
+        stack.extend(n.get("children", []))
+
+
+def test_read_node_matches_a_full_parse(tmp_path):
+    doc, path = _cached(tmp_path)
+    build_index(path)
+    for node_id in _ids(doc["document"]):
+        assert read_node(path, node_id) == find_node_by_id(doc["document"], node_id)
+    assert read_node(path, "missing") is None
+
+
+def test_lookup_reads_records_not_the_whole_sidecar(tmp_path, monkeypatch):
+    doc, path = _cached(tmp_path)
+    build_index(path)
+    reads = []
+    real_open = open
+
+    def counting_open(file, mode="r", *args, **kwargs):
+        f = real_open(file, mode, *args, **kwargs)
+        if file == index_path(path):
+            read = f.read
+            f.read = lambda n=-1: reads.append(n) or read(n)
+        return f
+
+    monkeypatch.setattr("builtins.open", counting_open)
+    assert read_node(path, doc["document"]["children"][0]["children"][0]["id"]) is not None
+    # the header, then a binary search over fixed-width records
+    assert -1 not in reads
+    assert sum(reads) < 64 * _RECORD.size
+
+
+def test_stale_index_is_rebuilt(tmp_path):
+    doc, path = _cached(tmp_path)
+    build_index(path)
+    doc["document"]["children"][0]["children"][0]["name"] = "Renamed"
+    save_cache(str(tmp_path), "KEY", doc)
+    frame_id = doc["document"]["children"][0]["children"][0]["id"]
+    assert read_node(path, frame_id)["name"] == "Renamed"
+
+
+def test_list_nodes(tmp_path):
+    doc, path = _cached(tmp_path)
+    page = doc["document"]["children"][0]
+    frames = list_nodes(path, "FRAME", page=page["name"], top_level=True)
+    assert [f["id"] for f in frames] == [c["id"] for c in page["children"] if c["type"] == "FRAME"]
+    assert frames[0]["parent"] == page["id"]
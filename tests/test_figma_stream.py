@@ -0,0 +1,52 @@
+import json
+import os
+
+import figma_api
+from figma_api import find_node_by_id
+from figma_cache import save_cache
+from figma_index import build_index, has_index, index_path
+from figma_stream import load_subtree
+from synth_figma import Generator
+
+
+def _ids(root):
+    stack = [root]
+    while stack:
+        n = stack.pop()
+        yield n["id"]
+        stack.extend(n.get("children", []))
+
+
+def test_load_subtree_matches_a_full_parse(tmp_path):
+    doc = Generator(nodes=2000, frames=3, components=4).document()
+    path = save_cache(str(tmp_path), "KEY", doc)
+    for node_id in list(_ids(doc["document"]))[::7]:
+        assert load_subtree(path, node_id) == find_node_by_id(doc["document"], node_id)
+    assert load_subtree(path, "missing") is None
+
+
+def test_load_subtree_skips_objects_that_are_not_nodes(tmp_path):
+    # an instance override and a variable alias carry the same id before the node itself,
+    # which also has "id" after other keys and a subtree bigger than the first window
+    text = "é" * 70_000
+    doc = {"document": {"id": "0:0", "type": "DOCUMENT", "children": [
+        {"id": "1:1", "type": "INSTANCE", "overrides": [{"id": "1:9", "overriddenFields": ["fills"]}],
+         "boundVariables": {"fills": {"type": "VARIABLE_ALIAS", "id": "1:9"}}},
+        {"name": "Label", "id": "1:9", "type": "TEXT", "characters": text}]}}
+    path = tmp_path / "doc.json"
+    path.write_text(json.dumps(doc), encoding="utf-8")
+    assert load_subtree(str(path), "1:9") == doc["document"]["children"][1]
+
+
+def test_cold_get_nodes_streams_without_building_the_index(tmp_path, monkeypatch):
+    doc = Generator(nodes=2000, frames=3, components=4).document()
+    monkeypatch.setattr(figma_api, "CACHE_DIR", str(tmp_path))
+    path = save_cache(str(tmp_path), "KEY", doc)
+    frame = doc["document"]["children"][0]["children"][0]
+
+    assert figma_api.get_nodes("KEY", [frame["id"]]) == {frame["id"]: frame}
+    assert not os.path.exists(index_path(path))
+
+    build_index(path)
+    assert has_index(path)
+    assert figma_api.get_nodes("KEY", [frame["id"]]) == {frame["id"]: frame}
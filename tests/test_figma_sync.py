@@ -0,0 +1,125 @@
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+from figma_http import FigmaClient
+from figma_standin import serve
+from figma_sync import TokenBucket, sync_files
+from synth_figma import Generator
+
+KEYS = [f"SYNC{i}" for i in range(12)]
+
+
+@pytest.fixture
+def standin(tmp_path):
+    """Starts stand-ins serving the same small document under every key in KEYS."""
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    doc = Generator(nodes=200).document()
+    for key in KEYS:
+        with open(docs / f"{key}.json", "w", encoding="utf-8") as f:
+            json.dump(doc, f)
+    servers = []
+
+    def start(**limits):
+        server = serve(str(docs), **limits)
+        servers.append(server)
+        return server
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _sync(server, cache_dir, **kwargs):
+    client = FigmaClient("stand-in", base_url=f"http://127.0.0.1:{server.server_address[1]}/v1",
+                         max_retries=0, pool_size=8)
+    start = time.monotonic()
+    results = sync_files(KEYS, client, cache_dir=str(cache_dir), concurrency=8, **kwargs)
+    return results, time.monotonic() - start, client
+
+
+def _most_in_a_second(times):
+    return max(sum(t <= u < t + 1 for u in times) for t in times)
+
+
+class FakeClock:
+    """A monotonic clock that only moves when the bucket sleeps on it."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+
+
+def _acquire_times(bucket, clock, tasks, each=1):
+    times = []
+
+    async def task():
+        for _ in range(each):
+            await bucket.acquire()
+            times.append(clock.now)
+
+    async def run():
+        await asyncio.gather(*(task() for _ in range(tasks)))
+    asyncio.run(run())
+    return sorted(times)
+
+
+def test_bucket_spends_its_burst_then_paces():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=3, clock=clock, sleep=clock.sleep)
+    assert _acquire_times(bucket, clock, tasks=3, each=2) == [0, 0, 0, 0.5, 1.0, 1.5]
+
+
+def test_bucket_pause_holds_every_task():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1, burst=3, clock=clock, sleep=clock.sleep)
+    bucket.pause(2.0)
+    bucket.pause(0.5)  # a shorter pause doesn't cut the longer one short
+    assert _acquire_times(bucket, clock, tasks=4) == [2.0, 2.0, 2.0, 3.0]
+
+
+def test_sync_paces_itself_under_the_rate_limit(standin, tmp_path):
+    server = standin(latency=0.05, rate=10, burst=3)
+    results, elapsed, client = _sync(server, tmp_path / "cache", rate_per_minute=360, burst=3)
+    assert [r["status"] for r in results] == ["downloaded"] * len(KEYS)
+    assert server.standin.stats["throttled"] == 0 and client.stats["retries"] == 0
+    # 3 at once, then 6 per second: the bucket spaces the other 9 over at least 1.5 s
+    assert elapsed >= 1.5
+    assert _most_in_a_second(server.standin.accepted) <= 3 + 6
+
+    # a second sync, once the server's burst has refilled, only checks versions
+    time.sleep(3 / 10)
+    results, elapsed, _ = _sync(server, tmp_path / "cache", rate_per_minute=360, burst=3)
+    assert [r["status"] for r in results] == ["current"] * len(KEYS)
+    assert server.standin.stats["file"] == len(KEYS) and server.standin.stats["meta"] == len(KEYS)
+    assert server.standin.stats["throttled"] == 0
+
+
+def test_a_429_pauses_every_download_for_retry_after(standin, tmp_path):
+    server = standin(fail_every=5, retry_after=1)
+    results, elapsed, client = _sync(server, tmp_path / "cache", rate_per_minute=600, burst=3)
+    assert [r["status"] for r in results] == ["downloaded"] * len(KEYS)
+    throttled = server.standin.throttled
+    assert len(throttled) == server.standin.stats["throttled"] == client.stats["retries"] >= 2
+    # every 429 paused the whole sync for its Retry-After
+    assert elapsed >= 1
+    assert sorted(os.listdir(tmp_path / "cache")) == sorted(
+        name for key in KEYS for name in (f"{key}.fcache", f"{key}.index"))
+
+
+def test_a_client_over_the_limit_recovers_through_retry_after(standin, tmp_path):
+    server = standin(rate=4, burst=4)
+    results, elapsed, client = _sync(server, tmp_path / "cache", rate_per_minute=6000, burst=8, max_retries=8)
+    assert [r["status"] for r in results] == ["downloaded"] * len(KEYS)
+    assert server.standin.stats["throttled"] == client.stats["retries"] > 0
+    assert server.standin.stats["file"] == len(KEYS)
+    assert _most_in_a_second(server.standin.accepted) <= 4 + 4
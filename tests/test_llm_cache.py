@@ -0,0 +1,58 @@
+import os
+
+import openai_generate
+from llm_cache import ResponseCache, cache_key
+from openai_generate import call_openai, request_key, stream_openai
+
+ANSWER = "===HTML_START===\n<div class=\"card\">Hi</div>\n===CSS_START===\n.card { color: red; }\n"
+
+
+def test_second_call_is_answered_from_the_cache(tmp_path, fake_openai):
+    client = fake_openai(lambda **kwargs: ANSWER)
+    cache = ResponseCache(str(tmp_path / "llm"))
+    assert call_openai("a prompt", client, cache) == ANSWER
+    assert call_openai("a prompt", client, cache) == ANSWER
+    assert len(client.calls) == 1
+    assert cache.stats == {"hits": 1, "misses": 1, "evicted": 0}
+    assert client.calls[0]["model"] == openai_generate.MODEL
+
+    call_openai("another prompt", client, cache)
+    assert len(client.calls) == 2 and cache.stats["misses"] == 2
+
+
+def test_streamed_and_plain_calls_share_entries(tmp_path, monkeypatch, fake_openai):
+    monkeypatch.chdir(tmp_path)
+    client = fake_openai(lambda **kwargs: ANSWER)
+    cache = ResponseCache(str(tmp_path / "llm"))
+    first = stream_openai("a prompt", client, cache)
+    assert client.calls[0]["stream"] is True and first["chunks"] > 1
+    with open(openai_generate.HTML_FILE, encoding="utf-8") as f:
+        html = f.read()
+
+    second = stream_openai("a prompt", client, cache)
+    assert len(client.calls) == 1 and second["chunks"] == 1
+    with open(openai_generate.HTML_FILE, encoding="utf-8") as f:
+        assert f.read() == html
+    assert call_openai("a prompt", client, cache) == ANSWER and len(client.calls) == 1
+
+
+def test_key_covers_model_sampling_and_messages():
+    messages = [{"role": "user", "content": "x"}]
+    key = cache_key("m", messages, temperature=0.1)
+    assert key == cache_key("m", [{"content": "x", "role": "user"}], temperature=0.1)
+    assert key != cache_key("n", messages, temperature=0.1)
+    assert key != cache_key("m", messages, temperature=0.2)
+    assert key != cache_key("m", [{"role": "user", "content": "y"}], temperature=0.1)
+    assert request_key("x") != request_key("y")
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=10 ** 6)
+    for i, key in enumerate(("a", "b", "c")):
+        cache.put(key, "x" * 1000, "m", 1.0)
+        os.utime(cache._path(key), (i, i))
+    cache.get("a")  # now the most recently used
+    cache.max_bytes = os.path.getsize(cache._path("a")) + os.path.getsize(cache._path("c"))
+    cache.evict()
+    assert sorted(os.listdir(tmp_path)) == ["a.json", "c.json"]
+    assert cache.stats["evicted"] == 1
@@ -0,0 +1,60 @@
+import sys
+
+from css_html import dedupe_css, generate_css, generate_html
+from mapper import build_ui_tree, intern_styles
+
+DEPTH = 20000
+
+
+def _chain(depth):
+    """A frame nested `depth` levels deep, each level one pixel inside its parent, with a text leaf."""
+    root = node = None
+    for i in range(depth):
+        child = {"id": f"1:{i}", "type": "FRAME", "name": f"level {i}", "children": [],
+                 "absoluteBoundingBox": {"x": i, "y": i, "width": 2 * depth - 2 * i, "height": 2 * depth - 2 * i},
+                 "fills": [{"type": "SOLID", "color": {"r": 1, "g": 1, "b": 1, "a": 1}}]}
+        if node is None:
+            root = child
+        else:
+            node["children"].append(child)
+        node = child
+    node["children"].append({"id": "2:0", "type": "TEXT", "name": "leaf", "characters": "bottom",
+                             "absoluteBoundingBox": {"x": depth, "y": depth, "width": 10, "height": 10}})
+    return root
+
+
+def test_pathologically_deep_chain():
+    # far past the recursion limit: every stage has to walk with an explicit stack
+    assert DEPTH > 10 * sys.getrecursionlimit()
+    ui_root, id_to_class = build_ui_tree(_chain(DEPTH))
+    assert len(id_to_class) == DEPTH + 1
+
+    node, depth = ui_root, 0
+    while node.children:
+        node, depth = node.children[0], depth + 1
+    assert depth == DEPTH and node.text == "bottom" and (node.abs_x, node.abs_y) == (DEPTH, DEPTH)
+
+    css = generate_css(ui_root, id_to_class)
+    assert css.count("{") == css.count("}")
+    assert ".node-1-0 {" in css and ".node-2-0 {" in css
+
+    html = generate_html(ui_root, id_to_class)
+    # the chain plus the canvas div, all closed again
+    assert html.count("<div") == html.count("</div>") >= DEPTH + 2
+    assert html.index('class="node-1-19999"') < html.index(">bottom</div>")
+
+    plan = dedupe_css(ui_root, id_to_class)
+    assert plan["stats"]["nodes"] == DEPTH + 1 and plan["stats"]["shared_classes"] == 1
+    assert plan["stats"]["deduped"] == DEPTH
+    assert len(generate_css(ui_root, id_to_class, plan)) < len(css)
+    assert 'class="node-1-19999 shared_0"' in generate_html(ui_root, plan["classes"])
+
+
+def test_equal_styles_are_shared():
+    table = {}
+    fill = lambda: [{"type": "SOLID", "color": {"r": 1, "g": 0.5, "b": 0, "a": 1}}]
+    a = intern_styles({"fills": fill(), "strokeWeight": 1}, table)
+    assert intern_styles({"fills": fill(), "strokeWeight": 1}, table) is a
+    assert intern_styles({"fills": fill(), "strokeWeight": 1.5}, table) is not a
+    assert intern_styles({"fills": fill(), "strokeWeight": True}, table) is not a
+    assert len(table) == 3
@@ -0,0 +1,59 @@
+import copy
+import json
+
+import pytest
+
+from export_ui_tree import clean_figma_node
+from prompt_encoding import CHARS_PER_TOKEN, _key, compact_tree, encode_tree, prune_to_budget
+from synth_figma import Generator
+
+
+@pytest.fixture(scope="module")
+def ui_tree():
+    doc = Generator(nodes=1500, seed=11).document()
+    return clean_figma_node(doc["document"]["children"][0]["children"][0])
+
+
+def _walk(tree):
+    stack = [tree]
+    while stack:
+        n = stack.pop()
+        yield n
+        stack.extend(n.get("children", []))
+
+
+def _pruned(ui_tree, limit):
+    """(compact tree, subtrees summarized, size before) after pruning a fresh copy down to `limit` characters."""
+    entries: list = []
+    tree = compact_tree(copy.deepcopy(ui_tree), entries)
+    before = len(_key(tree))
+    return tree, prune_to_budget(entries, limit), before
+
+
+@pytest.mark.parametrize("fraction", [0.9, 0.5, 0.2])
+def test_prune_to_budget_lands_under_the_limit(ui_tree, fraction):
+    # the smallest the tree gets: every subtree below the root summarized
+    floor = len(_key(_pruned(ui_tree, 0)[0]))
+    full = len(_key(compact_tree(ui_tree)))
+    limit = int(floor + (full - floor) * fraction)
+    tree, summarized, before = _pruned(ui_tree, limit)
+    assert before == full > limit
+    assert summarized > 0 and len(_key(tree)) <= limit
+    # every summarized subtree accounts for the nodes it dropped
+    kept = sum(1 for _ in _walk(tree))
+    assert kept + sum(n.get("omittedNodes", 0) for n in _walk(tree)) == sum(1 for _ in _walk(ui_tree))
+
+
+def test_prune_to_budget_leaves_a_tree_that_fits_alone(ui_tree):
+    full = len(_key(compact_tree(ui_tree)))
+    tree, summarized, _ = _pruned(ui_tree, full)
+    assert summarized == 0 and tree == compact_tree(ui_tree)
+
+
+def test_encoded_tree_fits_the_token_budget(ui_tree):
+    full = len(json.dumps({"tree": compact_tree(ui_tree)}, separators=(",", ":"), ensure_ascii=False))
+    budget = full // CHARS_PER_TOKEN // 2
+    text, report = encode_tree(ui_tree, budget)
+    assert report["summarized"] > 0 and report["omitted"] > 0
+    assert not report["over_budget"] and report["tokens"] <= budget
+    assert len(text) <= budget * CHARS_PER_TOKEN
@@ -0,0 +1,82 @@
+import re
+import time
+
+from llm_cache import ResponseCache
+from region_fanout import generate_regions, plan_regions
+
+PREFIX = re.compile(r"MUST start with `r(\d+)-`")
+
+
+def _tree(cards):
+    children = [{"id": f"2:{i}", "type": "FRAME", "name": f"Card {i}", "x": 10, "y": 20 + 60 * i,
+                 "width": 100, "height": 50,
+                 "children": [{"id": f"3:{i}", "type": "TEXT", "name": "Label", "characters": f"card {i}",
+                               "x": 12, "y": 22 + 60 * i, "width": 50, "height": 10}]}
+                for i in range(cards)]
+    return {"id": "1:1", "type": "FRAME", "name": "Page", "x": 10, "y": 20, "width": 400, "height": 60 * cards,
+            "children": children}
+
+
+def _answer(slow=False, fail=None):
+    """A create() answering each region with markup naming it; with `slow`, earlier regions finish last."""
+    def create(messages, **kwargs):
+        region = int(PREFIX.search(messages[-1]["content"]).group(1))
+        if slow:
+            time.sleep(0.05 * (6 - region))
+        if region == fail:
+            raise RuntimeError("rate limited")
+        return (f'===HTML_START===\n<html><body><div class="r{region}-card">region {region}</div></body></html>\n'
+                f"===CSS_START===\nbody {{ margin: 1px; }}\n.r{region}-card {{ top: {region}px; }}\n")
+    return create
+
+
+def test_regions_are_stitched_in_document_order(fake_openai):
+    tree = _tree(6)
+    assert len(plan_regions(tree, None, region_tokens=60)) == 6
+    client = fake_openai(_answer(slow=True))
+    html, css, report = generate_regions(tree, "#fff", None, region_tokens=60, concurrency=6, client=client)
+    assert len(client.calls) == 6 and report["failed"] == []
+    # the calls overlapped: the whole fan-out took about as long as the slowest region
+    assert report["wall"] < report["sum"] / 2
+    regions = re.findall(r'<div class="region r(\d+)">\n<div class="r(\d+)-card">region (\d+)</div>', html)
+    assert regions == [(str(i), str(i), str(i)) for i in range(6)]
+    assert "<body><div" not in html and "margin: 1px" not in css
+    rules = re.findall(r"\.r(\d+) \.r(\d+)-card", css)
+    assert rules == [(str(i), str(i)) for i in range(6)]
+
+
+def test_a_failed_region_keeps_its_place(fake_openai):
+    client = fake_openai(_answer(fail=2))
+    html, css, report = generate_regions(_tree(4), "#fff", None, region_tokens=60, client=client)
+    assert report["failed"] == [2]
+    assert re.findall(r'<div class="region r(\d+)">\n(<!--|<div)', html) == [
+        ("0", "<div"), ("1", "<div"), ("2", "<!--"), ("3", "<div")]
+    assert "region r2 failed: rate limited" in html
+
+
+def test_cached_regions_are_not_requested_again(tmp_path, fake_openai):
+    cache = ResponseCache(str(tmp_path / "llm"))
+    tree = _tree(4)
+    first = fake_openai(_answer())
+    html, css, _ = generate_regions(tree, "#fff", None, region_tokens=60, client=first, cache=cache)
+    second = fake_openai(_answer())
+    assert generate_regions(tree, "#fff", None, region_tokens=60, client=second, cache=cache)[:2] == (html, css)
+    assert len(first.calls) == 4 and second.calls == []
+
+
+def test_a_malformed_region_is_not_cached(tmp_path, fake_openai):
+    cache = ResponseCache(str(tmp_path / "llm"))
+    tree = _tree(2)
+    valid = _answer()
+
+    def garbage_for_region_1(messages, **kwargs):
+        if PREFIX.search(messages[-1]["content"]).group(1) == "1":
+            return "sorry, no markup today"
+        return valid(messages, **kwargs)
+
+    first = fake_openai(garbage_for_region_1)
+    assert generate_regions(tree, "#fff", None, region_tokens=60, client=first, cache=cache)[2]["failed"] == [1]
+    second = fake_openai(valid)
+    html, _, report = generate_regions(tree, "#fff", None, region_tokens=60, client=second, cache=cache)
+    assert report["failed"] == [] and 'class="r1-card"' in html
+    assert len(second.calls) == 1
@@ -0,0 +1,74 @@
+import json
+import threading
+import urllib.request
+
+import pytest
+
+import figma_api
+from figma_http import FigmaClient
+from figma_standin import serve
+from server import ExportService, LruCache, make_server
+from synth_figma import Generator
+
+FILE_KEY = "SERVED"
+
+
+def _request(base, path, method="GET"):
+    req = urllib.request.Request(base + path, method=method, data=b"" if method == "POST" else None)
+    with urllib.request.urlopen(req) as resp:
+        return json.load(resp)
+
+
+@pytest.fixture
+def daemon(tmp_path, monkeypatch):
+    """The daemon on a free port, downloading from a stand-in; yields (daemon URL, stand-in URL, stand-in, frame id)."""
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    doc = Generator(nodes=300).document()
+    with open(docs / f"{FILE_KEY}.json", "w", encoding="utf-8") as f:
+        json.dump(doc, f)
+    standin = serve(str(docs))
+    figma_url = f"http://127.0.0.1:{standin.server_address[1]}/v1"
+    monkeypatch.setattr(figma_api, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(figma_api, "_client", FigmaClient("stand-in", base_url=figma_url, max_retries=0))
+    monkeypatch.delenv("FIGMA_CACHE_MAX_AGE", raising=False)
+
+    server = make_server(ExportService(), port=0, log_requests=False)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", figma_url, standin.standin, \
+        doc["document"]["children"][0]["children"][0]["id"]
+    for s in (server, standin):
+        s.shutdown()
+        s.server_close()
+
+
+def test_cold_warm_and_polled_exports(daemon):
+    base, figma_url, standin, frame_id = daemon
+    export = f"/export?file={FILE_KEY}&node={frame_id}"
+
+    cold = _request(base, export)
+    assert cold["cache"] == "cold" and 'class="' in cold["html"] and cold["css"]
+    warm = _request(base, export)
+    assert warm["cache"] == "warm" and (warm["html"], warm["css"]) == (cold["html"], cold["css"])
+    assert standin.stats["file"] == 1
+
+    assert _request(base, "/poll", "POST")["changed"] == []
+    assert standin.stats["file"] == 1
+    version = _request(figma_url, f"/_edit/{FILE_KEY}", "POST")["version"]
+    assert _request(base, "/poll", "POST")["changed"] == [FILE_KEY]
+    edited = _request(base, export)
+    # re-rendered by the poll, so still served warm, at the new version
+    assert edited["cache"] == "warm" and edited["version"] == version != cold["version"]
+
+    stats = _request(base, "/stats")
+    assert stats["documents"]["size"] == 1 and stats["polls"]["changed"] == 1
+
+
+def test_lru_cache_evicts_the_least_recently_used():
+    cache = LruCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.keys() == ["a", "c"] and len(cache) == 2
+    assert cache.summary() == {"size": 2, "capacity": 2, "hits": 1, "misses": 0, "evictions": 1}
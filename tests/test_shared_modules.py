@@ -0,0 +1,15 @@
+import filecmp
+import os
+
+import pytest
+
+# classic/ and ai/ are run from inside themselves with flat imports, so each
+# keeps its own copy of the Figma helpers; the tests import the classic one.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHARED = ("figma_api.py", "figma_cache.py", "figma_http.py", "figma_index.py", "figma_stream.py", "profiling.py")
+
+
+@pytest.mark.parametrize("name", SHARED)
+def test_shared_helpers_are_identical(name):
+    classic, ai = (os.path.join(ROOT, sub, name) for sub in ("classic", "ai"))
+    assert filecmp.cmp(classic, ai, shallow=False), f"ai/{name} differs from classic/{name}; copy the change over"
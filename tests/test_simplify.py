@@ -0,0 +1,101 @@
+import pytest
+
+from css_html import should_be_bottom_anchored
+from mapper import build_ui_tree
+from simplify import simplify_tree
+from synth_figma import Generator
+
+RED = [{"type": "SOLID", "color": {"r": 1, "g": 0, "b": 0, "a": 1}}]
+CLEAR = [{"type": "SOLID", "color": {"r": 1, "g": 0, "b": 0, "a": 0}}]
+BODY = {"fontFamily": "Inter", "fontSize": 14, "lineHeightPx": 20}
+
+
+def _node(id, type, x, y, w, h, children=(), **props):
+    return {"id": id, "type": type, "name": id, "absoluteBoundingBox": {"x": x, "y": y, "width": w, "height": h},
+            "children": list(children), **props}
+
+
+def _wrapped_frame():
+    # wrappers at fractional offsets, so collapsing them has to make up for the truncated left/top
+    return _node("1:1", "FRAME", 0, 0, 400, 800, fills=RED, children=[
+        _node("2:1", "GROUP", 10.6, 20.7, 200, 200, children=[
+            _node("2:2", "FRAME", 15.4, 30.2, 150, 150, children=[
+                _node("2:3", "RECTANGLE", 25.9, 40.5, 60, 40, fills=RED)])]),
+        _node("3:1", "RECTANGLE", 300, 20, 20, 20, fills=CLEAR),
+        _node("3:2", "TEXT", 300, 50, 50, 20, characters="  ", style=BODY),
+        _node("4:1", "TEXT", 20, 300, 200, 20, characters="first line", style=BODY),
+        _node("4:2", "TEXT", 20, 320, 200, 40, characters="second and third", style=BODY),
+        _node("5:1", "FRAME", 20, 400, 300, 100, layoutMode="HORIZONTAL", itemSpacing=8, children=[
+            _node("5:2", "GROUP", 20, 400, 100, 100, children=[
+                _node("5:3", "RECTANGLE", 30, 410, 40, 40, fills=RED)])])])
+
+
+def _synth_frame():
+    doc = Generator(nodes=1500, seed=5).document()
+    return doc["document"]["children"][0]["children"][0]
+
+
+def _rendered(root):
+    """
+    Where every box lands under the CSS the exporter writes: (anchor, left,
+    top, width, height) by id, with left/top summed down the containing
+    blocks from `anchor`, the nearest box laid out in flow (or the root).
+    """
+    boxes = {root.id: (root.id, 0, 0, int(root.width), int(root.height))}
+    stack = [root]
+    while stack:
+        parent = stack.pop()
+        anchor, px, py, _, ph = boxes[parent.id]
+        for c in parent.children:
+            x, y = c.abs_x - root.abs_x, c.abs_y - root.abs_y
+            if parent.styles.get("flex"):
+                boxes[c.id] = (c.id, 0, 0, int(c.width), int(c.height))
+            elif should_be_bottom_anchored(y, c.height, root.height):
+                top = ph - int(root.height - (y + c.height)) - int(c.height)
+                boxes[c.id] = (anchor, px + int(x), py + top, int(c.width), int(c.height))
+            else:
+                boxes[c.id] = (anchor, px + int(x), py + int(y), int(c.width), int(c.height))
+            stack.append(c)
+    return boxes
+
+
+def _texts(root):
+    stack, texts = [root], {}
+    while stack:
+        n = stack.pop()
+        if n.kind == "text":
+            texts[n.id] = n.text
+        stack.extend(n.children)
+    return texts
+
+
+@pytest.mark.parametrize("make_frame", [_wrapped_frame, _synth_frame])
+def test_simplify_keeps_every_painted_box_in_place(make_frame):
+    root, _ = build_ui_tree(make_frame())
+    before, texts = _rendered(root), _texts(root)
+    stats = simplify_tree(root)
+    after, merged_texts = _rendered(root), _texts(root)
+    assert stats["after"] == len(after) < stats["before"] == len(before)
+
+    merged = 0
+    for node_id, box in after.items():
+        if node_id in texts and texts[node_id] != merged_texts[node_id]:
+            # a merged run: the first line's box, grown to cover the lines taken in
+            anchor, x, y, w, h = before[node_id]
+            assert box[:4] == (anchor, x, y, w) and box[4] > h
+            merged += 1
+        else:
+            assert box == before[node_id], node_id
+    assert merged == stats["merged"]
+
+
+def test_simplify_collapses_removes_and_merges():
+    root, _ = build_ui_tree(_wrapped_frame())
+    stats = simplify_tree(root)
+    # both wrappers of 2:3, the clear rectangle and the blank text, the second text run;
+    # the group inside the auto-layout row stays, since its siblings flow around it
+    assert (stats["collapsed"], stats["removed"], stats["merged"]) == (2, 2, 1)
+    ids = {c.id: c for c in root.children}
+    assert sorted(ids) == ["2:3", "4:1", "5:1"]
+    assert ids["4:1"].text == "first line\nsecond and third"
+    assert [c.id for c in ids["5:1"].children] == ["5:2"]
@@ -0,0 +1,37 @@
+import io
+
+import pytest
+
+from openai_generate import split_output
+from stream_output import SectionSplitter
+
+RESPONSES = [
+    "===HTML_START===\n<p>Straße Grüße</p>\n===CSS_START===\nbody{color:red}\n",
+    # lower-case markers, with more characters that change length in upper()
+    "Here you go:\n===html_start===\n<p>ﬁne ßß ŉ</p>\n===css_start===\n.x{content:'ß'}\n",
+    "===HTML_START===\n```html\n<div>a ``` b</div>\n```\n===CSS_START===\n```css\n.a { top: 0; }\n```\n",
+]
+
+
+def _split(text, size):
+    html, css = io.StringIO(), io.StringIO()
+    splitter = SectionSplitter(html, css)
+    for i in range(0, len(text), size):
+        splitter.feed(text[i:i + size])
+    splitter.close()
+    return html.getvalue(), css.getvalue()
+
+
+@pytest.mark.parametrize("text", RESPONSES)
+def test_streaming_split_matches_split_output(text):
+    expected = split_output(text)
+    assert _split(text, len(text)) == expected
+    for size in range(1, 20):
+        assert _split(text, size) == expected, size
+
+
+def test_missing_markers_raise():
+    with pytest.raises(ValueError):
+        _split("<p>no markers</p>", 4)
+    with pytest.raises(ValueError):
+        _split("===HTML_START===\n<p>no css</p>", 4)